@@ -1,40 +1,48 @@
-# pylint: disable=useless-import-alias
 """
 Public API of benchbuild.
+
+The public API is imported on first access. Importing a single module,
+e.g., `benchbuild.runtime` in the script of a wrapped binary, does not
+import the rest of benchbuild. Plugins are imported, when the registered
+projects or experiments are looked up, see `benchbuild.plugins`.
 """
-import sys
-
-# Project utilities
-from benchbuild.project import populate as populate
-
-# Export: Source Code handling
-from . import plugins as __PLUGINS__
-from . import source as source
-from .experiment import Experiment as Experiment
-# Export: Project
-from .project import Project as Project
-# Export: Configuration
-from .settings import CFG as CFG
-# Don't Export, just init.
-# Export: compiler, download, run and wrapping modules
-from .utils import compiler as compiler
-from .utils import download as download
-from .utils import settings as __SETTINGS__
-from .utils import wrapping as wrapping
-# Wrapping / Execution utilities
-from .utils.run import watch as watch
-from .utils.wrapping import wrap as wrap
-
-
-def __init__() -> None:
-    """Initialize all plugins and settings."""
-    __PLUGINS__.discover()
-    __SETTINGS__.setup_config(CFG)
-
-
-__init__()
-
-# Clean the namespace
-del sys
-del __PLUGINS__
-del __SETTINGS__
+import importlib
+import typing as tp
+
+# Export: name -> (module, attribute). An attribute of None exports the module.
+__LAZY__ = {
+    # Project utilities
+    "populate": ("benchbuild.project", "populate"),
+    # Export: Source Code handling
+    "source": ("benchbuild.source", None),
+    "Experiment": ("benchbuild.experiment", "Experiment"),
+    # Export: Project
+    "Project": ("benchbuild.project", "Project"),
+    # Export: Configuration
+    "CFG": ("benchbuild.settings", "CFG"),
+    # Export: compiler, download, run and wrapping modules
+    "compiler": ("benchbuild.utils.compiler", None),
+    "download": ("benchbuild.utils.download", None),
+    "wrapping": ("benchbuild.utils.wrapping", None),
+    # Wrapping / Execution utilities
+    "watch": ("benchbuild.utils.run", "watch"),
+    "wrap": ("benchbuild.utils.wrapping", "wrap"),
+}
+
+__all__ = list(__LAZY__)
+
+
+def __getattr__(name: str) -> tp.Any:
+    """Import an export of the public API."""
+    if name not in __LAZY__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module_name, attribute = __LAZY__[name]
+    module = importlib.import_module(module_name)
+    value = module if attribute is None else getattr(module, attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> tp.List[str]:
+    return sorted(set(globals()) | set(__LAZY__))
@@ -0,0 +1,42 @@
+"""
+Vectorized analysis of the measurements in the database.
+
+The metrics of all runs are loaded into NumPy arrays, one code array per
+category (experiment, project, variant & metric) and one value array.
+All statistics work on these arrays, instead of single rows:
+
+    from benchbuild import analysis
+
+    data = analysis.load(metrics=['time.real_s'])
+    result = analysis.compare(data, 'baseline', 'optimized')
+    print(result.geomean, result.geomean_interval)
+
+The analysis requires numpy (`pip install benchbuild[numpy]`) and works on
+all database backends, because it only uses plain SELECTs.
+"""
+from benchbuild.utils.export import MissingDependency
+
+try:
+    import numpy  # pylint: disable=unused-import
+except ImportError as err:
+    raise MissingDependency(
+        "benchbuild.analysis requires numpy: pip install benchbuild[numpy]"
+    ) from err
+
+# pylint: disable=wrong-import-position
+from .compare import Comparison, compare
+from .load import Measurements, load
+from .stats import (
+    bootstrap,
+    geomean,
+    group_by,
+    group_mean,
+    interval,
+    speedup,
+)
+
+__all__ = [
+    'Comparison', 'Measurements', 'MissingDependency', 'bootstrap',
+    'compare', 'geomean', 'group_by', 'group_mean', 'interval', 'load',
+    'speedup'
+]
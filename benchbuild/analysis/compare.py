@@ -0,0 +1,146 @@
+"""
+Compare the measurements of two experiments, project by project.
+"""
+import typing as tp
+
+import attr
+import numpy as np
+
+from . import stats
+from .load import Measurements
+
+
+@attr.s(frozen=True, eq=False)
+class Comparison:
+    """
+    The speedup of a candidate experiment over a baseline experiment.
+
+    Every project & variant that has measurements in both experiments is a
+    group of its own. The speedup of a group is the ratio of the baseline's
+    mean to the candidate's mean.
+
+    Attributes:
+        metric: The metric we compared.
+        projects: The project of every group.
+        variants: The variant of every group.
+        baseline: The mean of the baseline, per group.
+        candidate: The mean of the candidate, per group.
+        baseline_count: The number of baseline measurements, per group.
+        candidate_count: The number of candidate measurements, per group.
+        speedup: The speedup, per group.
+        low: The lower bound of the speedup's confidence interval.
+        high: The upper bound of the speedup's confidence interval.
+        geomean: The geometric mean of the speedups of all groups.
+        geomean_interval: The confidence interval of the geometric mean.
+    """
+    metric: str = attr.ib()
+    projects: tp.Tuple[str, ...] = attr.ib()
+    variants: tp.Tuple[str, ...] = attr.ib()
+    baseline: np.ndarray = attr.ib(repr=False)
+    candidate: np.ndarray = attr.ib(repr=False)
+    baseline_count: np.ndarray = attr.ib(repr=False)
+    candidate_count: np.ndarray = attr.ib(repr=False)
+    speedup: np.ndarray = attr.ib(repr=False)
+    low: np.ndarray = attr.ib(repr=False)
+    high: np.ndarray = attr.ib(repr=False)
+    geomean: float = attr.ib()
+    geomean_interval: tp.Tuple[float, float] = attr.ib()
+
+    def __len__(self) -> int:
+        return len(self.projects)
+
+    def rows(self) -> tp.Iterator[tp.Dict[str, tp.Any]]:
+        """Iterate over the comparison of every group, e.g., for a report."""
+        for i, (project, variant) in enumerate(zip(self.projects,
+                                                   self.variants)):
+            yield {
+                'project': project,
+                'variant': variant,
+                'baseline': float(self.baseline[i]),
+                'candidate': float(self.candidate[i]),
+                'speedup': float(self.speedup[i]),
+                'low': float(self.low[i]),
+                'high': float(self.high[i])
+            }
+
+
+def compare(
+    data: Measurements,
+    baseline: str,
+    candidate: str,
+    metric: str = 'time.real_s',
+    resamples: int = 1000,
+    confidence: float = 0.95,
+    seed: tp.Optional[int] = None
+) -> Comparison:
+    """
+    Compare two experiments, per project & variant.
+
+    The confidence intervals are bootstrapped: baseline & candidate are
+    resampled independently and every resample yields a speedup for every
+    group and a geometric mean over all groups.
+
+    Args:
+        data: The measurements of both experiments.
+        baseline: The id or name of the baseline experiment.
+        candidate: The id or name of the candidate experiment.
+        metric: The metric we compare, lower values are better.
+        resamples: The number of bootstrap resamples, 0 skips the
+            confidence intervals.
+        confidence: The confidence level of all intervals.
+        seed: The seed of the bootstrap.
+
+    Returns:
+        The comparison of all groups measured in both experiments.
+    """
+    base_seed, cand_seed = np.random.SeedSequence(seed).spawn(2)
+
+    selected = data.mask(metric=metric)
+    keys, groups = stats.group_by(data.project[selected],
+                                  data.variant[selected])
+    values = data.value[selected]
+    experiment = data.experiment[selected]
+    num_groups = len(keys)
+
+    def summarize(
+        experiment_name: str, experiment_seed: tp.Any
+    ) -> tp.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        mask = experiment == data.experiment_code(experiment_name)
+        exp_values, exp_groups = values[mask], groups[mask]
+        means = stats.group_mean(exp_values, exp_groups, num_groups)
+        counts = np.bincount(exp_groups, minlength=num_groups)
+        samples = stats.bootstrap(
+            exp_values,
+            exp_groups,
+            num_groups,
+            resamples=resamples,
+            seed=experiment_seed
+        )
+        return means, counts, samples
+
+    base_mean, base_count, base_samples = summarize(baseline, base_seed)
+    cand_mean, cand_count, cand_samples = summarize(candidate, cand_seed)
+
+    common = (base_count > 0) & (cand_count > 0)
+    speedups = stats.speedup(base_mean[common], cand_mean[common])
+    samples = stats.speedup(base_samples[:, common], cand_samples[:, common])
+    low, high = stats.interval(samples, confidence)
+    geomean_low, geomean_high = stats.interval(
+        stats.geomean(samples, axis=1), confidence
+    )
+
+    keys = keys[common]
+    return Comparison(
+        metric=metric,
+        projects=tuple(data.projects[code] for code in keys[:, 0]),
+        variants=tuple(data.variants[code] for code in keys[:, 1]),
+        baseline=base_mean[common],
+        candidate=cand_mean[common],
+        baseline_count=base_count[common],
+        candidate_count=cand_count[common],
+        speedup=speedups,
+        low=low,
+        high=high,
+        geomean=float(stats.geomean(speedups)),
+        geomean_interval=(float(geomean_low), float(geomean_high))
+    )
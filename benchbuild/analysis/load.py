@@ -0,0 +1,210 @@
+"""
+Load metrics from the database into NumPy arrays.
+
+Every category of a measurement (experiment, project, variant & metric) is
+stored as an array of integer codes into a tuple of labels. The rows are
+streamed from the database in batches, so we never hold more than a batch
+of Python objects in memory.
+"""
+import logging
+import typing as tp
+
+import attr
+import numpy as np
+import sqlalchemy as sa
+
+LOG = logging.getLogger(__name__)
+
+CODE_TYPE = np.int32
+FIELDS = ('experiment', 'project', 'variant', 'metric')
+
+
+class Labels:
+    """Assign consecutive codes to labels, in the order we see them."""
+
+    def __init__(self) -> None:
+        self.codes: tp.Dict[tp.Any, int] = {}
+
+    def encode(self, labels: tp.Iterable[tp.Any]) -> np.ndarray:
+        codes = self.codes
+        return np.fromiter((codes.setdefault(label, len(codes))
+                            for label in labels),
+                           dtype=CODE_TYPE)
+
+    def labels(self) -> tp.Tuple[tp.Any, ...]:
+        return tuple(self.codes)
+
+
+@attr.s(frozen=True, eq=False)
+class Measurements:
+    """
+    The metrics of many runs, as columns.
+
+    Attributes:
+        experiments: The ids of all experiments.
+        experiment_names: The names of all experiments, by code.
+        projects: The ids ('<name>/<group>') of all projects.
+        variants: All variants, '' for runs without a variant.
+        metrics: The names of all metrics.
+        experiment: The experiment code of every measurement.
+        project: The project code of every measurement.
+        variant: The variant code of every measurement.
+        metric: The metric code of every measurement.
+        value: The value of every measurement.
+    """
+    experiments: tp.Tuple[str, ...] = attr.ib()
+    experiment_names: tp.Tuple[str, ...] = attr.ib()
+    projects: tp.Tuple[str, ...] = attr.ib()
+    variants: tp.Tuple[str, ...] = attr.ib()
+    metrics: tp.Tuple[str, ...] = attr.ib()
+
+    experiment: np.ndarray = attr.ib(repr=False)
+    project: np.ndarray = attr.ib(repr=False)
+    variant: np.ndarray = attr.ib(repr=False)
+    metric: np.ndarray = attr.ib(repr=False)
+    value: np.ndarray = attr.ib(repr=False)
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    def experiment_code(self, experiment: str) -> int:
+        """
+        Find the code of an experiment, by its id or by its name.
+
+        Raises:
+            KeyError: If there is no such experiment or if the name is not
+                unique.
+        """
+        if experiment in self.experiments:
+            return self.experiments.index(experiment)
+        codes = [
+            code for code, name in enumerate(self.experiment_names)
+            if name == experiment
+        ]
+        if len(codes) != 1:
+            raise KeyError(
+                f"{len(codes)} experiments match '{experiment}', "
+                "use the experiment id instead."
+            )
+        return codes[0]
+
+    def metric_code(self, metric: str) -> int:
+        if metric not in self.metrics:
+            raise KeyError(f"No measurements of metric '{metric}'")
+        return self.metrics.index(metric)
+
+    def mask(
+        self,
+        metric: tp.Optional[str] = None,
+        experiment: tp.Optional[str] = None
+    ) -> np.ndarray:
+        """Select the measurements of a metric and/or an experiment."""
+        selected = np.ones(len(self), dtype=bool)
+        if metric is not None:
+            selected &= self.metric == self.metric_code(metric)
+        if experiment is not None:
+            selected &= self.experiment == self.experiment_code(experiment)
+        return selected
+
+
+def query_of(
+    metrics: tp.Optional[tp.Iterable[str]] = None,
+    experiments: tp.Optional[tp.Iterable[str]] = None,
+    experiment_ids: tp.Optional[tp.Iterable[str]] = None,
+    completed: bool = True
+) -> tp.Any:
+    """Select the category & value columns of all requested metrics."""
+    from benchbuild.utils import schema as s
+
+    run = s.Run.__table__
+    metric = s.Metric.__table__
+    query = sa.select([
+        run.c.experiment_group, run.c.experiment_name, run.c.project_name,
+        run.c.project_group, run.c.variant, metric.c.name, metric.c.value
+    ]).select_from(metric.join(run, run.c.id == metric.c.run_id))
+    query = query.where(metric.c.value.isnot(None))
+
+    if metrics:
+        query = query.where(metric.c.name.in_(list(metrics)))
+    if experiments:
+        query = query.where(run.c.experiment_name.in_(list(experiments)))
+    if experiment_ids:
+        query = query.where(run.c.experiment_group.in_(list(experiment_ids)))
+    if completed:
+        query = query.where(run.c.status == 'completed')
+    return query
+
+
+def load(
+    metrics: tp.Optional[tp.Iterable[str]] = None,
+    experiments: tp.Optional[tp.Iterable[str]] = None,
+    experiment_ids: tp.Optional[tp.Iterable[str]] = None,
+    completed: bool = True,
+    batch_size: int = 100000,
+    session: tp.Any = None
+) -> Measurements:
+    """
+    Load the metrics of runs from the database.
+
+    Args:
+        metrics: Only load metrics with these names.
+        experiments: Only load experiments with these names.
+        experiment_ids: Only load experiments with these ids.
+        completed: Only load runs that completed successfully.
+        batch_size: The number of rows we fetch at once.
+        session: The database session, defaults to `schema.Session()`.
+
+    Returns:
+        All matching measurements.
+    """
+    from benchbuild.utils import schema
+
+    session = session or schema.Session()
+    result = session.execute(
+        query_of(metrics, experiments, experiment_ids,
+                 completed).execution_options(stream_results=True)
+    )
+
+    experiment_labels = Labels()
+    names: tp.Dict[str, str] = {}
+    labels = {field: Labels() for field in FIELDS[1:]}
+    chunks: tp.Dict[str, tp.List[np.ndarray]] = {
+        field: [] for field in FIELDS + ('value',)
+    }
+
+    while True:
+        rows = result.fetchmany(batch_size)
+        if not rows:
+            break
+        exp_ids, exp_names, prj_names, prj_groups, variants, metric_names, \
+            values = zip(*rows)
+
+        exp_ids = [str(exp_id) for exp_id in exp_ids]
+        names.update(zip(exp_ids, exp_names))
+        chunks['experiment'].append(experiment_labels.encode(exp_ids))
+        chunks['project'].append(labels['project'].encode(
+            f'{name}/{group}' for name, group in zip(prj_names, prj_groups)
+        ))
+        chunks['variant'].append(labels['variant'].encode(
+            variant or '' for variant in variants
+        ))
+        chunks['metric'].append(labels['metric'].encode(metric_names))
+        chunks['value'].append(np.array(values, dtype=np.float64))
+    result.close()
+
+    columns = {
+        field: np.concatenate(chunk) if chunk else np.empty(0, CODE_TYPE)
+        for field, chunk in chunks.items()
+    }
+    columns['value'] = columns['value'].astype(np.float64, copy=False)
+    experiments_ = experiment_labels.labels()
+    LOG.debug("Loaded %d measurements", len(columns['value']))
+
+    return Measurements(
+        experiments=experiments_,
+        experiment_names=tuple(names[exp_id] for exp_id in experiments_),
+        projects=labels['project'].labels(),
+        variants=labels['variant'].labels(),
+        metrics=labels['metric'].labels(),
+        **columns
+    )
@@ -0,0 +1,149 @@
+"""
+Vectorized statistics over groups of measurements.
+
+Groups are given as an array of group indices, one per measurement, e.g.,
+the inverse returned by `group_by`. All functions work on whole arrays at
+once and never loop over single measurements in Python.
+"""
+import typing as tp
+import warnings
+
+import numpy as np
+
+# The maximal number of weights we draw at once during a bootstrap.
+BOOTSTRAP_CHUNK = 1 << 22
+POISSON_BITS = 16
+
+
+def poisson_table(bits: int = POISSON_BITS) -> np.ndarray:
+    """
+    Map uniform integers of `bits` bits to Poisson(1) distributed weights.
+
+    A lookup of random integers is much cheaper than drawing from
+    `Generator.poisson`, which dominates the bootstrap of many rows.
+    """
+    factorials = np.cumprod(np.r_[1.0, np.arange(1.0, 16.0)])
+    cdf = np.cumsum(np.exp(-1.0) / factorials)
+    return np.searchsorted(
+        cdf * (1 << bits), np.arange(1 << bits), side='right'
+    ).astype(np.uint8)
+
+
+def group_by(*codes: np.ndarray) -> tp.Tuple[np.ndarray, np.ndarray]:
+    """
+    Group measurements by the combination of their codes.
+
+    Args:
+        *codes: One code array per category, all of the same length.
+
+    Returns:
+        The unique combinations of codes, with one row per group and one
+        column per category, and the group index of every measurement.
+    """
+    dims = tuple(int(c.max()) + 1 if len(c) else 1 for c in codes)
+    keys = np.ravel_multi_index(codes, dims)
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return np.stack(np.unravel_index(unique, dims), axis=1), inverse
+
+
+def group_mean(values: np.ndarray, groups: np.ndarray,
+               num_groups: int) -> np.ndarray:
+    """The arithmetic mean of every group, NaN for empty groups."""
+    sums = np.bincount(groups, weights=values, minlength=num_groups)
+    counts = np.bincount(groups, minlength=num_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts
+
+
+def geomean(values: np.ndarray, axis: int = -1) -> np.ndarray:
+    """The geometric mean of positive values along an axis."""
+    with np.errstate(divide='ignore'):
+        return np.exp(np.mean(np.log(values), axis=axis))
+
+
+def speedup(baseline: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    """
+    The speedup of a candidate over a baseline, e.g., of their run times.
+
+    Values greater than 1 are speedups, values less than 1 slowdowns, so
+    speedups of many projects can be summarized with `geomean`.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return baseline / candidate
+
+
+def bootstrap(
+    values: np.ndarray,
+    groups: np.ndarray,
+    num_groups: int,
+    resamples: int = 1000,
+    seed: tp.Any = None,
+    log: bool = False
+) -> np.ndarray:
+    """
+    Bootstrap the mean of every group.
+
+    We use the Poisson bootstrap: every resample weighs every measurement
+    with an independent Poisson(1) count, instead of drawing a multinomial
+    sample per group. This allows us to resample all groups at once with
+    a single reduction over the sorted measurements. The cost grows with
+    `resamples * len(values)`, the memory is bounded by `BOOTSTRAP_CHUNK`.
+
+    Args:
+        values: The measurements.
+        groups: The group index of every measurement.
+        num_groups: The number of groups.
+        resamples: The number of resamples.
+        seed: The seed of the random generator, see `default_rng`.
+        log: Resample the mean of the logarithms, i.e., the geometric mean.
+
+    Returns:
+        The means of all resamples, one row per resample and one column per
+        group. NaN, if a resample of a group is empty.
+    """
+    rng = np.random.default_rng(seed)
+    order = np.argsort(groups, kind='stable')
+    values = values[order]
+    groups = groups[order]
+    if log:
+        values = np.log(values)
+
+    means = np.full((resamples, num_groups), np.nan)
+    if not len(values):
+        return means
+
+    table = poisson_table()
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    present = groups[starts]
+    chunk = max(1, BOOTSTRAP_CHUNK // len(values))
+    for begin in range(0, resamples, chunk):
+        end = min(begin + chunk, resamples)
+        weights = table[rng.integers(
+            0, len(table), size=(end - begin, len(values)), dtype=np.uint16
+        )]
+        sums = np.add.reduceat(weights * values, starts, axis=1)
+        counts = np.add.reduceat(weights, starts, axis=1, dtype=np.int64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means[begin:end, present] = sums / counts
+
+    return np.exp(means) if log else means
+
+
+def interval(samples: np.ndarray,
+             confidence: float = 0.95) -> tp.Tuple[np.ndarray, np.ndarray]:
+    """
+    The percentile confidence interval of bootstrap samples.
+
+    Args:
+        samples: The statistic of every resample (axis 0).
+        confidence: The confidence level of the interval.
+
+    Returns:
+        The lower & upper bounds of the interval.
+    """
+    alpha = (1.0 - confidence) / 2.0
+    with warnings.catch_warnings():
+        # Groups without any sample have no interval.
+        warnings.simplefilter('ignore', RuntimeWarning)
+        low, high = np.nanquantile(samples, [alpha, 1.0 - alpha], axis=0)
+    return low, high
@@ -1,5 +1,5 @@
 """The CLI package."""
 __all__ = [
-    "main", "bootstrap", "config", "log", "project", "experiment", "run",
-    "slurm"
+    "main", "bootstrap", "config", "ingest", "log", "project", "experiment",
+    "results", "run", "slurm"
 ]
@@ -0,0 +1,16 @@
+"""Subcommand for ingesting spool files into the database."""
+from plumbum import cli
+
+from benchbuild.cli.main import BenchBuild
+from benchbuild.utils import spool
+
+
+@BenchBuild.subcommand("ingest")
+class BenchBuildIngest(cli.Application):
+    """Ingest the spool files of (offline) runs into the database."""
+
+    def main(self, *spool_dirs: str) -> int:
+        for spool_dir in spool_dirs or [spool.spool_dir()]:
+            num_runs = spool.ingest(spool_dir)
+            print("Ingested {0} runs from {1}".format(num_runs, spool_dir))
+        return 0
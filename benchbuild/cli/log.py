@@ -1,9 +1,108 @@
 #!/usr/bin/env python3
-""" Analyze the BB database. """
+"""
+Analyze the BB database.
+
+All filters are applied by the database and runs are streamed in batches,
+so the first run is printed right away, no matter how large the result is.
+The output of a run is only read, if it is printed.
+"""
+
+import datetime
+import json
+import re
+import sys
+import typing as tp
 
 from plumbum import cli
+from sqlalchemy.orm import defer
 
 from benchbuild.cli.main import BenchBuild
+from benchbuild.utils import blobs
+
+BATCH_SIZE = 100
+RUN_FIELDS = (
+    'id', 'command', 'project_name', 'project_group', 'variant',
+    'experiment_name', 'experiment_group', 'run_group', 'begin', 'end',
+    'status'
+)
+UNITS = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days'}
+
+
+def parse_time(value: str) -> datetime.datetime:
+    """
+    Parse a point in time, either absolute or relative to now.
+
+    Args:
+        value: An ISO 8601 date & time (2021-03-01T12:00), or a duration
+            before now (30m, 12h, 7d).
+    """
+    relative = re.fullmatch(r'(\d+)([smhd])', value.strip())
+    if relative:
+        amount, unit = relative.groups()
+        return datetime.datetime.now() - datetime.timedelta(
+            **{UNITS[unit]: int(amount)}
+        )
+    return datetime.datetime.fromisoformat(value)
+
+
+def query_runs(
+    session: tp.Any,
+    with_logs: bool = False,
+    experiments: tp.Optional[tp.List[str]] = None,
+    experiment_ids: tp.Optional[tp.List[str]] = None,
+    projects: tp.Optional[tp.Sequence[str]] = None,
+    run_groups: tp.Optional[tp.List[str]] = None,
+    statuses: tp.Optional[tp.List[str]] = None,
+    since: tp.Optional[datetime.datetime] = None,
+    until: tp.Optional[datetime.datetime] = None,
+    limit: tp.Optional[int] = None
+) -> tp.Any:
+    """
+    Query runs (and their logs) that match all given filters.
+
+    The texts of a log are not loaded with the log, see `blobs.chunks`.
+
+    Args:
+        session: The database session.
+        with_logs: Query pairs of (run, log) instead of runs.
+        experiments: Only runs of experiments with these names.
+        experiment_ids: Only runs of experiments with these ids.
+        projects: Only runs of projects with these names.
+        run_groups: Only runs of these run groups.
+        statuses: Only runs with these states, e.g., 'failed'.
+        since: Only runs that began at this time, or later.
+        until: Only runs that began before this time.
+        limit: Return at most this many runs.
+    """
+    from benchbuild.utils.schema import Run, RunLog
+
+    if with_logs:
+        query = session.query(Run, RunLog).filter(Run.id == RunLog.run_id)
+        query = query.options(
+            defer(RunLog.config), defer(RunLog.stdout), defer(RunLog.stderr)
+        )
+    else:
+        query = session.query(Run)
+
+    if experiments:
+        query = query.filter(Run.experiment_name.in_(experiments))
+    if experiment_ids:
+        query = query.filter(Run.experiment_group.in_(experiment_ids))
+    if projects:
+        query = query.filter(Run.project_name.in_(projects))
+    if run_groups:
+        query = query.filter(Run.run_group.in_(run_groups))
+    if statuses:
+        query = query.filter(Run.status.in_(statuses))
+    if since is not None:
+        query = query.filter(Run.begin >= since)
+    if until is not None:
+        query = query.filter(Run.begin < until)
+
+    query = query.order_by(Run.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.yield_per(BATCH_SIZE)
 
 
 def print_runs(query):
@@ -30,13 +129,38 @@ def print_logs(query, types=None):
         print(("command: {0}".format(run.command)))
         if "stderr" in types:
             print("StdErr:")
-            print((log.stderr))
+            blobs.stream(query.session, log, 'stderr', sys.stdout)
+            print()
         if "stdout" in types:
             print("StdOut:")
-            print((log.stdout))
+            blobs.stream(query.session, log, 'stdout', sys.stdout)
+            print()
         print()
 
 
+def as_json(value: tp.Any) -> tp.Any:
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    return str(value)
+
+
+def print_json(query, types=None):
+    """ Print one JSON object per run, for other tools to consume. """
+    if query is None:
+        return
+
+    for row in query:
+        run, log = row if types is not None else (row, None)
+        record = {field: as_json(getattr(run, field)) for field in RUN_FIELDS}
+        if log is not None:
+            record['exit_code'] = log.status
+            for name in types:
+                record[name] = blobs.text(query.session, log, name)
+        print(json.dumps(record))
+
+
 @BenchBuild.subcommand("log")
 class BenchBuildLog(cli.Application):
     """ Frontend command to the benchbuild database. """
@@ -57,10 +181,10 @@ class BenchBuildLog(cli.Application):
         """ Set the experiment ids to fetch the log for. """
         self._experiment_ids = experiment_ids
 
-    @cli.switch(["-p", "--project-id"],
+    @cli.switch(["-p", "--project-id", "-g", "--run-group"],
                 str,
                 list=True,
-                help="Project IDs to fetch the log for.")
+                help="Run groups (project IDs) to fetch the log for.")
     def project_ids(self, project_ids):
         """ Set the project ids to fetch the log for. """
         self._project_ids = project_ids
@@ -73,6 +197,26 @@ class BenchBuildLog(cli.Application):
         """ Set the output types to print. """
         self._types = types
 
+    statuses = cli.SwitchAttr(["-s", "--status"],
+                              cli.Set("completed", "running", "failed"),
+                              list=True,
+                              help="Only runs with this status.")
+    since = cli.SwitchAttr(["--since"],
+                           parse_time,
+                           default=None,
+                           help="Only runs that began at this time or later, "
+                           "e.g., 2021-03-01T12:00 or 12h.")
+    until = cli.SwitchAttr(["--until"],
+                           parse_time,
+                           default=None,
+                           help="Only runs that began before this time.")
+    limit = cli.SwitchAttr(["-n", "--limit"],
+                           int,
+                           default=None,
+                           help="Print at most this many runs.")
+    json_lines = cli.Flag(["--json"],
+                          help="Print one JSON object per run and line.")
+
     _experiments = None
     _experiment_ids = None
     _project_ids = None
@@ -80,33 +224,25 @@ class BenchBuildLog(cli.Application):
 
     def main(self, *projects):
         """ Run the log command. """
-        from benchbuild.utils.schema import Session, Run, RunLog
-
-        session = Session()
+        from benchbuild.utils.schema import Session
 
-        exps = self._experiments
-        exp_ids = self._experiment_ids
-        project_ids = self._project_ids
         types = self._types
-
-        if types is not None:
-            query = session.query(Run, RunLog).filter(Run.id == RunLog.run_id)
-        else:
-            query = session.query(Run)
-
-        if exps is not None:
-            query = query.filter(Run.experiment_name.in_(exps))
-
-        if exp_ids is not None:
-            query = query.filter(Run.experiment_group.in_(exp_ids))
-
-        if projects is not None:
-            query = query.filter(Run.project_name.in_(projects))
-
-        if project_ids is not None:
-            query = query.filter(Run.run_group.in_(project_ids))
-
-        if types is not None:
+        query = query_runs(
+            Session(),
+            with_logs=types is not None,
+            experiments=self._experiments,
+            experiment_ids=self._experiment_ids,
+            projects=projects,
+            run_groups=self._project_ids,
+            statuses=self.statuses,
+            since=self.since,
+            until=self.until,
+            limit=self.limit
+        )
+
+        if self.json_lines:
+            print_json(query, types)
+        elif types is not None:
             print_logs(query, types)
         else:
             print_runs(query)
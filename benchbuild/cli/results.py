@@ -0,0 +1,56 @@
+"""Subcommand for handling the results in the database."""
+from plumbum import cli
+
+from benchbuild.cli.main import BenchBuild
+from benchbuild.utils import export
+
+
+@BenchBuild.subcommand("results")
+class BBResults(cli.Application):
+    """Manage the results in BenchBuild's database."""
+
+    def main(self, *args: str) -> int:
+        del args
+
+        if not self.nested_command:
+            self.help()
+        return 0
+
+
+@BBResults.subcommand("export")
+class BBResultsExport(cli.Application):
+    """Export the results into columnar files, partitioned by experiment."""
+
+    experiments = cli.SwitchAttr(["-E", "--experiment"],
+                                 str,
+                                 list=True,
+                                 help="Only export experiments of this name.")
+    experiment_ids = cli.SwitchAttr(["-e", "--experiment-id"],
+                                    str,
+                                    list=True,
+                                    help="Only export experiments of this id.")
+    fmt = cli.SwitchAttr(["-f", "--format"],
+                         cli.Set(*export.WRITERS),
+                         default="parquet",
+                         help="The file format of the export.")
+    batch_size = cli.SwitchAttr(["--batch-size"],
+                                int,
+                                default=10000,
+                                help="Fetch & write this many rows at once.")
+
+    def main(self, out_dir: str) -> int:
+        try:
+            partitions = export.export(
+                out_dir,
+                fmt=self.fmt,
+                experiments=self.experiments,
+                experiment_ids=self.experiment_ids,
+                batch_size=self.batch_size
+            )
+        except export.MissingDependency as err:
+            print(err)
+            return 1
+
+        for partition in partitions:
+            print(partition)
+        return 0
@@ -51,6 +51,31 @@ class BenchBuildRun(cli.Application):
 
     pretend = cli.Flag(['p', 'pretend'], default=False)
 
+    @cli.switch(["--resume"],
+                help="Skip all steps that completed in a previous run "
+                "of the same experiment")
+    def set_resume(self):
+        CFG["journal"]["resume"] = True
+
+    @cli.switch(["--incremental"],
+                help="Skip all project variants that completed in a previous "
+                "run of the same experiment")
+    def set_incremental(self):
+        CFG["incremental"]["enable"] = True
+
+    @cli.switch(["--no-incremental"],
+                excludes=["--incremental"],
+                help="Run all project variants, even those that completed "
+                "in a previous run of the same experiment")
+    def set_no_incremental(self):
+        CFG["incremental"]["enable"] = False
+
+    @cli.switch(["--profile"],
+                help="Write a trace of all steps, "
+                "see chrome://tracing or ui.perfetto.dev")
+    def set_profile(self):
+        CFG["profile"]["enable"] = True
+
     def main(self, *projects: str) -> int:
         """Main entry point of benchbuild run."""
         experiment_names = self.experiment_names
@@ -0,0 +1,49 @@
+"""
+Add the variant of the project to every run.
+
+The variant identifies the source versions a run was built from, which
+allows the analysis to compare variants of the same project.
+"""
+import sqlalchemy as sa
+from migrate.changeset import (  # pylint: disable=unused-import
+    create_column,
+    drop_column,
+)
+from sqlalchemy import Column, MetaData, String, Table
+
+from benchbuild.utils.schema import exceptions
+
+META = MetaData()
+
+
+def upgrade(migrate_engine):
+
+    @exceptions(
+        error_messages={
+            sa.exc.ProgrammingError: "Adding column 'run.variant' failed."
+        }
+    )
+    def do_upgrade():
+        META.bind = migrate_engine
+        run = Table('run', META, autoload=True)
+        variant = Column('variant', String)
+        variant.create(run)
+        sa.Index('ix_run_variant', variant).create(migrate_engine)
+
+    do_upgrade()
+
+
+def downgrade(migrate_engine):
+
+    @exceptions(
+        error_messages={
+            sa.exc.ProgrammingError: "Removing column 'run.variant' failed."
+        }
+    )
+    def do_downgrade():
+        META.bind = migrate_engine
+        run = Table('run', META, autoload=True)
+        sa.Index('ix_run_variant', run.c.variant).drop(migrate_engine)
+        run.c.variant.drop()
+
+    do_downgrade()
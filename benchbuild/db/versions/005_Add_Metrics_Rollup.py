@@ -0,0 +1,105 @@
+"""
+Add the rollup of all metrics per experiment, project, variant & metric.
+
+The rollup is filled with the aggregates of all existing metrics.
+
+benchbuild creates missing tables before it upgrades the schema, so the
+rollup might exist already. We only fill it, if it is empty.
+"""
+import sqlalchemy as sa
+from sqlalchemy import (
+    Column,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+)
+
+from benchbuild.utils.schema import GUID, exceptions
+
+META = MetaData()
+EXPERIMENT = Table(
+    'experiment', META, Column('id', GUID(as_uuid=True), primary_key=True)
+)
+ROLLUP = Table(
+    'metrics_rollup', META,
+    Column(
+        'experiment_group',
+        GUID(as_uuid=True),
+        ForeignKey('experiment.id', ondelete="CASCADE", onupdate="CASCADE"),
+        primary_key=True,
+        index=True
+    ), Column('project_name', String, primary_key=True),
+    Column('project_group', String, primary_key=True),
+    Column('variant', String, primary_key=True, default=''),
+    Column('name', String, primary_key=True, index=True),
+    Column('count', Integer, nullable=False),
+    Column('sum', Float, nullable=False),
+    Column('sum_sq', Float, nullable=False), Column('min', Float),
+    Column('max', Float),
+    Index(
+        'ix_metrics_rollup_project', 'project_name', 'project_group', 'name'
+    )
+)
+
+
+def backfill(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+    run = Table('run', meta, autoload=True)
+    metric = Table('metrics', meta, autoload=True)
+    key = [
+        run.c.experiment_group, run.c.project_name, run.c.project_group,
+        sa.func.coalesce(run.c.variant, ''), metric.c.name
+    ]
+    query = sa.select(key + [
+        sa.func.count(metric.c.value),
+        sa.func.sum(metric.c.value),
+        sa.func.sum(metric.c.value * metric.c.value),
+        sa.func.min(metric.c.value),
+        sa.func.max(metric.c.value)
+    ]).select_from(metric.join(run, run.c.id == metric.c.run_id)).where(
+        metric.c.value.isnot(None)
+    ).where(run.c.experiment_group.isnot(None)).group_by(*key)
+
+    migrate_engine.execute(
+        ROLLUP.insert().from_select([
+            'experiment_group', 'project_name', 'project_group', 'variant',
+            'name', 'count', 'sum', 'sum_sq', 'min', 'max'
+        ], query)
+    )
+
+
+def upgrade(migrate_engine):
+
+    @exceptions(
+        error_messages={
+            sa.exc.ProgrammingError: "Adding table 'metrics_rollup' failed."
+        }
+    )
+    def do_upgrade():
+        META.bind = migrate_engine
+        ROLLUP.create(checkfirst=True)
+        rows = migrate_engine.execute(
+            sa.select([sa.func.count()]).select_from(ROLLUP)
+        ).scalar()
+        if rows == 0:
+            backfill(migrate_engine)
+
+    do_upgrade()
+
+
+def downgrade(migrate_engine):
+
+    @exceptions(
+        error_messages={
+            sa.exc.ProgrammingError: "Removing table 'metrics_rollup' failed."
+        }
+    )
+    def do_downgrade():
+        META.bind = migrate_engine
+        ROLLUP.drop()
+
+    do_downgrade()
@@ -0,0 +1,58 @@
+"""
+Store the texts of the run log compressed & deduplicated in blobs.
+
+Existing logs keep their texts, new logs reference blobs by hash.
+
+benchbuild creates missing tables before it upgrades the schema, so the
+blob table might exist already.
+"""
+import sqlalchemy as sa
+from migrate.changeset import (  # pylint: disable=unused-import
+    create_column,
+    drop_column,
+)
+from sqlalchemy import Column, Integer, LargeBinary, MetaData, String, Table
+
+from benchbuild.utils.schema import exceptions
+
+META = MetaData()
+BLOB = Table(
+    'blob', META, Column('hash', String(64), primary_key=True),
+    Column('encoding', String, nullable=False), Column('size', Integer),
+    Column('data', LargeBinary)
+)
+COLUMNS = ['config_hash', 'stderr_hash', 'stdout_hash']
+
+
+def upgrade(migrate_engine):
+
+    @exceptions(
+        error_messages={
+            sa.exc.ProgrammingError: "Adding table 'blob' failed."
+        }
+    )
+    def do_upgrade():
+        META.bind = migrate_engine
+        BLOB.create(checkfirst=True)
+        log = Table('log', META, autoload=True)
+        for name in COLUMNS:
+            Column(name, String(64)).create(log)
+
+    do_upgrade()
+
+
+def downgrade(migrate_engine):
+
+    @exceptions(
+        error_messages={
+            sa.exc.ProgrammingError: "Removing table 'blob' failed."
+        }
+    )
+    def do_downgrade():
+        META.bind = migrate_engine
+        log = Table('log', META, autoload=True)
+        for name in COLUMNS:
+            log.c[name].drop()
+        BLOB.drop()
+
+    do_downgrade()
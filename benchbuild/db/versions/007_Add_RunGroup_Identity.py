@@ -0,0 +1,62 @@
+"""
+Add the identity of what a run group measured to every run group.
+
+Incremental experiments skip all project variants with a completed run
+group of the same experiment name & configuration. Existing run groups
+have no identity and are never skipped.
+"""
+import sqlalchemy as sa
+from migrate.changeset import (  # pylint: disable=unused-import
+    create_column,
+    drop_column,
+)
+from sqlalchemy import Column, MetaData, String, Table
+
+from benchbuild.utils.schema import exceptions
+
+META = MetaData()
+COLUMNS = ('experiment_name', 'project_name', 'project_group', 'variant',
+           'config_hash')
+
+
+def upgrade(migrate_engine):
+
+    @exceptions(
+        error_messages={
+            sa.exc.ProgrammingError:
+                "Adding the identity of run groups failed."
+        }
+    )
+    def do_upgrade():
+        META.bind = migrate_engine
+        rungroup = Table('rungroup', META, autoload=True)
+        for name in COLUMNS:
+            column_type = String(64) if name == 'config_hash' else String
+            Column(name, column_type).create(rungroup)
+        sa.Index(
+            'ix_rungroup_identity', rungroup.c.experiment_name,
+            rungroup.c.config_hash, rungroup.c.status
+        ).create(migrate_engine)
+
+    do_upgrade()
+
+
+def downgrade(migrate_engine):
+
+    @exceptions(
+        error_messages={
+            sa.exc.ProgrammingError:
+                "Removing the identity of run groups failed."
+        }
+    )
+    def do_downgrade():
+        META.bind = migrate_engine
+        rungroup = Table('rungroup', META, autoload=True)
+        for index in list(rungroup.indexes):
+            if index.name == 'ix_rungroup_identity':
+                index.drop(migrate_engine)
+                rungroup.indexes.discard(index)
+        for name in reversed(COLUMNS):
+            rungroup.c[name].drop()
+
+    do_downgrade()
@@ -3,9 +3,11 @@
 from benchbuild.cli.bootstrap import BenchBuildBootstrap
 from benchbuild.cli.config import BBConfig
 from benchbuild.cli.experiment import BBExperiment
+from benchbuild.cli.ingest import BenchBuildIngest
 from benchbuild.cli.log import BenchBuildLog
 from benchbuild.cli.main import BenchBuild
 from benchbuild.cli.project import BBProject
+from benchbuild.cli.results import BBResults
 from benchbuild.cli.run import BenchBuildRun
 from benchbuild.cli.slurm import Slurm
 from benchbuild.environments.entrypoints import cli
@@ -18,8 +20,10 @@ def main(*args):
     BenchBuild.subcommand('config', BBConfig)
     BenchBuild.subcommand('container', cli.BenchBuildContainer)
     BenchBuild.subcommand('experiment', BBExperiment)
+    BenchBuild.subcommand('ingest', BenchBuildIngest)
     BenchBuild.subcommand('log', BenchBuildLog)
     BenchBuild.subcommand('project', BBProject)
+    BenchBuild.subcommand('results', BBResults)
     BenchBuild.subcommand('run', BenchBuildRun)
     BenchBuild.subcommand('slurm', Slurm)
 
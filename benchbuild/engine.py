@@ -1,13 +1,26 @@
 """
 Orchestrate experiment execution.
 """
+import contextlib
+import datetime
 import typing as tp
 
 import attr
 
 from benchbuild.experiment import Experiment
 from benchbuild.project import Project
-from benchbuild.utils import actions, tasks
+from benchbuild.settings import CFG
+from benchbuild.source import snapshot
+from benchbuild.utils import (
+    actions,
+    incremental,
+    jobserver,
+    journal,
+    profiler,
+    spool,
+    tasks,
+)
+from benchbuild.utils.settings import get_number_of_jobs
 
 ExperimentCls = tp.Type[Experiment]
 Experiments = tp.List[ExperimentCls]
@@ -28,6 +41,13 @@ class Experimentator:
     def plan(self) -> Actions:
         if not self._plan:
             self._plan = tasks.generate_plan(self.experiments, self.projects)
+            num_pruned = incremental.prune(self._plan)
+            if num_pruned:
+                print(
+                    "Skipping {} project variants that completed before, "
+                    "use --no-incremental to run them again.".
+                    format(num_pruned)
+                )
 
         return self._plan
 
@@ -38,10 +58,32 @@ class Experimentator:
 
     def start(self) -> StepResults:
         p = self.plan()
-        # Prepare project environment.
-        return tasks.execute_plan(p)
+        journal.attach(p)
+
+        with contextlib.ExitStack() as stack:
+            if CFG["profile"]["enable"]:
+                stack.enter_context(profiler.trace(profiler.trace_path()))
+
+            if spool.enabled():
+                stack.enter_context(spool.scope())
+
+            if len(self.experiments) > 1 and CFG["source"]["snapshots"]:
+                stack.enter_context(snapshot.scope())
+
+            num_processes = int(CFG["parallel_processes"])
+            if num_processes > 1 and CFG["jobserver"]:
+                jobs = get_number_of_jobs(CFG)
+                stack.enter_context(jobserver.serve(jobs, num_processes))
+            results = tasks.execute_plan(p)
+        return results
 
     def print_plan(self) -> None:
         p = self.plan()
         print("Number of actions to execute: {}".format(self.num_actions))
+        makespan, unknown = tasks.predict(p)
+        print(
+            "Predicted makespan: {} ({} projects without history)".format(
+                datetime.timedelta(seconds=round(makespan)), unknown
+            )
+        )
         print(*p)
@@ -26,6 +26,7 @@ class HelloExperiment(Experiment):
 """
 import collections
 import copy
+import functools as ft
 import typing as tp
 import uuid
 from abc import abstractmethod
@@ -33,9 +34,11 @@ from abc import abstractmethod
 import attr
 
 import benchbuild.utils.actions as actns
+from benchbuild import plugins
 from benchbuild.environments.domain import declarative
 from benchbuild.project import build_dir
 from benchbuild.settings import CFG
+from benchbuild.utils import incremental
 from benchbuild.utils.requirements import Requirement
 
 from . import source
@@ -166,35 +169,62 @@ class Experiment(metaclass=ExperimentRegistry):
     def actions(self) -> Actions:
         """
         Common setup required to run this experiment on all projects.
+
+        The actions of each project variant are created on demand, only the
+        first variant of each project serves as prototype for counting.
         """
         actions: Actions = []
 
         for prj_cls in self.projects:
-            prj_actions: Actions = []
+            prototype: tp.Optional[actns.RequireAllOnDemand] = None
 
-            for variant_context in self.sample(prj_cls):
+            for variant_context in self.iter_sample(prj_cls):
                 version_str = source.to_str(*variant_context.values())
-
-                p = prj_cls(variant_context)
-                p.builddir = build_dir(self, p)
-                atomic_actions: Actions = [
-                    actns.Clean(p),
-                    actns.MakeBuildDir(p),
-                    actns.Echo(
-                        message="Selected {0} with version {1}".
-                        format(p.name, version_str)
+                chain = actns.RequireAllOnDemand(
+                    ft.partial(
+                        self.actions_for_variant, prj_cls, variant_context
                     ),
-                    actns.ProjectEnvironment(p),
-                ]
-                atomic_actions.extend(self.actions_for_project(p))
-
-                prj_actions.append(actns.RequireAll(actions=atomic_actions))
-            actions.extend(prj_actions)
+                    project_cls=prj_cls,
+                    project_id=incremental.project_id(
+                        prj_cls.NAME, prj_cls.GROUP, version_str
+                    )
+                )
+                if prototype is None:
+                    prototype = chain
+                    prototype.create()
+                chain.num_actions = len(prototype)
+                actions.append(chain)
 
         if actions:
             actions.append(actns.CleanExtra(self))
         return actions
 
+    def actions_for_variant(
+        self, prj_cls: ProjectT, variant_context: source.VariantContext
+    ) -> Actions:
+        """
+        Create the project for a variant and all actions it needs.
+
+        Args:
+            prj_cls: The project type we want to run.
+            variant_context: The variant of the project.
+        """
+        version_str = source.to_str(*variant_context.values())
+
+        p = prj_cls(variant_context)
+        p.builddir = build_dir(self, p)
+        atomic_actions: Actions = [
+            actns.Clean(p),
+            actns.MakeBuildDir(p),
+            actns.Echo(
+                message="Selected {0} with version {1}".
+                format(p.name, version_str)
+            ),
+            actns.ProjectEnvironment(p),
+        ]
+        atomic_actions.extend(self.actions_for_project(p))
+        return atomic_actions
+
     @classmethod
     def sample(cls, prj_cls: ProjectT) -> tp.List[source.VariantContext]:
         """
@@ -208,13 +238,40 @@ class Experiment(metaclass=ExperimentRegistry):
         Returns:
             A list of all sampled Variants.
         """
-        variants = list(source.product(*prj_cls.SOURCE))
+        return list(cls._iter_variants(prj_cls))
+
+    @classmethod
+    def iter_sample(
+        cls, prj_cls: ProjectT
+    ) -> tp.Iterator[source.VariantContext]:
+        """
+        Sample all versions provided by the project on demand.
+
+        Experiments that override `sample` are sampled by their override.
+
+        Args:
+            prj_cls: The project type to enumerate all versions from.
+
+        Returns:
+            An iterator over all sampled Variants.
+        """
+        owner = next(klass for klass in cls.__mro__ if 'sample' in vars(klass))
+        if owner is not Experiment:
+            return iter(cls.sample(prj_cls))
+        return cls._iter_variants(prj_cls)
+
+    @classmethod
+    def _iter_variants(
+        cls, prj_cls: ProjectT
+    ) -> tp.Iterator[source.VariantContext]:
+        variants = source.product(*prj_cls.SOURCE)
         if bool(CFG["versions"]["full"]):
-            return [source.context(*var) for var in variants]
+            return (source.context(*var) for var in variants)
 
-        if len(variants) > 0:
-            return [source.context(*variants[0])]
-        raise ValueError('At least one variant is required!')
+        first = next(iter(variants), None)
+        if first is None:
+            raise ValueError('At least one variant is required!')
+        return iter([source.context(*first)])
 
     def default_runtime_actions(self, project: Project) -> Actions:
         """Return a series of actions for a run time experiment."""
@@ -247,4 +304,5 @@ class Configuration:
 
 def discovered() -> tp.Dict[str, tp.Type[Experiment]]:
     """Return all discovered experiments."""
+    plugins.discover()
     return ExperimentRegistry.experiments
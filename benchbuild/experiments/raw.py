@@ -2,18 +2,20 @@
 The 'raw' Experiment.
 
 This experiment is the basic experiment in the benchbuild study. It simply runs
-all projects after compiling it with -O3. The binaries are wrapped
-with the time command and results are written to the database.
+all projects after compiling it with -O3. The resources used by the binaries
+are reported by the kernel and written to the database.
 
 This forms the baseline numbers for the other experiments.
 
 Measurements
 ------------
 
-3 Metrics are generated during this experiment:
+10 Metrics are generated during this experiment:
     time.user_s - The time spent in user space in seconds (aka virtual time)
     time.system_s - The time spent in kernel space in seconds (aka system time)
     time.real_s - The time spent overall in seconds (aka Wall clock)
+    rusage.* - Peak memory, page faults, context switches & block I/O, see
+        `benchbuild.extensions.time`.
 """
 from benchbuild.environments.domain.declarative import ContainerImage
 from benchbuild.experiment import Experiment
@@ -1,7 +1,7 @@
 """
 Extension base-classes for compile-time and run-time experiments.
 """
-import collections as c
+import collections.abc as c
 import logging
 import typing as tp
 from abc import ABCMeta
@@ -6,7 +6,7 @@ import yaml
 from plumbum.commands.base import BoundCommand
 
 from benchbuild.extensions import base
-from benchbuild.utils import db, run
+from benchbuild.utils import compilercache, db, run
 
 if TYPE_CHECKING:
     from benchbuild.project import Project
@@ -21,6 +21,9 @@ class RunCompiler(base.Extension):
     This extension silences a few warnings, e.g., unused-arguments and
     handles database tracking for compiler commands. It is used as the default
     action for compiler execution.
+
+    With the compiler cache enabled, calls we know already are not executed,
+    see `benchbuild.utils.compilercache`.
     """
 
     def __init__(
@@ -32,6 +35,10 @@ class RunCompiler(base.Extension):
     ):
         self.project = project
         self.experiment = experiment
+        # We are called by compiler wrappers. Their settings do not know
+        # where our build directory, and therefore the cache, is.
+        self.cache_dir = compilercache.cache_dir() \
+            if compilercache.enabled() else None
 
         super().__init__(*extensions, config=config)
 
@@ -52,10 +59,23 @@ class RunCompiler(base.Extension):
         new_command = new_command[self.project.cflags]
         new_command = new_command[self.project.ldflags]
 
+        entry = compilercache.entry_of(
+            self.cache_dir, command, args, self.project.cflags,
+            self.project.ldflags
+        )
         with run.track_execution(
             new_command, self.project, self.experiment, **kwargs
         ) as _run:
-            run_info = _run()
+            cached = compilercache.restore(entry) if entry else None
+            if cached is not None:
+                run_info = _run.replay(**cached)
+            else:
+                run_info = _run()
+                if entry:
+                    compilercache.store(
+                        entry, run_info.retcode, run_info.stdout,
+                        run_info.stderr
+                    )
             if self.config:
                 LOG.info(
                     yaml.dump(
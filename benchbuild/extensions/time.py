@@ -1,61 +1,50 @@
 import logging
-import typing as tp
-
-import parse
 
 from benchbuild.extensions import base
-from benchbuild.utils import db
-from benchbuild.utils.cmd import time
+from benchbuild.utils import db, spool
 
 LOG = logging.getLogger(__name__)
 
 
 class RunWithTime(base.Extension):
-    """Wrap a command with time and store the timings in the database."""
+    """
+    Store the resources used by a command in the database.
+
+    We do not wrap the command. The kernel reports its resource usage, when
+    the command is reaped with `os.wait4`, see `benchbuild.utils.process`.
+    All metrics of a call are stored in a single batch:
+        time.user_s, time.system_s & time.real_s - The times in seconds.
+        rusage.max_rss_kb - The peak resident set size in kilobytes.
+        rusage.minor_faults & rusage.major_faults - The page faults.
+        rusage.voluntary_switches & rusage.involuntary_switches - The
+            context switches.
+        rusage.block_inputs & rusage.block_outputs - The block I/O
+            operations.
+    """
 
     def __call__(self, binary_command, *args, may_wrap=True, **kwargs):
-        time_tag = "BENCHBUILD: "
+        res = self.call_next(binary_command, *args, **kwargs)
         if may_wrap:
-            run_cmd = time["-f", time_tag + "%U-%S-%e", binary_command]
-
-        def handle_timing(run_infos):
-            """Takes care of the formating for the timing statistics."""
-            from benchbuild.utils import schema as s
-
-            session = s.Session()
-            for run_info in run_infos:
-                if may_wrap:
-                    timings = fetch_time_output(
-                        time_tag, time_tag + "{:g}-{:g}-{:g}",
-                        run_info.stderr.split("\n")
-                    )
-                    if timings:
-                        db.persist_time(run_info.db_run, session, timings)
-                    else:
-                        LOG.warning("No timing information found.")
-            session.commit()
-            return run_infos
-
-        res = self.call_next(run_cmd, *args, **kwargs)
-        return handle_timing(res)
+            handle_timing(res)
+        return res
 
     def __str__(self):
         return "Time execution of wrapped binary"
 
 
-def fetch_time_output(marker: str, format_s: str,
-                      ins: tp.List[str]) -> tp.List[parse.Match]:
-    """
-    Fetch the output /usr/bin/time from a.
+def handle_timing(run_infos):
+    """Store the resource usage of all measured runs."""
+    from benchbuild.utils import schema as s
 
-    Args:
-        marker: The marker that limits the time output
-        format_s: The format string used to parse the timings
-        ins: A list of lines we look for the output.
+    measurements = [(run_info.db_run, run_info.rusage, run_info.wall)
+                    for run_info in run_infos
+                    if getattr(run_info, 'rusage', None) is not None]
+    if len(measurements) < len(run_infos):
+        LOG.warning("No timing information found.")
+    if not measurements:
+        return
 
-    Returns:
-        A list of timing tuples
-    """
-    timings = [x for x in ins if marker in x]
-    res = [parse.parse(format_s, t) for t in timings]
-    return [_f for _f in res if _f]
+    session = None if spool.enabled() else s.Session()
+    db.persist_rusage(session, measurements)
+    if session is not None:
+        session.commit()
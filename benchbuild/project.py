@@ -29,7 +29,7 @@ from plumbum import local
 from plumbum.path.local import LocalPath
 from pygtrie import StringTrie
 
-from benchbuild import extensions, source
+from benchbuild import extensions, plugins, source
 from benchbuild.environments.domain.declarative import ContainerImage
 from benchbuild.settings import CFG
 from benchbuild.source import primary, Git
@@ -398,6 +398,7 @@ def __split_project_input__(
 
 def discovered() -> tp.Dict[str, ProjectT]:
     """Return all discovered projects."""
+    plugins.discover()
     return dict(ProjectRegistry.projects)
 
 
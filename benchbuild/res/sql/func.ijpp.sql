@@ -128,6 +128,8 @@ RETURN QUERY
 END $BODY$ LANGUAGE plpgsql;
 
 
+-- The stderr is NULL for runs that store their output compressed in the
+-- table 'blob' (db.log_blobs). Read it with 'benchbuild log' instead.
 DROP FUNCTION IF EXISTS ijpp_db_export_per_config(exp_id UUID, configs VARCHAR[]);
 CREATE OR REPLACE FUNCTION ijpp_db_export_per_config(exp_id UUID, configs VARCHAR[])
 RETURNS TABLE (
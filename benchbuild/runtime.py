@@ -0,0 +1,122 @@
+"""
+Entry point for the scripts of wrapped binaries.
+
+Every call of a wrapped binary starts a new interpreter that executes the
+wrapper script. The script only imports this module. Everything else, e.g.,
+the database (sqlalchemy & migrate) or the templates (jinja2), is imported
+when a call actually needs it, e.g., when its run is stored.
+
+Check the import time of this module with `benchmarks/wrapper_startup.py`.
+"""
+import logging
+import os
+import typing as tp
+
+import dill
+
+if tp.TYPE_CHECKING:
+    from benchbuild.project import Project  # pylint: disable=unused-import
+    from benchbuild.utils.run import RunInfo  # pylint: disable=unused-import
+
+LOG = logging.getLogger(__name__)
+
+MANIFEST_MAGIC = "benchbuild-manifest"
+MANIFEST_VERSION = 1
+
+__LOADED__: tp.Dict[tp.Tuple[str, int, int], tp.Any] = {}
+
+
+def manifest_header() -> bytes:
+    """The first line of every manifest we write."""
+    return f"{MANIFEST_MAGIC} {MANIFEST_VERSION}\n".encode('utf-8')
+
+
+def loads(data: bytes) -> tp.Any:
+    """
+    Unpickle a manifest, or a plain pickle.
+
+    Raises:
+        ValueError: If another version of benchbuild wrote the manifest.
+    """
+    if not data.startswith(MANIFEST_MAGIC.encode('utf-8')):
+        return dill.loads(data)
+
+    header, _, payload = data.partition(b"\n")
+    if header + b"\n" != manifest_header():
+        raise ValueError(f"Unsupported manifest: {header.decode()}")
+    return dill.loads(payload)
+
+
+def load(filename: str) -> tp.Optional[tp.Any]:
+    """Load a pickled obj from the filesystem.
+
+    You better know what you expect from the given pickle, because we don't
+    check it.
+
+    Every version of a file is unpickled only once per process, e.g., the
+    fork server shares the manifest of a project between all wrappers of
+    the project.
+
+    Args:
+        filename (str): The filename we load the object from.
+
+    Returns:
+        The object we were able to unpickle, else None.
+    """
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        LOG.error("load object - File '%s' does not exist.", filename)
+        return None
+
+    key = (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
+    if key not in __LOADED__:
+        with open(filename, 'rb') as obj_file:
+            try:
+                __LOADED__[key] = loads(obj_file.read())
+            except ValueError as err:
+                LOG.error("load object - %s: '%s'", err, filename)
+                return None
+    return __LOADED__[key]
+
+
+def configure() -> None:
+    """Configure logging, like the benchbuild command does."""
+    from benchbuild.utils import log
+
+    log.configure()
+    log.set_defaults()
+
+
+def persist_project(project: 'Project') -> None:
+    """Store the project in the database."""
+    from benchbuild.utils import db
+
+    db.persist_project(project)
+
+
+def exit_code_from_run_infos(
+    run_infos: tp.Union['RunInfo', tp.List['RunInfo']]
+) -> int:
+    """Generate a single exit code from a list of RunInfo objects.
+
+    Takes a list of RunInfos and returns the exit code that is furthest away
+    from 0.
+
+    Args:
+        run_infos: The RunInfo of each command a call executed.
+
+    Returns:
+        int: The exit code of the call.
+    """
+    assert run_infos is not None
+
+    if not hasattr(run_infos, "__iter__"):
+        return run_infos.retcode
+
+    rcs = [ri.retcode for ri in run_infos]
+    max_rc = max(rcs)
+    min_rc = min(rcs)
+    if max_rc == 0:
+        return min_rc
+    return max_rc
@@ -49,6 +49,12 @@ CFG = s.Configuration(
             "desc": "Proccesses use to work on execution plans.",
             "default": 1
         },
+        "jobserver": {
+            "desc":
+                "Share a GNU make jobserver with 'jobs' slots between all "
+                "parallel processes.",
+            "default": True
+        },
         "experiments": {
             "default": {
                 "empty": uuid.uuid4()
@@ -120,6 +126,151 @@ CFG["compiler"] = {
     }
 }
 
+CFG["source"] = {
+    "snapshots": {
+        "default": True,
+        "desc":
+            "Prepare each source version once per run and share it between "
+            "all experiments with a (copy-on-write) copy."
+    }
+}
+
+CFG["journal"] = {
+    "enable": {
+        "default": True,
+        "desc": "Record all completed steps of a plan in a journal."
+    },
+    "resume": {
+        "default": False,
+        "desc": "Skip all steps the journal records as completed."
+    },
+    "path": {
+        "default": None,
+        "desc":
+            "Directory of all journals. "
+            "Defaults to the subdirectory '.journal' of the build directory."
+    }
+}
+
+CFG["incremental"] = {
+    "enable": {
+        "default": False,
+        "desc":
+            "Skip all project variants with a completed run group of the "
+            "same experiment name & configuration."
+    },
+    "config": {
+        "default": ["compiler", "env", "jobs", "sequence"],
+        "desc":
+            "The configuration options that influence the results. "
+            "Run groups with a different configuration are executed again."
+    }
+}
+
+CFG["forkserver"] = {
+    "enable": {
+        "default": False,
+        "desc":
+            "Serve all calls of wrapped binaries from a pre-warmed fork "
+            "server, instead of starting a python interpreter per call."
+    },
+    "socket": {
+        "default": None,
+        "desc": "The socket of the running fork server. Set by benchbuild."
+    }
+}
+
+CFG["buildcache"] = {
+    "enable": {
+        "default": False,
+        "desc":
+            "Reuse the build directory of a previous compilation with the "
+            "same project variant, flags, compiler and compiler extension."
+    },
+    "path": {
+        "default": None,
+        "desc":
+            "Directory of the build cache. "
+            "Defaults to the subdirectory '.buildcache' of the build directory."
+    },
+    "link": {
+        "default": "reflink",
+        "desc":
+            "How to share files with the build cache: 'reflink' (copy-on-write,"
+            " if supported by the filesystem) or 'hardlink'. With hardlinks,"
+            " only build artifacts (executables, objects & libraries) are"
+            " shared, read-only. Everything else is copied."
+    }
+}
+
+CFG["compilercache"] = {
+    "enable": {
+        "default": False,
+        "desc":
+            "Reuse the object file & the result of a previous compiler call "
+            "with the same preprocessed source, flags and compiler. "
+            "Every call runs the preprocessor once more to find its entry."
+    },
+    "path": {
+        "default": None,
+        "desc":
+            "Directory of the compiler cache. "
+            "Defaults to the subdirectory '.compilercache' of the build "
+            "directory."
+    }
+}
+
+CFG["profile"] = {
+    "enable": {
+        "default": False,
+        "desc":
+            "Write a trace of all steps (wall time, CPU time, peak memory) "
+            "in Chrome's trace event format."
+    },
+    "path": {
+        "default": None,
+        "desc":
+            "Path of the trace file. "
+            "Defaults to 'trace-<timestamp>.json' inside the build directory."
+    }
+}
+
+CFG["scheduler"] = {
+    "policy": {
+        "default": "lpt",
+        "desc":
+            "Order of ready projects: 'lpt' (longest estimated duration "
+            "first, based on the database) or 'plan' (order of the plan)."
+    }
+}
+
+CFG["resources"] = {
+    "cpus": {
+        "default": 0,
+        "desc":
+            "CPUs all parallel processes may keep busy together. "
+            "Defaults to the number of jobs."
+    },
+    "memory": {
+        "default": "0",
+        "desc":
+            "Memory all parallel processes may use together, "
+            "e.g., '64G'. Defaults to the physical memory of this machine."
+    },
+    "learn": {
+        "default": True,
+        "desc":
+            "Learn the budget (CPUs & peak memory) of every project from "
+            "previous executions."
+    },
+    "ledger": {
+        "default": None,
+        "desc":
+            "File we store learned budgets in. "
+            "Defaults to '.budgets.json' inside the build directory."
+    }
+}
+
 CFG["unionfs"] = {
     "enable": {
         "default": False,
@@ -148,6 +299,87 @@ CFG['db'] = {
     "create_functions": {
         "default": False,
         "desc": "Should we recreate our SQL functions from scratch?"
+    },
+    "batch_writes": {
+        "default": False,
+        "desc":
+            "Buffer runs, logs, metrics & configs and write them in bulk, "
+            "instead of one transaction per row."
+    },
+    "batch_size": {
+        "default": 1000,
+        "desc": "Write buffered rows, as soon as we have this many."
+    },
+    "batch_interval": {
+        "default": 1.0,
+        "desc":
+            "Write buffered rows, if the oldest is older than this "
+            "(in seconds)."
+    },
+    "spool": {
+        "default": False,
+        "desc":
+            "Write runs, logs, metrics & configs to spool files instead of "
+            "the database. Wrapped binaries never open a database session."
+    },
+    "spool_dir": {
+        "default": "",
+        "desc":
+            "Directory of the spool files. Defaults to '.spool' inside the "
+            "build directory."
+    },
+    "spool_ingest": {
+        "default": True,
+        "desc":
+            "Ingest spool files into the database at the end of every step. "
+            "Disable this for offline runs and use 'benchbuild ingest' later."
+    },
+    "rollup": {
+        "default": True,
+        "desc":
+            "Maintain the aggregates of all metrics per experiment, project, "
+            "variant & metric in the table 'metrics_rollup'."
+    },
+    "log_blobs": {
+        "default": False,
+        "desc":
+            "Store the output & the configuration of every run compressed "
+            "and deduplicated in the table 'blob', instead of the run log. "
+            "The SQL functions (db.create_functions) and other readers of "
+            "the run log cannot read these texts, use 'benchbuild log'."
+    },
+    "blob_compression": {
+        "default": "gzip",
+        "desc":
+            "Compression of new blobs: 'gzip', 'zstd' (requires zstandard) "
+            "or 'none'."
+    },
+    "sqlite_journal_mode": {
+        "default": "wal",
+        "desc": "Journal mode of file-backed SQLite databases."
+    },
+    "sqlite_synchronous": {
+        "default": "normal",
+        "desc": "Synchronous setting of file-backed SQLite databases."
+    },
+    "sqlite_busy_timeout": {
+        "default": 60.0,
+        "desc":
+            "Seconds we wait for the lock of a file-backed SQLite database, "
+            "before we fail."
+    },
+    "sqlite_single_writer": {
+        "default": False,
+        "desc":
+            "Spool all results and let a single process at a time write "
+            "them to a file-backed SQLite database. Results are written to "
+            "the database when a step ends, like with db.spool."
+    },
+    "schema_marker": {
+        "default": True,
+        "desc":
+            "Remember a validated schema in the database, so later "
+            "processes skip all schema & migration checks."
     }
 }
 
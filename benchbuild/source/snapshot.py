@@ -0,0 +1,91 @@
+"""
+Share the preparation of sources between experiments.
+
+If several experiments run the same project variant, every experiment
+prepares the same source versions in its own build directory, e.g., with a
+full `git clone` and `checkout`.
+
+Inside a snapshot scope, each (source, version) is prepared once into a
+snapshot directory. Build directories receive a copy of the snapshot, which
+is copy-on-write (reflink) on filesystems that support it. Snapshots are
+never modified after their preparation and are removed, when the scope ends.
+"""
+import contextlib
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import typing as tp
+
+import plumbum as pb
+
+from benchbuild.utils.path import copy_tree, flocked
+
+from . import base
+
+LOG = logging.getLogger(__name__)
+
+__SNAPSHOT_DIR__: tp.Optional[str] = None
+
+
+def snapshot_key(src: base.FetchableSource, version: str) -> str:
+    """Identify the tree of a source at a given version."""
+    ident = f'{type(src).__qualname__}:{src.local}:{src.remote}@{version}'
+    return hashlib.sha256(ident.encode('utf-8')).hexdigest()
+
+
+@contextlib.contextmanager
+def scope() -> tp.Iterator[str]:
+    """
+    Share source preparation for all steps executed inside this context.
+
+    Yields:
+        The directory that contains all snapshots.
+    """
+    global __SNAPSHOT_DIR__  # pylint: disable=global-statement
+
+    prefix = base.target_prefix()
+    os.makedirs(prefix, exist_ok=True)
+    snapshot_dir = tempfile.mkdtemp(prefix='snapshots-', dir=prefix)
+    __SNAPSHOT_DIR__ = snapshot_dir
+    try:
+        yield snapshot_dir
+    finally:
+        __SNAPSHOT_DIR__ = None
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+
+def version(
+    src: base.FetchableSource, target_dir: str, version_str: str
+) -> pb.LocalPath:
+    """
+    Prepare a source version in the target directory.
+
+    Outside of a snapshot scope, this is the same as `src.version`.
+
+    Args:
+        src: The source we want to prepare.
+        target_dir: The directory the source will be prepared in.
+        version_str: The version of the source.
+
+    Returns:
+        The path of the prepared source.
+    """
+    if __SNAPSHOT_DIR__ is None:
+        return src.version(target_dir, version_str)
+
+    snapshot = os.path.join(__SNAPSHOT_DIR__, snapshot_key(src, version_str))
+    with flocked(snapshot + '.lock'):
+        if not os.path.isdir(snapshot):
+            LOG.debug("Preparing snapshot of %s @ %s", src.local, version_str)
+            tmp_snapshot = f'{snapshot}.tmp-{os.getpid()}'
+            try:
+                os.makedirs(tmp_snapshot)
+                src.version(tmp_snapshot, version_str)
+                os.rename(tmp_snapshot, snapshot)
+            finally:
+                shutil.rmtree(tmp_snapshot, ignore_errors=True)
+
+    copy_tree(snapshot, str(target_dir))
+    return pb.local.path(target_dir) / src.local
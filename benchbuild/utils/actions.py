@@ -29,8 +29,16 @@ import sqlalchemy as sa
 from plumbum import ProcessExecutionError
 
 from benchbuild import signals, source
+from benchbuild.source import snapshot
 from benchbuild.settings import CFG
-from benchbuild.utils import container, db, run
+from benchbuild.utils import (
+    buildcache,
+    container,
+    db,
+    forkserver,
+    run,
+    spool,
+)
 from benchbuild.utils.cmd import mkdir, rm, rmdir
 
 LOG = logging.getLogger(__name__)
@@ -133,11 +141,11 @@ def notify_step_begin_end(
         for begin_listener in on_step_begin:
             begin_listener(self)
 
-        res = func(self, *args, **kwargs)
-
-        for end_listener in on_step_end:
-            end_listener(self, func)
-        return res
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            for end_listener in on_step_end:
+                end_listener(self, func)
 
     return wrapper
 
@@ -168,6 +176,32 @@ def log_before_after(
     return func_decorator
 
 
+def journaled(
+    func: DecoratedFunction[StepResultList]
+) -> DecoratedFunction[StepResultList]:
+    """Skip steps that were completed already & record completed steps."""
+
+    @ft.wraps(func)
+    def wrapper(self: 'Step', *args: tp.Any,
+                **kwargs: tp.Any) -> StepResultList:
+        """Wrapper stub."""
+        entry = self.journal
+        if entry is None:
+            return func(self, *args, **kwargs)
+
+        if entry.completed:
+            LOG.info("Skipping '%s', it completed before.", entry.key)
+            self.status = StepResult.OK
+            return [StepResult.OK]
+
+        res = func(self, *args, **kwargs)
+        if not step_has_failed(res):
+            entry.record()
+        return res
+
+    return wrapper
+
+
 class StepClass(type):
     """Decorate `steps` with logging and result conversion."""
 
@@ -206,11 +240,11 @@ class StepClass(type):
 
         if name_ and description_:
             attrs['__call__'] = log_before_after(name_, description_)(
-                to_step_result(original_call)
+                journaled(to_step_result(original_call))
             )
         else:
             original_call = attrs['__call__']
-            attrs['__call__'] = to_step_result(original_call)
+            attrs['__call__'] = journaled(to_step_result(original_call))
 
         attrs['__str__'] = prepend_status(original_str)
 
@@ -237,6 +271,7 @@ class Step(metaclass=StepClass):
     obj = attr.ib(default=None, repr=False)
     action_fn = attr.ib(default=None, repr=False)
     status = attr.ib(default=StepResult.UNSET)
+    journal = attr.ib(default=None, repr=False, eq=False, kw_only=True)
 
     def __len__(self) -> int:
         return 1
@@ -262,6 +297,8 @@ class Step(metaclass=StepClass):
         )
 
     def onerror(self):
+        if self.journal is not None:
+            self.journal.discard_chain()
         Clean(self.obj)()
 
 
@@ -347,6 +384,20 @@ class Compile(Step):
     def __init__(self, project):
         super().__init__(obj=project, action_fn=project.compile)
 
+    @notify_step_begin_end
+    def __call__(self) -> StepResultVariants:
+        cache_key = buildcache.key_of(self.obj)
+        if cache_key and buildcache.restore(cache_key, self.obj.builddir):
+            self.status = StepResult.OK
+            return self.status
+
+        self.action_fn()
+        spool.collect()
+        if cache_key:
+            buildcache.store(cache_key, self.obj.builddir)
+        self.status = StepResult.OK
+        return self.status
+
     def __str__(self, indent: int = 0) -> str:
         return textwrap.indent(
             "* {0}: Compile".format(self.obj.name), indent * " "
@@ -367,7 +418,8 @@ class Run(Step):
         group, session = run.begin_run_group(self.project, self.experiment)
         signals.handlers.register(run.fail_run_group, group, session)
         try:
-            self.project.run_tests()
+            with forkserver.scope():
+                self.project.run_tests()
             run.end_run_group(group, session)
         except ProcessExecutionError:
             run.fail_run_group(group, session)
@@ -377,6 +429,7 @@ class Run(Step):
             raise
         finally:
             signals.handlers.deregister(run.fail_run_group)
+        spool.collect()
 
         self.status = StepResult.OK
         return self.status
@@ -597,6 +650,92 @@ class RequireAll(Step):
         return textwrap.indent("* All required:\n" + sub_actns, indent * " ")
 
 
+class RequireAllOnDemand(RequireAll):
+    """
+    A RequireAll that creates its child steps on demand.
+
+    Creating the child steps of a project usually instantiates the project,
+    which is expensive for large variant spaces. The child steps are created
+    on first access to `actions`, e.g., right before the step executes.
+    Until then, we only know the id of the project and the number of actions,
+    which is usually taken from a prototype of the same project class.
+
+    Args:
+        factory: Creates the child steps.
+        project_cls: The project class the child steps work on.
+        project_id: The id of the project the child steps work on.
+        num_actions: The number of actions, until the child steps exist.
+    """
+    NAME = "REQUIRE ALL"
+    DESCRIPTION = "All child steps need to succeed"
+
+    def __init__(
+        self,
+        factory: tp.Callable[[], tp.List[Step]],
+        project_cls: tp.Any = None,
+        project_id: str = "",
+        num_actions: int = 1
+    ):
+        super().__init__(actions=None)
+        self.factory = factory
+        self.project_cls = project_cls
+        self.project_id = project_id
+        self.num_actions = num_actions
+        self.on_demand: tp.List[tp.Callable[['RequireAllOnDemand'],
+                                            None]] = []
+
+    def create(self) -> tp.List[Step]:
+        """Create the child steps, if they do not exist yet."""
+        if self._actions is None:
+            self._actions = list(self.factory())
+            for hook in self.on_demand:
+                hook(self)
+        return self._actions
+
+    @property
+    def actions(self) -> tp.List[Step]:
+        return self.create()
+
+    @actions.setter
+    def actions(self, actions: tp.Optional[tp.List[Step]]) -> None:
+        self._actions = actions
+
+    @property
+    def created(self) -> bool:
+        return self._actions is not None
+
+    def when_created(
+        self, hook: tp.Callable[['RequireAllOnDemand'], None]
+    ) -> None:
+        """Call hook with this step, as soon as the child steps exist."""
+        if self.created:
+            hook(self)
+        else:
+            self.on_demand.append(hook)
+
+    def __len__(self) -> int:
+        if self.created:
+            return super().__len__()
+        return self.num_actions
+
+    def __repr__(self) -> str:
+        return "RequireAllOnDemand(project_id={0!r}, status={1!r})".format(
+            self.project_id, self.status
+        )
+
+    def __str__(self, indent: int = 0) -> str:
+        if self.created:
+            sub_actns = [a.__str__(indent + 1) for a in self.actions]
+            sub_actns = "\n".join(sub_actns)
+            return textwrap.indent(
+                "* All required:\n" + sub_actns, indent * " "
+            )
+        return textwrap.indent(
+            "* All required, created on demand: {0}".format(self.project_id),
+            indent * " "
+        )
+
+
 @attr.s
 class Containerize(RequireAll):
     NAME = "CONTAINERIZE"
@@ -676,7 +815,7 @@ class ProjectEnvironment(Step):
         for name, variant in prj_vars.items():
             LOG.info("Fetching %s @ %s", str(name), variant.version)
             src = variant.owner
-            src.version(project.builddir, variant.version)
+            snapshot.version(src, project.builddir, variant.version)
 
     def __str__(self, indent: int = 0) -> str:
         project = self.obj
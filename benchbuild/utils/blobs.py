@@ -0,0 +1,198 @@
+"""
+Compressed, content-addressed storage for large texts of the run log.
+
+The output (stdout & stderr) of a run and the configuration it ran with
+may be large and the configuration is identical for most runs. With
+`CFG["db"]["log_blobs"]` enabled, the run log does not store these texts.
+It stores the SHA-256 hash of the text instead, e.g., in `stdout_hash`.
+The texts are compressed and stored once per content in the table `blob`.
+
+Blobs are written by all paths that write run logs: the session of a run,
+the batch writer and the ingestion of spool files. Logs written before
+this change still hold their texts in the log itself, `text` and `stream`
+read both transparently.
+"""
+import codecs
+import gzip
+import hashlib
+import logging
+import typing as tp
+import zlib
+
+from benchbuild.settings import CFG
+
+LOG = logging.getLogger(__name__)
+
+Row = tp.Dict[str, tp.Any]
+
+TABLE = 'blob'
+FIELDS = ('config', 'stdout', 'stderr')
+READ_SIZE = 64 * 1024
+
+
+class MissingDependency(Exception):
+    """A blob uses a compression that is not installed."""
+
+
+def enabled() -> bool:
+    return bool(CFG["db"]["log_blobs"])
+
+
+def compression() -> str:
+    """The compression of new blobs, falls back to gzip without zstd."""
+    encoding = str(CFG["db"]["blob_compression"])
+    if encoding == 'zstd':
+        try:
+            import zstandard  # pylint: disable=unused-import
+        except ImportError:
+            LOG.warning("zstandard is not installed, using gzip for blobs.")
+            return 'gzip'
+    return encoding
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor().compress(data)
+    if encoding == 'gzip':
+        return gzip.compress(data)
+    return data
+
+
+def decompressed(data: bytes, encoding: str) -> tp.Iterator[bytes]:
+    """Decompress a blob, chunk by chunk."""
+    if encoding == 'zstd':
+        try:
+            import zstandard
+        except ImportError as err:
+            raise MissingDependency(
+                "This blob requires zstandard: pip install benchbuild[zstd]"
+            ) from err
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+    elif encoding == 'gzip':
+        decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    else:
+        yield data
+        return
+
+    for begin in range(0, len(data), READ_SIZE):
+        yield decompressor.decompress(data[begin:begin + READ_SIZE])
+    if hasattr(decompressor, 'flush'):
+        yield decompressor.flush()
+
+
+def encode(text: str) -> Row:
+    """Create the blob row of a text."""
+    data = text.encode('utf-8')
+    encoding = compression()
+    return {
+        'hash': hashlib.sha256(data).hexdigest(),
+        'encoding': encoding,
+        'size': len(data),
+        'data': compress(data, encoding)
+    }
+
+
+def references(**texts: tp.Optional[str]) -> tp.Tuple[Row, tp.List[Row]]:
+    """
+    Replace the texts of a run log with references to blobs.
+
+    Args:
+        **texts: The texts by column, e.g., stdout='...'.
+
+    Returns:
+        The column values of the log, e.g., stdout_hash='...', and the rows
+        of all blobs we need to store. If blobs are disabled, the texts
+        themselves.
+    """
+    if not enabled():
+        return dict(texts), []
+
+    values: Row = {}
+    rows: tp.List[Row] = []
+    for name, text in texts.items():
+        if text is None:
+            continue
+        row = encode(text)
+        values[f'{name}_hash'] = row['hash']
+        rows.append(row)
+    return values, rows
+
+
+def store(session: tp.Any, rows: tp.Iterable[Row]) -> None:
+    """
+    Insert blobs we do not have already.
+
+    Args:
+        session: The transaction that stores the blobs.
+        rows: The blob rows, see `encode`.
+    """
+    import sqlalchemy as sa
+
+    from benchbuild.utils.schema import Blob
+
+    table = Blob.__table__
+    unique = {row['hash']: row for row in rows}
+    if not unique:
+        return
+
+    existing = {
+        blob_hash for blob_hash, in session.execute(
+            sa.select([table.c.hash]).where(table.c.hash.in_(list(unique)))
+        )
+    }
+    for blob_hash, row in unique.items():
+        if blob_hash in existing:
+            continue
+        try:
+            # Another process might store the same content concurrently.
+            with session.begin_nested():
+                session.execute(table.insert(), row)
+        except sa.exc.IntegrityError:
+            LOG.debug("Blob %s exists already", blob_hash)
+
+
+def chunks(session: tp.Any, log: tp.Any, name: str) -> tp.Iterator[str]:
+    """
+    Read a text of a run log, chunk by chunk.
+
+    Args:
+        session: The database session.
+        log: The `RunLog` we read from.
+        name: The text we read, one of FIELDS.
+    """
+    from benchbuild.utils.schema import Blob
+
+    blob_hash = getattr(log, f'{name}_hash')
+    if blob_hash is None:
+        inline = getattr(log, name)
+        if inline:
+            yield inline
+        return
+
+    blob = session.query(Blob).filter(Blob.hash == blob_hash).one_or_none()
+    if blob is None:
+        LOG.error("The %s of run %s is missing: %s", name, log.run_id,
+                  blob_hash)
+        return
+
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    for data in decompressed(blob.data, blob.encoding):
+        chunk = decoder.decode(data)
+        if chunk:
+            yield chunk
+    chunk = decoder.decode(b'', final=True)
+    if chunk:
+        yield chunk
+
+
+def text(session: tp.Any, log: tp.Any, name: str) -> str:
+    """Read a text of a run log, see `chunks`."""
+    return ''.join(chunks(session, log, name))
+
+
+def stream(session: tp.Any, log: tp.Any, name: str,
+           out: tp.TextIO) -> None:
+    """Write a text of a run log to a stream, see `chunks`."""
+    for chunk in chunks(session, log, name):
+        out.write(chunk)
@@ -0,0 +1,352 @@
+"""
+Content-addressed cache of compiled build directories.
+
+Many experiments compile the same project variant with identical flags and
+differ only in what they do at run-time. If enabled, the `Compile` step
+stores the build directory after a successful compilation and restores it,
+if another compilation with the same key is requested.
+
+A cache key is derived from:
+    - the project's id and variant,
+    - the project's cflags & ldflags,
+    - a hash of the configured C and C++ compiler binaries,
+    - the identity of the experiment's compiler extension.
+
+A restored build directory did not execute the compiler extension.
+Experiments that collect measurements at compile-time should not be used
+with the build cache.
+
+Every build directory lives in a path of its own run, which is deleted by
+the run's `Clean` step. Before we store a build directory, we drop
+benchbuild's own compile-time wrappers, the pickles they load and the
+stored configuration (they carry the project, the extensions & the
+configuration of the storing experiment). Build
+directories that still refer to their own path afterwards, e.g., CMake or
+libtool output, are not stored at all.
+"""
+import functools as ft
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+import typing as tp
+
+from plumbum import CommandNotFound
+
+from benchbuild import source
+from benchbuild.settings import CFG
+from benchbuild.utils.path import copy_tree, flocked
+
+if tp.TYPE_CHECKING:
+    from benchbuild.project import Project  # pylint: disable=unused-import
+
+LOG = logging.getLogger(__name__)
+
+# Bump this, if the layout of cache entries changes.
+LAYOUT_VERSION = 2
+
+# Build artifacts, later steps execute or read, but do not write.
+SHAREABLE_EXTS = ('.o', '.a', '.so')
+
+
+def cache_dir() -> str:
+    """Return the directory we store all cached build directories in."""
+    path = CFG["buildcache"]["path"].value
+    if not path:
+        path = os.path.join(str(CFG["build_dir"]), ".buildcache")
+    return str(path)
+
+
+@ft.lru_cache(maxsize=None)
+def __hash_file(path: str, mtime: float, size: int) -> str:
+    del mtime, size
+    digest = hashlib.sha256()
+    with open(path, 'rb') as binary:
+        for chunk in iter(lambda: binary.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compiler_hash(name: str) -> str:
+    """
+    Hash the binary of a configured compiler.
+
+    Hashes are memoized as long as the binary's mtime and size do not change.
+
+    Args:
+        name: The compiler's name, e.g., CFG["compiler"]["c"].
+
+    Returns:
+        The sha256 digest of the compiler binary, or an empty string, if
+        the compiler cannot be found.
+    """
+    from benchbuild.utils.compiler import compiler
+
+    try:
+        executable = str(compiler(name).cmd.executable)
+    except CommandNotFound:
+        return ""
+    return executable_hash(executable)
+
+
+def executable_hash(executable: str) -> str:
+    """
+    Hash a binary, e.g., of a compiler.
+
+    Hashes are memoized as long as the binary's mtime and size do not change.
+
+    Args:
+        executable: The path of the binary.
+
+    Returns:
+        The sha256 digest of the binary.
+    """
+    info = os.stat(executable)
+    return __hash_file(executable, info.st_mtime, info.st_size)
+
+
+def extension_id(extension: tp.Any) -> tp.List[tp.Any]:
+    """
+    Describe the structure of an extension chain.
+
+    Args:
+        extension: The root of the extension chain.
+
+    Returns:
+        A JSON serializable description of class, config and children of
+        every extension in the chain.
+    """
+    if extension is None:
+        return []
+    ext_cls = type(extension)
+    children = getattr(extension, 'next_extensions', [])
+    return [
+        f'{ext_cls.__module__}.{ext_cls.__qualname__}',
+        getattr(extension, 'config', None) or {},
+        [extension_id(child) for child in children]
+    ]
+
+
+def key_of(project: 'Project') -> tp.Optional[str]:
+    """
+    Calculate the cache key of a project's build directory.
+
+    Args:
+        project: The project we want to compile.
+
+    Returns:
+        The cache key or None, if the cache is disabled.
+    """
+    if not CFG["buildcache"]["enable"]:
+        return None
+
+    c_compiler = str(CFG["compiler"]["c"])
+    cxx_compiler = str(CFG["compiler"]["cxx"])
+    ident = {
+        'layout': LAYOUT_VERSION,
+        'project': project.id,
+        'variant': source.to_str(*tuple(project.variant.values())),
+        'cflags': list(project.cflags),
+        'ldflags': list(project.ldflags),
+        'cc': [c_compiler, compiler_hash(c_compiler)],
+        'cxx': [cxx_compiler, compiler_hash(cxx_compiler)],
+        'extension': extension_id(project.compiler_extension)
+    }
+    encoded = json.dumps(ident, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def __entry(key: str) -> str:
+    return os.path.join(cache_dir(), key)
+
+
+def __hardlink() -> bool:
+    return str(CFG["buildcache"]["link"]) == "hardlink"
+
+
+def is_shareable(path: str) -> bool:
+    """Check, if a file is a build artifact we may hardlink."""
+    name = os.path.basename(path)
+    mode = os.lstat(path).st_mode
+    return stat.S_ISREG(mode) and bool(
+        mode & stat.S_IXUSR or name.endswith(SHAREABLE_EXTS) or '.so.' in name
+    )
+
+
+def own_files(builddir: str) -> tp.List[str]:
+    """
+    Find benchbuild's own files in a build directory.
+
+    These are the compile-time wrappers of `wrapping.wrap_cc`, the pickled
+    compilers they call, the manifests of the project and the configuration
+    stored by `run.store_config`.
+
+    Args:
+        builddir: The build directory we search.
+
+    Returns:
+        The paths of all files, relative to the build directory.
+    """
+    from benchbuild import runtime
+    from benchbuild.utils.wrapping import PROJECT_MANIFEST_F_EXT
+
+    cc_ext = '.benchbuild.cc'
+    magic = runtime.MANIFEST_MAGIC.encode('utf-8')
+    found = [os.path.join(builddir, '.benchbuild.yml')]
+    for root, _, files in os.walk(builddir):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.endswith(cc_ext):
+                found.append(path)
+                wrapper = path[:-len(cc_ext)]
+                if os.path.exists(wrapper):
+                    found.append(wrapper)
+            elif name.endswith(PROJECT_MANIFEST_F_EXT):
+                with open(path, 'rb') as manifest:
+                    if manifest.read(len(magic)) == magic:
+                        found.append(path)
+    return sorted(
+        os.path.relpath(path, builddir)
+        for path in set(found)
+        if os.path.lexists(path)
+    )
+
+
+def __contains(path: str, needles: tp.Sequence[bytes]) -> bool:
+    overlap = max(len(needle) for needle in needles) - 1
+    tail = b''
+    with open(path, 'rb') as binary:
+        for chunk in iter(lambda: binary.read(1 << 20), b''):
+            window = tail + chunk
+            if any(needle in window for needle in needles):
+                return True
+            tail = window[-overlap:]
+    return False
+
+
+def reference_to(
+    builddir: str, ignore: tp.Sequence[str] = ()
+) -> tp.Optional[str]:
+    """
+    Find a file that refers to the absolute path of its build directory.
+
+    Args:
+        builddir: The build directory we search.
+        ignore: Paths, relative to the build directory, we do not search.
+
+    Returns:
+        The path of the first file or symlink that contains the path of
+        the build directory, relative to the build directory, or None.
+    """
+    paths = {os.path.abspath(builddir), os.path.realpath(builddir)}
+    needles = [os.fsencode(path) for path in paths]
+    ignored = {os.path.join(builddir, path) for path in ignore}
+    for root, _, files in os.walk(builddir):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if path in ignored:
+                continue
+            if os.path.islink(path):
+                target = os.fsencode(os.readlink(path))
+                if any(target.startswith(needle) for needle in needles):
+                    return os.path.relpath(path, builddir)
+            elif os.path.isfile(path) and __contains(path, needles):
+                return os.path.relpath(path, builddir)
+    return None
+
+
+def __share(entry: str, builddir: str) -> None:
+    """Hardlink the build artifacts of an entry, copy everything else."""
+    copy_tree(entry, builddir, hardlink=True)
+    for root, _, files in os.walk(builddir):
+        for name in files:
+            path = os.path.join(root, name)
+            if not os.path.islink(path) and not is_shareable(path):
+                tmp_path = f'{path}.tmp-{os.getpid()}'
+                shutil.copy2(path, tmp_path)
+                os.replace(tmp_path, path)
+
+
+def __seal(entry: str) -> None:
+    """Make all shareable files of an entry read-only."""
+    for root, _, files in os.walk(entry):
+        for name in files:
+            path = os.path.join(root, name)
+            if is_shareable(path):
+                mode = os.lstat(path).st_mode
+                os.chmod(
+                    path, mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+                )
+
+
+def restore(key: str, builddir: str) -> bool:
+    """
+    Restore a cached build directory.
+
+    With hardlinks, only build artifacts (executables, objects & libraries)
+    are shared with the cache. They are read-only, so an in-place write
+    fails instead of modifying the cache entry. Everything else is copied.
+
+    Args:
+        key: The cache key of the build directory.
+        builddir: The build directory we restore into.
+
+    Returns:
+        True, if the cache contained the key.
+    """
+    entry = __entry(key)
+    if not os.path.isdir(entry):
+        return False
+
+    with flocked(entry + '.lock'):
+        if not os.path.isdir(entry):
+            return False
+        if __hardlink():
+            __share(entry, str(builddir))
+        else:
+            copy_tree(entry, str(builddir))
+    LOG.info("Restored '%s' from the build cache (%s).", builddir, key)
+    return True
+
+
+def store(key: str, builddir: str) -> None:
+    """
+    Store a build directory in the cache.
+
+    We copy into a temporary directory first and rename it afterwards, so
+    no one can see a partially stored entry. The entry never shares files
+    with the build directory, because later steps might write to them.
+
+    Build directories that refer to their own path are not stored, see
+    `reference_to`.
+
+    Args:
+        key: The cache key of the build directory.
+        builddir: The build directory we store.
+    """
+    own = own_files(str(builddir))
+    reference = reference_to(str(builddir), ignore=own)
+    if reference is not None:
+        LOG.info(
+            "Not storing '%s' in the build cache, '%s' refers to it.", builddir,
+            reference
+        )
+        return
+
+    entry = __entry(key)
+    os.makedirs(cache_dir(), exist_ok=True)
+    with flocked(entry + '.lock'):
+        if os.path.isdir(entry):
+            return
+        tmp_entry = f'{entry}.tmp-{os.getpid()}'
+        try:
+            copy_tree(str(builddir), tmp_entry)
+            for path in own:
+                os.remove(os.path.join(tmp_entry, path))
+            __seal(tmp_entry)
+            os.rename(tmp_entry, entry)
+        finally:
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+    LOG.info("Stored '%s' in the build cache (%s).", builddir, key)
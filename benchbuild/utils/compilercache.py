@@ -0,0 +1,272 @@
+"""
+Content-addressed cache of compiler calls.
+
+Variants of a project compile the same translation units with the same
+flags over and over. If enabled, `extensions.compiler.RunCompiler` stores
+the object file & the result of every call that compiles a single source
+file to an object file (`-c`) and reuses them, if the same call is
+requested again.
+
+A cache key is derived from:
+    - the path, mtime & size of the compiler binary, like ccache does,
+    - the effective arguments, including the project's cflags & ldflags,
+    - a hash of the preprocessed source,
+    - the working directory, if debug information is requested.
+
+The line markers of the preprocessed source name files inside the working
+directory relative to it, so the same source compiled in the build
+directories of different experiments has the same key.
+
+Computing the key preprocesses the source once more (`compiler -E`), which
+adds the cost of a preprocessor run to every call, hits included. A hit
+saves the compilation & optimization only.
+
+Failed calls are cached as well. If a call is known to fail with the
+project's flags, `RunCompiler` replays the failure and executes its fallback
+right away. A broken flag usually breaks the preprocessor as well, so if
+the source cannot be preprocessed with the project's cflags, we hash the
+source preprocessed without them instead. Such a key only ever stores the
+result of a failed call.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import typing as tp
+
+import attr
+from plumbum import local
+
+from benchbuild.settings import CFG
+
+LOG = logging.getLogger(__name__)
+
+Result = tp.Dict[str, tp.Any]
+
+SOURCE_EXTS = ('.c', '.cc', '.cp', '.cpp', '.cxx', '.c++', '.C', '.m', '.i',
+               '.ii')
+RESULT_F = 'result.json'
+OBJECT_F = 'object'
+LINE_MARKER = re.compile(r'^(#(?: line)? \d+ ")([^"]*)"', re.MULTILINE)
+
+
+def enabled() -> bool:
+    return bool(CFG["compilercache"]["enable"])
+
+
+def cache_dir() -> str:
+    """Return the directory we store all cached compiler calls in."""
+    path = CFG["compilercache"]["path"].value
+    if not path:
+        path = os.path.join(str(CFG["build_dir"]), ".compilercache")
+    return str(path)
+
+
+@attr.s(frozen=True)
+class Entry:
+    """
+    A cacheable compiler call: its key & the object file it writes.
+
+    Entries of calls that cannot be preprocessed with the project's cflags
+    only store failures.
+    """
+    directory: str = attr.ib()
+    key: str = attr.ib()
+    output: str = attr.ib()
+    only_failures: bool = attr.ib(default=False)
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, self.key[:2], self.key)
+
+
+def split_args(
+    args: tp.Sequence[str]
+) -> tp.Optional[tp.Tuple[tp.List[str], str, str]]:
+    """
+    Check, if a call compiles a single source file to an object file.
+
+    Returns:
+        The arguments without the output, the source and the output file,
+        or None, if the call is not cacheable.
+    """
+    if '-c' not in args:
+        return None
+
+    rest: tp.List[str] = []
+    sources: tp.List[str] = []
+    output = None
+    args_iter = iter(args)
+    for arg in args_iter:
+        if arg == '-o':
+            output = next(args_iter, None)
+            continue
+        if arg.startswith('-o'):
+            output = arg[2:]
+            continue
+        # Dependency files, response files, stdin & language overrides.
+        if arg.startswith(('-M', '@', '-x')) or arg == '-':
+            return None
+        if not arg.startswith('-') and arg.endswith(SOURCE_EXTS):
+            sources.append(arg)
+        rest.append(arg)
+
+    if len(sources) != 1 or output == '':
+        return None
+    if output is None:
+        output = os.path.splitext(os.path.basename(sources[0]))[0] + '.o'
+    return rest, sources[0], output
+
+
+def executable_of(command: tp.Any) -> tp.Optional[str]:
+    """Find the binary of a (bound) plumbum command."""
+    while not hasattr(command, 'executable'):
+        command = getattr(command, 'cmd', None)
+        if command is None:
+            return None
+    return str(command.executable)
+
+
+def compiler_id(executable: str) -> tp.List[tp.Any]:
+    """
+    Identify a compiler binary by its path, mtime & size.
+
+    Every compiler call runs in a process of its own, hashing the binary
+    would cost more than many hits save.
+    """
+    info = os.stat(executable)
+    return [executable, info.st_mtime_ns, info.st_size]
+
+
+def relative_markers(preprocessed: str, cwd: str) -> str:
+    """
+    Make the paths in the line markers of a preprocessed source relative.
+
+    Only paths inside the working directory are changed, system headers
+    keep their absolute paths.
+
+    Args:
+        preprocessed: The output of `compiler -E`.
+        cwd: The working directory of the compiler call.
+    """
+    prefix = cwd.rstrip('/') + '/'
+
+    def relative(match: tp.Match[str]) -> str:
+        path = match.group(2)
+        if path == cwd or path.startswith(prefix):
+            path = os.path.relpath(path, cwd)
+        return f'{match.group(1)}{path}"'
+
+    return LINE_MARKER.sub(relative, preprocessed)
+
+
+def entry_of(
+    directory: tp.Optional[str], compiler: tp.Any, args: tp.Sequence[str],
+    cflags: tp.Sequence[str], ldflags: tp.Sequence[str]
+) -> tp.Optional[Entry]:
+    """
+    Calculate the cache entry of a compiler call.
+
+    Args:
+        directory: The cache directory, or None, if the cache is disabled.
+        compiler: The compiler command, without arguments.
+        args: The arguments of the call.
+        cflags: The project's cflags, appended to the call.
+        ldflags: The project's ldflags, appended to the call.
+
+    Returns:
+        The cache entry, or None, if the call is not cacheable.
+    """
+    if directory is None:
+        return None
+
+    split = split_args([str(arg) for arg in args])
+    if split is None:
+        return None
+    rest, _, output = split
+    cflags = [str(flag) for flag in cflags]
+    ldflags = [str(flag) for flag in ldflags]
+
+    executable = executable_of(compiler)
+    if executable is None:
+        return None
+
+    flags = [arg for arg in rest if arg != '-c']
+    ident: tp.Dict[str, tp.Any] = {
+        'compiler': compiler_id(executable),
+        'args': rest + cflags + ldflags
+    }
+    only_failures = False
+    retcode, preprocessed, _ = compiler["-E"][flags + cflags].run(retcode=None)
+    if retcode != 0:
+        retcode, preprocessed, _ = compiler["-E"][flags].run(retcode=None)
+        if retcode != 0:
+            return None
+        only_failures = True
+        ident['without_cflags'] = True
+    preprocessed = relative_markers(preprocessed, str(local.cwd))
+    ident['preprocessed'] = hashlib.sha256(preprocessed.encode()).hexdigest()
+
+    if any(arg.startswith('-g') and arg != '-g0' for arg in rest + cflags):
+        ident['cwd'] = str(local.cwd)
+    encoded = json.dumps(ident, sort_keys=True)
+    key = hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+    return Entry(directory, key, str(local.path(output)), only_failures)
+
+
+def restore(entry: Entry) -> tp.Optional[Result]:
+    """
+    Restore the result of a cached compiler call.
+
+    The object file of a successful call is copied to the call's output.
+
+    Returns:
+        The retcode, stdout & stderr of the call, or None, if the cache does
+        not contain the call.
+    """
+    try:
+        with open(os.path.join(entry.path, RESULT_F)) as result_f:
+            result = json.load(result_f)
+        if result['retcode'] == 0:
+            shutil.copyfile(os.path.join(entry.path, OBJECT_F), entry.output)
+    except (OSError, ValueError):
+        return None
+
+    LOG.debug("Restored '%s' from the compiler cache.", entry.output)
+    return result
+
+
+def store(entry: Entry, retcode: int, stdout: str, stderr: str) -> None:
+    """
+    Store the result of a compiler call in the cache.
+
+    We write into a temporary directory first and rename it afterwards, so
+    no one can see a partially stored entry.
+    """
+    if os.path.isdir(entry.path):
+        return
+    if retcode == 0 and (
+        entry.only_failures or not os.path.isfile(entry.output)
+    ):
+        return
+
+    os.makedirs(os.path.dirname(entry.path), exist_ok=True)
+    tmp_path = f'{entry.path}.tmp-{os.getpid()}'
+    try:
+        os.makedirs(tmp_path)
+        if retcode == 0:
+            shutil.copyfile(entry.output, os.path.join(tmp_path, OBJECT_F))
+        with open(os.path.join(tmp_path, RESULT_F), 'w') as result_f:
+            json.dump({
+                'retcode': retcode,
+                'stdout': str(stdout),
+                'stderr': str(stderr)
+            }, result_f)
+        os.rename(tmp_path, entry.path)
+    except OSError:
+        # Another process stored the same call concurrently.
+        LOG.debug("Could not store '%s' in the compiler cache.", entry.key)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
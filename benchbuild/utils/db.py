@@ -1,9 +1,9 @@
 """Database support module for the benchbuild study."""
 import logging
-
-from sqlalchemy.exc import IntegrityError
+import warnings
 
 from benchbuild.settings import CFG
+from benchbuild.utils import rollup, spool, writer
 
 LOG = logging.getLogger(__name__)
 
@@ -20,6 +20,21 @@ def validate(func):
     return validate_run_func
 
 
+def variant_of(project):
+    """
+    Return the variant of a project as string, e.g., '1.0,2.1'.
+
+    Args:
+        project: The project, might have no variant at all.
+    """
+    from benchbuild.source import base
+
+    variant = getattr(project, 'variant', None)
+    if not variant:
+        return None
+    return base.to_str(*variant.values())
+
+
 def create_run(cmd, project, exp, grp):
     """
     Create a new 'run' in the database.
@@ -41,14 +56,25 @@ def create_run(cmd, project, exp, grp):
     """
     from benchbuild.utils import schema as s
 
-    session = s.Session()
     run = s.Run(command=str(cmd),
                 project_name=project.name,
                 project_group=project.group,
+                variant=variant_of(project),
                 experiment_name=exp.name,
                 run_group=str(grp),
                 experiment_group=exp.id)
+    if spool.enabled():
+        # The run is written to the spool, when it ends.
+        run.id = spool.new_key()
+        return (run, None)
+
+    session = s.Session()
     session.add(run)
+    if writer.writer() is not None:
+        # All later changes of this run go through the batch writer. We keep
+        # a detached copy, so the session does not expire or track it.
+        session.flush()
+        session.expunge(run)
     session.commit()
 
     return (run, session)
@@ -71,10 +97,15 @@ def create_run_group(prj, experiment):
         A tuple (group, session) containing both the newly created run_group and
         the transaction object.
     """
+    from benchbuild.utils import incremental
     from benchbuild.utils import schema as s
 
     session = s.Session()
-    group = s.RunGroup(id=prj.run_uuid, experiment=experiment.id)
+    group = s.RunGroup(
+        id=prj.run_uuid,
+        experiment=experiment.id,
+        **incremental.identity(prj, experiment)
+    )
     session.add(group)
     session.commit()
 
@@ -89,10 +120,6 @@ def persist_project(project):
         project: The project we want to persist.
     """
     from benchbuild.utils.schema import Project, Session
-    session = Session()
-    projects = session.query(Project) \
-        .filter(Project.name == project.name) \
-        .filter(Project.group_name == project.group)
 
     name = project.name
     desc = project.__doc__
@@ -104,6 +131,24 @@ def persist_project(project):
     except AttributeError:
         src_url = 'unknown'
 
+    if spool.enabled():
+        spool.write(
+            Project.__tablename__, [{
+                "name": name,
+                "description": desc,
+                "src_url": src_url,
+                "domain": domain,
+                "group_name": group_name,
+                "version": version
+            }]
+        )
+        return (None, None)
+
+    session = Session()
+    projects = session.query(Project) \
+        .filter(Project.name == project.name) \
+        .filter(Project.group_name == project.group)
+
     if projects.count() == 0:
         newp = Project()
         newp.name = name
@@ -135,6 +180,7 @@ def persist_experiment(experiment):
     Args:
         experiment: The experiment we want to persist.
     """
+    from sqlalchemy.exc import IntegrityError
     from benchbuild.utils.schema import Experiment, Session
 
     session = Session()
@@ -165,25 +211,122 @@ def persist_experiment(experiment):
     return (ret, session)
 
 
+def run_group_durations():
+    """
+    Query the duration of all run groups in the database.
+
+    A run group covers all runs of a single project inside a single
+    execution of an experiment, i.e., compilation and execution.
+
+    Returns:
+        A list of tuples (experiment name, project name, project group,
+        duration in seconds), one for each completed run group.
+    """
+    import sqlalchemy as sa
+    from benchbuild.utils.schema import Run, Session
+
+    session = Session()
+    spans = session.query(
+        Run.experiment_name, Run.project_name, Run.project_group,
+        sa.func.min(Run.begin), sa.func.max(Run.end)
+    ).filter(Run.begin.isnot(None)).filter(Run.end.isnot(None)).group_by(
+        Run.run_group, Run.experiment_name, Run.project_name,
+        Run.project_group
+    )
+
+    return [(exp_name, prj_name, prj_group, (end - begin).total_seconds())
+            for exp_name, prj_name, prj_group, begin, end in spans]
+
+
+def add_rows(session, model, rows):
+    """
+    Add new rows of a model to the database.
+
+    If spooling is enabled, the rows are written to the spool. If batch
+    writes are enabled, the rows are written by the batch writer. Else, they
+    are added to the session.
+
+    Args:
+        session: The db transaction we belong to.
+        model: The schema class of the rows.
+        rows: The rows, as mapping from column names to values.
+    """
+    if spool.enabled():
+        spool.write(model.__tablename__, rows)
+        return
+
+    batch = writer.writer()
+    if batch is None:
+        for row in rows:
+            session.add(model(**row))
+        rollup.update(session, model.__table__, rows)
+    else:
+        batch.insert(model.__table__, rows)
+
+
 @validate
 def persist_time(run, session, timings):
     """
     Persist the run results in the database.
 
+    Deprecated, use `persist_rusage` instead.
+
     Args:
         run: The run we attach this timing results to.
         session: The db transaction we belong to.
-        timings: The timing measurements we want to store.
+        timings: The timing measurements (user, system, real) we want
+            to store.
     """
     from benchbuild.utils import schema as s
 
+    warnings.warn(
+        "persist_time is deprecated, use persist_rusage instead.",
+        DeprecationWarning,
+        stacklevel=3
+    )
+    rows = []
     for timing in timings:
-        session.add(s.Metric(name="time.user_s", value=timing[0],
-                             run_id=run.id))
-        session.add(
-            s.Metric(name="time.system_s", value=timing[1], run_id=run.id))
-        session.add(s.Metric(name="time.real_s", value=timing[2],
-                             run_id=run.id))
+        rows.append(dict(name="time.user_s", value=timing[0], run_id=run.id))
+        rows.append(dict(name="time.system_s", value=timing[1], run_id=run.id))
+        rows.append(dict(name="time.real_s", value=timing[2], run_id=run.id))
+    add_rows(session, s.Metric, rows)
+
+
+RUSAGE_METRICS = (
+    ("time.user_s", "ru_utime"),
+    ("time.system_s", "ru_stime"),
+    ("rusage.max_rss_kb", "ru_maxrss"),
+    ("rusage.minor_faults", "ru_minflt"),
+    ("rusage.major_faults", "ru_majflt"),
+    ("rusage.voluntary_switches", "ru_nvcsw"),
+    ("rusage.involuntary_switches", "ru_nivcsw"),
+    ("rusage.block_inputs", "ru_inblock"),
+    ("rusage.block_outputs", "ru_oublock"),
+)
+
+
+def persist_rusage(session, measurements):
+    """
+    Persist the resource usage of runs in the database, in a single batch.
+
+    Args:
+        session: The db transaction we belong to.
+        measurements: Tuples of (run, rusage, wall time in seconds). The
+            rusage is a `resource.struct_rusage`, e.g., of `os.wait4`.
+    """
+    from benchbuild.utils import schema as s
+
+    rows = []
+    for run, rusage, wall in measurements:
+        if run.status == 'failed':
+            LOG.debug("Run failed. Not storing its resource usage.")
+            continue
+        rows.append(dict(name="time.real_s", value=wall, run_id=run.id))
+        rows.extend(
+            dict(name=name, value=float(getattr(rusage, field)), run_id=run.id)
+            for name, field in RUSAGE_METRICS
+        )
+    add_rows(session, s.Metric, rows)
 
 
 def persist_perf(run, session, svg_path):
@@ -202,8 +345,9 @@ def persist_perf(run, session, svg_path):
 
     with open(svg_path, 'r') as svg_file:
         svg_data = svg_file.read()
-        session.add(
-            s.Metadata(name="perf.flamegraph", value=svg_data, run_id=run.id))
+        add_rows(session, s.Metadata, [
+            dict(name="perf.flamegraph", value=svg_data, run_id=run.id)
+        ])
 
 
 def persist_compilestats(run, session, stats):
@@ -217,7 +361,15 @@ def persist_compilestats(run, session, stats):
     """
     for stat in stats:
         stat.run_id = run.id
-        session.add(stat)
+        if not (spool.enabled() or writer.writer()):
+            session.add(stat)
+            continue
+
+        add_rows(session, type(stat), [{
+            col.key: getattr(stat, col.key)
+            for col in stat.__table__.columns
+            if not (col.primary_key and getattr(stat, col.key) is None)
+        }])
 
 
 def persist_config(run, session, cfg):
@@ -231,5 +383,7 @@ def persist_config(run, session, cfg):
     """
     from benchbuild.utils import schema as s
 
-    for cfg_elem in cfg:
-        session.add(s.Config(name=cfg_elem, value=cfg[cfg_elem], run_id=run.id))
+    add_rows(session, s.Config, [
+        dict(name=cfg_elem, value=cfg[cfg_elem], run_id=run.id)
+        for cfg_elem in cfg
+    ])
@@ -0,0 +1,78 @@
+"""
+Estimate the duration of projects from their previous executions.
+
+The `run` table records `begin` and `end` of every command we tracked for a
+project, grouped by the project's `run_group`. The span of a run group is
+the duration of a single project in a single execution of an experiment.
+
+We estimate a project's duration by the mean span of all its run groups,
+preferring run groups of the same experiment.
+"""
+import collections
+import logging
+import typing as tp
+
+import attr
+
+from benchbuild.utils import db
+
+LOG = logging.getLogger(__name__)
+
+ExperimentKey = tp.Tuple[str, str, str]
+ProjectKey = tp.Tuple[str, str]
+
+
+def mean(values: tp.List[float]) -> float:
+    return sum(values) / len(values)
+
+
+@attr.s
+class Durations:
+    """
+    Estimated durations of projects, in seconds.
+
+    Attributes:
+        by_experiment: Estimates by experiment name, project name & group.
+        by_project: Estimates by project name & group.
+    """
+    by_experiment: tp.Dict[ExperimentKey, float] = attr.ib(
+        default=attr.Factory(dict)
+    )
+    by_project: tp.Dict[ProjectKey, float] = attr.ib(
+        default=attr.Factory(dict)
+    )
+
+    @classmethod
+    def load(cls) -> 'Durations':
+        """Estimate all durations from the database."""
+        by_experiment = collections.defaultdict(list)
+        by_project = collections.defaultdict(list)
+        for exp_name, prj_name, prj_group, seconds in db.run_group_durations():
+            by_experiment[(exp_name, prj_name, prj_group)].append(seconds)
+            by_project[(prj_name, prj_group)].append(seconds)
+
+        LOG.debug("Loaded durations of %d projects", len(by_project))
+        return cls(
+            by_experiment={k: mean(v) for k, v in by_experiment.items()},
+            by_project={k: mean(v) for k, v in by_project.items()}
+        )
+
+    def estimate(self, experiment_name: tp.Optional[str], project_name: str,
+                 project_group: str) -> tp.Optional[float]:
+        """
+        Estimate the duration of a project.
+
+        Args:
+            experiment_name: The experiment that executes the project, if any.
+            project_name: The project's name.
+            project_group: The project's group.
+
+        Returns:
+            The estimated duration in seconds, None, if we never executed
+            this project before.
+        """
+        if experiment_name is not None:
+            exp_key = (experiment_name, project_name, project_group)
+            if exp_key in self.by_experiment:
+                return self.by_experiment[exp_key]
+        return self.by_project.get((project_name, project_group))
@@ -0,0 +1,270 @@
+"""
+Export the results of experiments into columnar files.
+
+The tables `experiment`, `rungroup`, `run`, `metrics` & `config` are
+streamed from the database in batches (`yield_per`, which uses server-side
+cursors on PostgreSQL) and written as typed columns. Every experiment gets
+a partition of its own:
+
+    <out>/experiment_id=<experiment id>/<table>.<parquet|npz>
+
+The parquet format requires `pyarrow` (`pip install benchbuild[parquet]`),
+the npz format requires `numpy` (`pip install benchbuild[numpy]`). All
+partitions of a table load as a single dataset, e.g., with
+`pyarrow.dataset.dataset(glob.glob(f'{out}/*/run.parquet'))`.
+"""
+import datetime
+import logging
+import os
+import typing as tp
+import uuid
+
+import sqlalchemy as sa
+
+LOG = logging.getLogger(__name__)
+
+TABLES = ['experiment', 'rungroup', 'run', 'metrics', 'config']
+
+Batch = tp.Dict[str, tp.List[tp.Any]]
+
+
+class MissingDependency(Exception):
+    """An export format requires a package that is not installed."""
+
+
+def kind_of(column: sa.Column) -> str:
+    """The kind of values we store for a column."""
+    if isinstance(column.type, sa.DateTime):
+        return 'datetime'
+    if isinstance(column.type, sa.Integer):
+        return 'int'
+    if isinstance(column.type, sa.Float):
+        return 'float'
+    return 'str'
+
+
+def convert(value: tp.Any) -> tp.Any:
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def query_of(
+    session: tp.Any, table_name: str, experiment_id: tp.Any
+) -> tp.Any:
+    """Query all rows of a table that belong to an experiment."""
+    from benchbuild.utils import schema as s
+
+    models = {
+        'experiment': (s.Experiment, s.Experiment.id),
+        'rungroup': (s.RunGroup, s.RunGroup.experiment),
+        'run': (s.Run, s.Run.experiment_group),
+    }
+    if table_name in models:
+        model, experiment_col = models[table_name]
+        query = session.query(*model.__table__.columns)
+        return query.filter(experiment_col == experiment_id)
+
+    model = s.Metric if table_name == 'metrics' else s.Config
+    query = session.query(*model.__table__.columns).join(
+        s.Run, s.Run.id == model.run_id
+    )
+    return query.filter(s.Run.experiment_group == experiment_id)
+
+
+def batches(query: tp.Any, columns: tp.List[str],
+            batch_size: int) -> tp.Iterator[Batch]:
+    """
+    Stream the rows of a query as batches of columns.
+
+    Args:
+        query: The query we stream.
+        columns: The names of the columns of every row.
+        batch_size: The maximal number of rows per batch.
+    """
+    batch: Batch = {column: [] for column in columns}
+    num_rows = 0
+    for row in query.yield_per(batch_size):
+        for column, value in zip(columns, row):
+            batch[column].append(convert(value))
+        num_rows += 1
+        if num_rows == batch_size:
+            yield batch
+            batch = {column: [] for column in columns}
+            num_rows = 0
+    if num_rows:
+        yield batch
+
+
+class ParquetTable:
+    """Write the batches of a table into a parquet file."""
+
+    @staticmethod
+    def require() -> None:
+        try:
+            import pyarrow  # pylint: disable=unused-import
+        except ImportError as err:
+            raise MissingDependency(
+                "The parquet format requires pyarrow: "
+                "pip install benchbuild[parquet]"
+            ) from err
+
+    def __init__(self, path: str, kinds: tp.Dict[str, str]) -> None:
+        self.require()
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {
+            'datetime': pa.timestamp('us'),
+            'int': pa.int64(),
+            'float': pa.float64(),
+            'str': pa.string()
+        }
+        self.pa = pa
+        self.schema = pa.schema([
+            pa.field(name, types[kind]) for name, kind in kinds.items()
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, batch: Batch) -> None:
+        self.writer.write_table(
+            self.pa.Table.from_pydict(batch, schema=self.schema)
+        )
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class NpzTable:
+    """
+    Write the batches of a table into a compressed npz file.
+
+    An npz file cannot be appended, so we collect the batches of a single
+    table & experiment, before we write them.
+    """
+
+    @staticmethod
+    def require() -> None:
+        try:
+            import numpy  # pylint: disable=unused-import
+        except ImportError as err:
+            raise MissingDependency(
+                "The npz format requires numpy: pip install benchbuild[numpy]"
+            ) from err
+
+    def __init__(self, path: str, kinds: tp.Dict[str, str]) -> None:
+        self.require()
+        import numpy as np
+
+        self.np = np
+        self.path = path
+        self.kinds = kinds
+        self.chunks: tp.Dict[str, tp.List[tp.Any]] = {
+            name: [] for name in kinds
+        }
+
+    def array(self, kind: str, values: tp.List[tp.Any]) -> tp.Any:
+        np = self.np
+        if kind == 'datetime':
+            return np.array(values, dtype='datetime64[us]')
+        if kind == 'int' and None not in values:
+            return np.array(values, dtype=np.int64)
+        if kind in ('int', 'float'):
+            return np.array(values, dtype=np.float64)
+        return np.array(['' if v is None else str(v) for v in values],
+                        dtype=np.str_)
+
+    def write(self, batch: Batch) -> None:
+        for name, values in batch.items():
+            self.chunks[name].append(self.array(self.kinds[name], values))
+
+    def close(self) -> None:
+        np = self.np
+        arrays = {
+            name: np.concatenate(chunks)
+            if chunks else self.array(self.kinds[name], [])
+            for name, chunks in self.chunks.items()
+        }
+        np.savez_compressed(self.path, **arrays)
+
+
+WRITERS = {'parquet': ParquetTable, 'npz': NpzTable}
+
+
+def export_table(
+    session: tp.Any, table_name: str, experiment_id: tp.Any, path: str,
+    fmt: str, batch_size: int
+) -> int:
+    """
+    Export a single table of a single experiment.
+
+    Returns:
+        The number of exported rows.
+    """
+    from benchbuild.utils import schema
+
+    table = schema.metadata().tables[table_name]
+    kinds = {column.name: kind_of(column) for column in table.columns}
+    writer = WRITERS[fmt](path, kinds)
+
+    num_rows = 0
+    query = query_of(session, table_name, experiment_id)
+    try:
+        for batch in batches(query, list(kinds), batch_size):
+            writer.write(batch)
+            num_rows += len(next(iter(batch.values())))
+    finally:
+        writer.close()
+    return num_rows
+
+
+def export(
+    out_dir: str,
+    fmt: str = 'parquet',
+    experiments: tp.Optional[tp.Iterable[str]] = None,
+    experiment_ids: tp.Optional[tp.Iterable[str]] = None,
+    batch_size: int = 10000
+) -> tp.List[str]:
+    """
+    Export the results of experiments, partitioned by experiment.
+
+    Args:
+        out_dir: The directory we write all partitions to.
+        fmt: The file format, one of WRITERS.
+        experiments: Only export experiments with these names.
+        experiment_ids: Only export experiments with these ids.
+        batch_size: The number of rows we fetch & write at once.
+
+    Returns:
+        The directories of all exported partitions.
+    """
+    from benchbuild.utils import schema as s
+
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    WRITERS[fmt].require()
+
+    session = s.Session()
+    query = session.query(s.Experiment.id)
+    if experiments:
+        query = query.filter(s.Experiment.name.in_(list(experiments)))
+    if experiment_ids:
+        query = query.filter(s.Experiment.id.in_(list(experiment_ids)))
+
+    partitions = []
+    for (experiment_id,) in query.all():
+        partition = os.path.join(out_dir, f'experiment_id={experiment_id}')
+        os.makedirs(partition, exist_ok=True)
+        start = datetime.datetime.now()
+        for table_name in TABLES:
+            path = os.path.join(partition, f'{table_name}.{fmt}')
+            num_rows = export_table(
+                session, table_name, experiment_id, path, fmt, batch_size
+            )
+            LOG.debug("Exported %d rows to %s", num_rows, path)
+        LOG.info(
+            "Exported experiment %s in %s", experiment_id,
+            datetime.datetime.now() - start
+        )
+        partitions.append(partition)
+    return partitions
@@ -0,0 +1,234 @@
+"""
+Serve the calls of wrapped binaries from a pre-warmed process.
+
+Every call of a binary wrapped by `wrapping.wrap` or `wrapping.wrap_dynamic`
+starts a new interpreter, imports benchbuild and unpickles the project.
+For benchmarks that consist of thousands of short calls, this costs more
+than the benchmark itself.
+
+With `CFG["forkserver"]["enable"]`, the `Run` step starts a fork server for
+the duration of a project's run-time tests. The wrapper script becomes a
+small client that imports nothing but the standard library. The client
+connects to the server over a unix socket and sends:
+    - its argv, environment and working directory,
+    - its stdin, stdout & stderr (as file descriptors, see SCM_RIGHTS).
+
+The server loads every wrapper script once (including the pickled project
+and its runtime extension) and forks a child per call. The child takes over
+the file descriptors, environment and working directory of the client,
+executes the wrapper's `main` and reports its exit code to the client.
+
+If the client cannot reach a server, e.g., because the wrapper is called
+outside of the `Run` step, it executes the wrapper script directly.
+Signals sent to a client are not forwarded to the child that serves it.
+"""
+import array
+import contextlib
+import json
+import logging
+import os
+import runpy
+import shutil
+import signal
+import socket
+import struct
+import sys
+import tempfile
+import traceback
+import typing as tp
+
+from plumbum import local
+
+from benchbuild import signals
+from benchbuild.settings import CFG
+
+LOG = logging.getLogger(__name__)
+
+Request = tp.Dict[str, tp.Any]
+Main = tp.Callable[[tp.List[str]], int]
+Leaves = tp.Dict[str, tp.Any]
+
+HEADER = struct.Struct('!I')
+EXIT_CODE = struct.Struct('!i')
+NUM_FDS = 3
+BACKLOG = 128
+
+
+def enabled() -> bool:
+    return bool(CFG["forkserver"]["enable"])
+
+
+def read_exactly(conn: socket.socket, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("The client closed the connection.")
+        data += chunk
+    return data
+
+
+def receive(conn: socket.socket) -> tp.Tuple[Request, tp.List[int]]:
+    """
+    Receive the request of a client.
+
+    Returns:
+        The request (argv, env & cwd) and the file descriptors of the
+        client's stdin, stdout & stderr.
+    """
+    fds = array.array('i')
+    data, ancdata, _, _ = conn.recvmsg(
+        HEADER.size, socket.CMSG_SPACE(NUM_FDS * fds.itemsize)
+    )
+    for level, kind, payload in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            usable = len(payload) - len(payload) % fds.itemsize
+            fds.frombytes(payload[:usable])
+    if not data:
+        raise ConnectionError("The client closed the connection.")
+
+    data += read_exactly(conn, HEADER.size - len(data))
+    size, = HEADER.unpack(data)
+    return json.loads(read_exactly(conn, size).decode('utf-8')), list(fds)
+
+
+def leaves_of(config: tp.Any) -> Leaves:
+    """All settings of a configuration, by environment variable."""
+    if config.is_leaf():
+        return {config.__to_env_var__(): config}
+
+    leaves: Leaves = {}
+    for key in config.node:
+        leaves.update(leaves_of(config[key]))
+    return leaves
+
+
+def load(wrapper: str, cache: tp.Dict[tp.Tuple[str, int], Main]) -> Main:
+    """Load the `main` of a wrapper script, once per version of the file."""
+    key = (wrapper, os.stat(wrapper).st_mtime_ns)
+    if key not in cache:
+        LOG.debug("Loading wrapper: %s", wrapper)
+        module = runpy.run_path(wrapper, run_name='__forkserver__')
+        cache[key] = module['main']
+    return cache[key]
+
+
+def execute(conn: socket.socket, request: Request, fds: tp.List[int],
+            main: Main, leaves: Leaves) -> None:
+    """
+    Execute a single call inside the context of its client.
+
+    This runs in a child of the server and never returns.
+    """
+    exit_code = 1
+    try:
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for target, fd in enumerate(fds[:NUM_FDS]):
+            os.dup2(fd, target)
+        for fd in fds:
+            if fd >= NUM_FDS:
+                os.close(fd)
+        sys.stdin = open(0, 'r', closefd=False)
+        sys.stdout = open(1, 'w', closefd=False)
+        sys.stderr = open(2, 'w', closefd=False)
+
+        os.chdir(request['cwd'])
+        # Reading all settings from the environment is slow, we only read
+        # those the client sets differently.
+        changed = [
+            name for name, value in request['env'].items()
+            if name in leaves and os.environ.get(name) != value
+        ]
+        os.environ.clear()
+        os.environ.update(request['env'])
+        local.env.clear()
+        local.env.update(**request['env'])
+        for name in changed:
+            leaves[name].init_from_env()
+        sys.argv = request['argv']
+
+        try:
+            exit_code = main(request['argv'])
+        except SystemExit as exit_:
+            exit_code = exit_.code if isinstance(exit_.code, int) else 1
+        except BaseException:  # pylint: disable=broad-except
+            traceback.print_exc()
+
+        from benchbuild.utils import writer
+        writer.flush()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        conn.sendall(EXIT_CODE.pack(exit_code or 0))
+    finally:
+        os._exit(0)  # pylint: disable=protected-access
+
+
+def serve(listener: socket.socket) -> None:
+    """Accept calls until we are terminated."""
+    # We are a copy of the process that executes the `Run` step. Its cleanup
+    # handlers, e.g., failing the run group, are not ours.
+    signals.handlers.stored_procedures.clear()
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    cache: tp.Dict[tp.Tuple[str, int], Main] = {}
+    leaves = leaves_of(CFG)
+    while True:
+        conn, _ = listener.accept()
+        fds: tp.List[int] = []
+        try:
+            request, fds = receive(conn)
+            main = load(request['wrapper'], cache)
+            sys.stdout.flush()
+            sys.stderr.flush()
+            if os.fork() == 0:
+                listener.close()
+                execute(conn, request, fds, main, leaves)
+        except Exception:  # pylint: disable=broad-except
+            LOG.exception("The fork server could not serve a call.")
+        finally:
+            conn.close()
+            for fd in fds:
+                os.close(fd)
+
+
+@contextlib.contextmanager
+def scope() -> tp.Iterator[tp.Optional[str]]:
+    """
+    Serve all wrapped binaries called inside this context.
+
+    The socket of the server is exported to all child processes.
+
+    Yields:
+        The path of the server's socket, or None, if the fork server is
+        disabled.
+    """
+    if not enabled():
+        yield None
+        return
+
+    directory = tempfile.mkdtemp(prefix="bb-forkserver-")
+    path = os.path.join(directory, "socket")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(BACKLOG)
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            serve(listener)
+        finally:
+            os._exit(0)  # pylint: disable=protected-access
+    listener.close()
+    LOG.debug("Fork server %d listens on %s", pid, path)
+
+    CFG["forkserver"]["socket"] = path
+    try:
+        with local.env(BB_FORKSERVER_SOCKET=path):
+            yield path
+    finally:
+        CFG["forkserver"]["socket"] = None
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,128 @@
+"""
+Incremental experiments: skip what a previous run completed already.
+
+Every run group records the identity of what it measured: the name of the
+experiment, the project, its variant and a hash of the configuration that
+influences the results (see `CFG["incremental"]["config"]`).
+
+Before a plan executes, we look up all completed run groups of the same
+experiment name and configuration and remove the chains of these projects
+& variants from the plan. Adding two projects to a nightly job only
+executes these two projects. Unlike the journal (see
+`benchbuild.utils.journal`), this does not depend on the experiment's UUID,
+nor on the build directory.
+
+Enable with `benchbuild run --incremental` or `BB_INCREMENTAL_ENABLE=true`.
+"""
+import hashlib
+import logging
+import typing as tp
+
+from benchbuild.settings import CFG
+
+if tp.TYPE_CHECKING:
+    from benchbuild.utils import actions  # pylint: disable=unused-import
+
+LOG = logging.getLogger(__name__)
+
+
+def enabled() -> bool:
+    return bool(CFG["incremental"]["enable"])
+
+
+def project_id(name: str, group: str, variant: tp.Optional[str]) -> str:
+    """Identify a project variant, as the chains of an experiment do."""
+    return f'{name}-{group}@{variant or ""}'
+
+
+def config_hash() -> str:
+    """Hash all configuration options that influence the results."""
+    digest = hashlib.sha256()
+    for key in sorted(CFG["incremental"]["config"].value):
+        if key in CFG:
+            digest.update(repr(CFG[key]).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def identity(project: tp.Any, experiment: tp.Any) -> tp.Dict[str, tp.Any]:
+    """
+    The columns of a run group that identify what it measures.
+
+    Args:
+        project: The project of the run group.
+        experiment: The experiment of the run group.
+    """
+    from benchbuild.utils.db import variant_of
+
+    return {
+        'experiment_name': experiment.name,
+        'project_name': project.name,
+        'project_group': project.group,
+        'variant': variant_of(project),
+        'config_hash': config_hash()
+    }
+
+
+def completed(session: tp.Any, experiment_name: str) -> tp.Set[str]:
+    """
+    Find all project variants an experiment completed before.
+
+    Args:
+        session: The database session.
+        experiment_name: The name of the experiment.
+
+    Returns:
+        The ids of all project variants with a completed run group of this
+        experiment & configuration, see `project_id`.
+    """
+    import sqlalchemy as sa
+
+    from benchbuild.utils.schema import RunGroup
+
+    group = RunGroup.__table__
+    query = sa.select([
+        group.c.project_name, group.c.project_group, group.c.variant
+    ]).where(group.c.experiment_name == experiment_name).where(
+        group.c.config_hash == config_hash()
+    ).where(group.c.status == 'completed').distinct()
+    return {
+        project_id(name, group_name, variant)
+        for name, group_name, variant in session.execute(query)
+    }
+
+
+def prune(plan: tp.Iterable['actions.Step']) -> int:
+    """
+    Remove all chains of project variants that completed before.
+
+    Args:
+        plan: The plan we want to execute.
+
+    Returns:
+        The number of chains we removed.
+    """
+    from benchbuild.utils import actions
+    from benchbuild.utils.schema import Session
+
+    if not enabled():
+        return 0
+
+    num_pruned = 0
+    for exp_step in plan:
+        if not isinstance(exp_step, actions.Experiment):
+            continue
+
+        done = completed(Session(), exp_step.obj.name)
+        if not done:
+            continue
+
+        kept = []
+        for step in exp_step.actions:
+            if isinstance(step, actions.RequireAllOnDemand) and \
+                    step.project_id in done:
+                LOG.info("Skipping %s, it completed before.", step.project_id)
+                num_pruned += 1
+                continue
+            kept.append(step)
+        exp_step.actions = kept
+    return num_pruned
@@ -0,0 +1,209 @@
+"""
+A GNU make jobserver shared by all workers of benchbuild.
+
+With `parallel_processes > 1`, every worker compiles a project with
+`make -j <jobs>`, which results in `parallel_processes * jobs` compiler
+processes. Instead, the engine creates a single jobserver with `jobs` slots
+and every `make` we run by `benchbuild.utils.run.watch` takes part in it.
+
+The jobserver is a named pipe filled with one token per slot, as described
+in GNU make's jobserver protocol. Every top-level `make` owns one implicit
+slot, therefore, we only put `jobs - parallel_processes` tokens into the pipe.
+
+Our commands are executed with `close_fds`, so a `make` cannot inherit the
+pipe from us. We open the named pipe with a small shell trampoline instead
+and pass its file descriptor with `MAKEFLAGS` to `make`.
+An explicit `-j N` on make's command line would disable the jobserver, so it
+is removed from all commands we attach to the jobserver. Only a make that
+asks for parallel jobs is attached. A make without `-j` or with `-j1` builds
+serially, often on purpose, and stays that way.
+
+Commands that do not run through `benchbuild.utils.run.watch` cannot take
+part in the jobserver. For those, `get_number_of_jobs` (see
+`benchbuild.utils.settings`) returns the share of a single worker while a
+jobserver is active.
+"""
+import contextlib
+import copy
+import logging
+import os
+import re
+import shutil
+import tempfile
+import typing as tp
+
+from plumbum import local
+from plumbum.commands.base import BaseCommand, BoundCommand, BoundEnvCommand
+
+LOG = logging.getLogger(__name__)
+
+MAKE_BINARIES = ["make", "gmake"]
+JOBSERVER_FD = 3
+TRAMPOLINE = (
+    f'exec {JOBSERVER_FD}<>"$0" && '
+    f'MAKEFLAGS="-j --jobserver-auth={JOBSERVER_FD},{JOBSERVER_FD} '
+    '$MAKEFLAGS" exec "$@"'
+)
+
+__FIFO__: tp.Optional[str] = None
+__SHARE__: tp.Optional[int] = None
+
+
+def active() -> tp.Optional[str]:
+    """Return the path of the active jobserver's named pipe, if any."""
+    return __FIFO__
+
+
+def share() -> tp.Optional[int]:
+    """Return the jobs of a single worker of the active jobserver, if any."""
+    return __SHARE__
+
+
+def num_tokens(jobs: int, num_processes: int) -> int:
+    """The number of tokens a jobserver needs to allow `jobs` slots."""
+    return max(jobs - num_processes, 0)
+
+
+@contextlib.contextmanager
+def serve(jobs: int, num_processes: int) -> tp.Iterator[str]:
+    """
+    Provide a jobserver for all workers created inside this context.
+
+    Args:
+        jobs: The number of jobs that may run concurrently.
+        num_processes: The number of workers that run a make concurrently.
+
+    Yields:
+        The path of the jobserver's named pipe.
+    """
+    global __FIFO__, __SHARE__  # pylint: disable=global-statement
+
+    tmp_dir = tempfile.mkdtemp(prefix="benchbuild-jobserver-")
+    fifo = os.path.join(tmp_dir, "fifo")
+    os.mkfifo(fifo, 0o600)
+    # Holding the pipe open keeps the tokens alive without a reader.
+    fd = os.open(fifo, os.O_RDWR)
+    try:
+        os.write(fd, b'+' * num_tokens(jobs, num_processes))
+        LOG.debug("Jobserver with %d slots at: %s", jobs, fifo)
+        __FIFO__ = fifo
+        __SHARE__ = max(jobs // num_processes, 1)
+        yield fifo
+    finally:
+        __FIFO__ = None
+        __SHARE__ = None
+        os.close(fd)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def jobs_of(args: tp.Iterable[tp.Any]) -> tp.Optional[int]:
+    """
+    Return the job limit of make's arguments.
+
+    Args:
+        args: The arguments of a make command.
+
+    Returns:
+        The last limit given by '-jN', '-j N' or '--jobs=N', 0 for '-j' or
+        '--jobs' without a limit, None, if make runs a single job.
+    """
+    jobs: tp.Optional[int] = None
+    after_jobs = False
+    for arg in args:
+        arg_s = str(arg)
+        if after_jobs:
+            after_jobs = False
+            if arg_s.isdigit():
+                jobs = int(arg_s)
+                continue
+        if arg_s in ['-j', '--jobs']:
+            after_jobs = True
+            jobs = 0
+            continue
+        match = re.fullmatch(r'-j(\d+)|--jobs=(\d+)', arg_s)
+        if match:
+            jobs = int(match.group(1) or match.group(2))
+    return jobs
+
+
+def args_of(command: BaseCommand) -> tp.List[tp.Any]:
+    """Return all arguments bound to a plumbum command."""
+    args: tp.List[tp.Any] = []
+    while isinstance(command, (BoundCommand, BoundEnvCommand)):
+        if isinstance(command, BoundCommand):
+            args = list(command.args) + args
+        command = command.cmd
+    return args
+
+
+def strip_jobs(args: tp.Iterable[tp.Any]) -> tp.List[tp.Any]:
+    """
+    Remove all job limits from make's arguments.
+
+    Args:
+        args: The arguments of a make command.
+
+    Returns:
+        The arguments without '-j', '-jN', '-j N', '--jobs' or '--jobs=N'.
+    """
+    stripped: tp.List[tp.Any] = []
+    after_jobs = False
+    for arg in args:
+        arg_s = str(arg)
+        if after_jobs:
+            after_jobs = False
+            if arg_s.isdigit():
+                continue
+        if arg_s in ['-j', '--jobs']:
+            after_jobs = True
+            continue
+        if re.fullmatch(r'-j\d+|--jobs=\d+', arg_s):
+            continue
+        stripped.append(arg)
+    return stripped
+
+
+def executable_of(command: BaseCommand) -> tp.Optional[str]:
+    """Return the executable of a bound plumbum command, if there is one."""
+    while isinstance(command, (BoundCommand, BoundEnvCommand)):
+        command = command.cmd
+    executable = getattr(command, 'executable', None)
+    return None if executable is None else str(executable)
+
+
+def is_make(command: BaseCommand) -> bool:
+    executable = executable_of(command)
+    if executable is None:
+        return False
+    return os.path.basename(executable) in MAKE_BINARIES
+
+
+def attach(command: BaseCommand) -> BaseCommand:
+    """
+    Attach a make command to the active jobserver.
+
+    All other commands and make commands that do not ask for parallel
+    jobs are returned unchanged.
+
+    Args:
+        command: The command we want to execute.
+
+    Returns:
+        A copy of the command that takes part in the active jobserver.
+    """
+    fifo = active()
+    if fifo is None or not is_make(command):
+        return command
+    if jobs_of(args_of(command)) in (None, 1):
+        return command
+
+    def rebind(cmd: BaseCommand) -> BaseCommand:
+        if isinstance(cmd, (BoundCommand, BoundEnvCommand)):
+            new_cmd = copy.copy(cmd)
+            new_cmd.cmd = rebind(cmd.cmd)
+            if isinstance(cmd, BoundCommand):
+                new_cmd.args = strip_jobs(cmd.args)
+            return new_cmd
+        return local["sh"]["-c", TRAMPOLINE, fifo, executable_of(cmd)]
+
+    return rebind(command)
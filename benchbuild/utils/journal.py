@@ -0,0 +1,231 @@
+"""
+Persistent execution journal of benchbuild's plans.
+
+Every step inside a project's chain of steps is identified by the
+experiment it belongs to (the experiment's UUID), the project id and its
+position inside the chain. Whenever such a step completes successfully,
+we append a record to the journal of its experiment.
+
+If a plan is executed again with the same experiment UUID and resuming is
+enabled (``BB_JOURNAL_RESUME=true`` or ``benchbuild run --resume``), all
+steps that the journal knows as completed will be skipped.
+
+A chain that fails will be cleaned by its `onerror` handler, therefore,
+all records of a failing chain are discarded from the journal.
+"""
+import functools as ft
+import json
+import logging
+import os
+import typing as tp
+
+import attr
+from plumbum import local
+
+from benchbuild.settings import CFG
+from benchbuild.utils.path import flocked
+
+if tp.TYPE_CHECKING:
+    from benchbuild.utils import actions  # pylint: disable=unused-import
+
+LOG = logging.getLogger(__name__)
+
+
+def journal_dir() -> str:
+    """Return the directory we store all journals in."""
+    path = CFG["journal"]["path"].value
+    if not path:
+        path = os.path.join(str(CFG["build_dir"]), ".journal")
+    return str(path)
+
+
+@attr.s
+class Journal:
+    """
+    The execution journal of a single experiment.
+
+    Attributes:
+        path: The file the journal is stored in.
+    """
+    path: str = attr.ib()
+
+    _completed: tp.Optional[tp.Set[str]] = attr.ib(
+        default=None, init=False, repr=False, eq=False
+    )
+
+    @classmethod
+    def for_experiment(cls, experiment_id: tp.Any) -> 'Journal':
+        return cls(os.path.join(journal_dir(), f'{experiment_id}.journal'))
+
+    def __load(self) -> tp.Set[str]:
+        completed: tp.Set[str] = set()
+        if not os.path.exists(self.path):
+            return completed
+
+        with open(self.path, 'r') as journal_f:
+            for line in journal_f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    LOG.warning("Ignoring corrupt journal record: %s", line)
+                    continue
+                if 'done' in record:
+                    completed.add(record['done'])
+                if 'discard' in record:
+                    prefix = record['discard']
+                    completed = {
+                        key for key in completed if not key.startswith(prefix)
+                    }
+        return completed
+
+    @property
+    def completed(self) -> tp.Set[str]:
+        if self._completed is None:
+            self._completed = self.__load()
+        return self._completed
+
+    def __append(self, record: tp.Dict[str, str]) -> None:
+        local.path(self.path).dirname.mkdir()
+        with flocked(self.path + '.lock'):
+            with open(self.path, 'a') as journal_f:
+                journal_f.write(json.dumps(record) + '\n')
+
+    def is_completed(self, key: str) -> bool:
+        return key in self.completed
+
+    def record(self, key: str) -> None:
+        """Mark the step with the given key as completed."""
+        self.__append({'done': key})
+        self.completed.add(key)
+
+    def discard(self, prefix: str) -> None:
+        """Forget about all completed steps with the given key prefix."""
+        self.__append({'discard': prefix})
+        self._completed = {
+            key for key in self.completed if not key.startswith(prefix)
+        }
+
+
+@attr.s(frozen=True)
+class Entry:
+    """
+    The identity of a single step inside a journal.
+
+    Attributes:
+        journal: The journal this step is recorded in.
+        chain: Identity of the chain of steps this step belongs to.
+        position: Position of the step inside its chain.
+        name: The step's NAME.
+    """
+    journal: Journal = attr.ib(eq=False)
+    chain: str = attr.ib()
+    position: int = attr.ib()
+    name: str = attr.ib()
+
+    @property
+    def key(self) -> str:
+        return f'{self.chain}/{self.position}:{self.name}'
+
+    @property
+    def completed(self) -> bool:
+        return bool(CFG["journal"]["resume"]) and \
+            self.journal.is_completed(self.key)
+
+    def record(self) -> None:
+        self.journal.record(self.key)
+
+    def discard_chain(self) -> None:
+        self.journal.discard(f'{self.chain}/')
+
+
+def chain_id(chain: 'actions.RequireAll', position: int) -> str:
+    """Identify a chain by its project, or by position as fallback."""
+    project_id = getattr(chain, 'project_id', None)
+    if project_id:
+        return project_id
+
+    for step in chain.actions:
+        project_id = getattr(step.obj, 'id', None)
+        if isinstance(project_id, str):
+            return project_id
+    return f'#{position}'
+
+
+def builddir_of(chain: 'actions.RequireAll') -> tp.Optional[str]:
+    for step in chain.actions:
+        builddir = getattr(step.obj, 'builddir', None)
+        if builddir is not None:
+            return str(builddir)
+    return None
+
+
+def attach_chain(
+    journal: Journal, chain: 'actions.RequireAll', position: int
+) -> None:
+    """
+    Attach journal entries to all steps of a single chain.
+
+    Chains that were partially completed in a previous run can only be
+    resumed, if their build directory still exists. If not, we discard
+    the records of this chain.
+
+    Args:
+        journal: The journal of the chain's experiment.
+        chain: The chain we want to journal.
+        position: The position of the chain inside its experiment.
+    """
+    ident = chain_id(chain, position)
+    entries = [
+        Entry(journal, ident, pos, step.NAME)
+        for pos, step in enumerate(chain.actions)
+    ]
+    for step, entry in zip(chain.actions, entries):
+        step.journal = entry
+
+    if not CFG["journal"]["resume"]:
+        # Old records of this chain are invalid after a fresh start.
+        if any(journal.is_completed(e.key) for e in entries):
+            entries[0].discard_chain()
+        return
+
+    num_completed = len([e for e in entries if e.completed])
+    if num_completed == 0 or num_completed == len(entries):
+        return
+
+    builddir = builddir_of(chain)
+    if builddir and not os.path.exists(builddir):
+        LOG.warning("Cannot resume '%s', its build directory is gone.", ident)
+        entries[0].discard_chain()
+
+
+def attach(plan: tp.Iterable['actions.Step']) -> None:
+    """
+    Attach journal entries to all chains of the given plan.
+
+    Chains that create their steps on demand, are attached as soon as their
+    steps exist.
+
+    Args:
+        plan: The plan we want to journal.
+    """
+    from benchbuild.utils import actions
+
+    if not CFG["journal"]["enable"]:
+        return
+
+    for exp_step in plan:
+        if not isinstance(exp_step, actions.Experiment):
+            continue
+
+        journal = Journal.for_experiment(exp_step.obj.id)
+        chains = [
+            step for step in exp_step.actions
+            if isinstance(step, actions.RequireAll)
+        ]
+        for i, chain in enumerate(chains):
+            if isinstance(chain, actions.RequireAllOnDemand):
+                chain.when_created(
+                    ft.partial(attach_chain, journal, position=i)
+                )
+            else:
+                attach_chain(journal, chain, i)
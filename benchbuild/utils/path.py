@@ -126,6 +126,27 @@ def mkdir_interactive(dirpath: str) -> None:
         print("Created directory {0}.".format(dirpath))
 
 
+def copy_tree(src: str, dst: str, hardlink: bool = False) -> None:
+    """
+    Copy the contents of a directory into another one.
+
+    Files are shared between both directories, if possible. By default, we
+    use copy-on-write (reflinks) on filesystems that support it.
+    With hardlinks, both directories share the same inodes, so any in-place
+    modification of a file is visible in both places.
+
+    Args:
+        src: The directory we copy from.
+        dst: The directory we copy to. It will be created, if required.
+        hardlink: Share files with hardlinks instead of reflinks.
+    """
+    from benchbuild.utils.cmd import cp, mkdir
+
+    mkdir("-p", dst)
+    link_opt = "--link" if hardlink else "--reflink=auto"
+    cp("-a", link_opt, os.path.join(src, "."), dst)
+
+
 @contextmanager
 def flocked(filename: str, lock_type: int = fcntl.LOCK_EX):
     """
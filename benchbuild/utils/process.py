@@ -0,0 +1,329 @@
+"""
+Asynchronous execution of plumbum commands.
+
+All commands are executed by an event loop instead of a blocked thread per
+child process:
+    - the output of a child is streamed to a set of sinks while it runs, so
+      we do not have to keep it in memory, if nobody wants to have it,
+    - a timeout kills the child and raises `ProcessTimedOut`,
+    - the exit status of the child is collected with `wait4`, which gives
+      us the resource usage of every single child process.
+
+Many commands may run concurrently in the same event loop, see `run_all`.
+Synchronous callers use `run_sync` & `run_many`, which run an event loop
+of their own.
+"""
+import asyncio
+import codecs
+import concurrent.futures
+import logging
+import os
+import resource
+import signal
+import sys
+import time
+import typing as tp
+from subprocess import PIPE
+
+import attr
+from plumbum.commands.base import BaseCommand
+
+LOG = logging.getLogger(__name__)
+
+Sink = tp.Callable[[str], None]
+RetCode = tp.Optional[tp.Union[int, tp.Iterable[int]]]
+
+READ_SIZE = 64 * 1024
+POLL_INTERVAL = 0.1
+KILL_GRACE_PERIOD = 5.0
+
+
+@attr.s(frozen=True)
+class Completed:
+    """
+    A child process that has terminated.
+
+    Attributes:
+        argv: The command line of the child.
+        retcode: The exit code of the child, negative, if it was killed
+            by a signal.
+        stdout: The captured output of the child.
+        stderr: The captured error output of the child.
+        rusage: The resources the child consumed.
+        wall: The wall time of the child, in seconds.
+    """
+    argv: tp.List[str] = attr.ib()
+    retcode: int = attr.ib()
+    stdout: str = attr.ib(repr=False)
+    stderr: str = attr.ib(repr=False)
+    rusage: tp.Optional[resource.struct_rusage] = attr.ib(repr=False)
+    wall: float = attr.ib()
+
+
+def exit_code(status: int) -> int:
+    """Convert a wait status to an exit code, just like `Popen` does."""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+async def wait4(pid: int) -> tp.Tuple[int, resource.struct_rusage]:
+    """
+    Wait for a child to terminate, without blocking the event loop.
+
+    We prefer a pidfd that becomes readable, when the child terminates. If
+    the platform does not provide one, we poll.
+
+    Returns:
+        The exit code and the resource usage of the child.
+    """
+    loop = asyncio.get_running_loop()
+    pidfd = -1
+    if hasattr(os, 'pidfd_open'):
+        try:
+            pidfd = os.pidfd_open(pid)  # pylint: disable=no-member
+        except OSError:
+            pidfd = -1
+
+    try:
+        while True:
+            wpid, status, rusage = os.wait4(pid, os.WNOHANG)
+            if wpid == pid:
+                return exit_code(status), rusage
+
+            if pidfd >= 0:
+                exited = loop.create_future()
+                loop.add_reader(pidfd, exited.set_result, None)
+                try:
+                    await exited
+                finally:
+                    loop.remove_reader(pidfd)
+            else:
+                await asyncio.sleep(POLL_INTERVAL)
+    finally:
+        if pidfd >= 0:
+            os.close(pidfd)
+
+
+async def drain(
+    pipe: tp.IO[bytes], sinks: tp.Sequence[Sink],
+    captured: tp.Optional[tp.List[str]]
+) -> None:
+    """
+    Stream the output of a pipe to all sinks, until we reach EOF.
+
+    Args:
+        pipe: The pipe we read from.
+        sinks: Receive the decoded output, chunk by chunk.
+        captured: Collect the decoded output, if given.
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=READ_SIZE)
+    transport, _ = await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), pipe
+    )
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def emit(text: str) -> None:
+        if not text:
+            return
+        for sink in sinks:
+            sink(text)
+        if captured is not None:
+            captured.append(text)
+
+    try:
+        while True:
+            data = await reader.read(READ_SIZE)
+            if not data:
+                break
+            emit(decoder.decode(data))
+        emit(decoder.decode(b'', final=True))
+    finally:
+        transport.close()
+
+
+def tee_to(stream: tp.TextIO, buffered: bool = True) -> Sink:
+    """Create a sink that writes to a text stream, e.g., sys.stdout."""
+
+    def write(text: str) -> None:
+        stream.write(text)
+        if not buffered:
+            stream.flush()
+
+    return write
+
+
+def kill(proc: tp.Any) -> None:
+    try:
+        proc.kill()
+    except OSError:
+        pass
+
+
+def reap(pid: int) -> None:
+    try:
+        os.waitpid(pid, 0)
+    except ChildProcessError:
+        pass
+
+
+async def run(
+    command: BaseCommand,
+    *args: tp.Any,
+    retcode: RetCode = 0,
+    timeout: tp.Optional[float] = None,
+    tee: bool = True,
+    buffered: bool = True,
+    capture: bool = True,
+    stdout: tp.Sequence[Sink] = (),
+    stderr: tp.Sequence[Sink] = (),
+    **kwargs: tp.Any
+) -> Completed:
+    """
+    Execute a plumbum command.
+
+    Args:
+        command: The command we execute.
+        *args: Additional arguments for the command.
+        retcode: The expected exit code(s), None accepts any exit code.
+        timeout: Kill the command after that many seconds.
+        tee: Echo the output of the command to our own stdout/stderr.
+        buffered: Flush our own stdout/stderr after every chunk, if False.
+        capture: Keep the output of the command in memory.
+        stdout: Additional sinks for the output of the command.
+        stderr: Additional sinks for the error output of the command.
+        **kwargs: Passed on to the command's `popen`.
+
+    Returns:
+        The completed command.
+
+    Raises:
+        ProcessExecutionError: If the exit code is not expected.
+        ProcessTimedOut: If the command did not finish in time.
+    """
+    out_sinks = list(stdout)
+    err_sinks = list(stderr)
+    if tee:
+        out_sinks.append(tee_to(sys.stdout, buffered))
+        err_sinks.append(tee_to(sys.stderr, buffered))
+    out_captured: tp.Optional[tp.List[str]] = [] if capture else None
+    err_captured: tp.Optional[tp.List[str]] = [] if capture else None
+
+    kwargs.setdefault('stdin', None)
+    start = time.time()
+    proc = command.popen(args, stdout=PIPE, stderr=PIPE, **kwargs)
+    # Pipelines reap their source processes on `wait`. We reap the last
+    # process on our own, to obtain its resource usage.
+    popen = getattr(proc, '_proc', proc)
+
+    drains = asyncio.gather(
+        drain(proc.stdout, out_sinks, out_captured),
+        drain(proc.stderr, err_sinks, err_captured)
+    )
+    waiter = asyncio.ensure_future(wait4(proc.pid))
+    try:
+        code, rusage = await asyncio.wait_for(asyncio.shield(waiter), timeout)
+    except asyncio.TimeoutError:
+        LOG.debug("Killing %d after %s seconds", proc.pid, timeout)
+        proc._timed_out = True  # pylint: disable=protected-access
+        kill(proc)
+        code, rusage = await waiter
+    except BaseException:
+        kill(proc)
+        drains.cancel()
+        waiter.cancel()
+        reap(proc.pid)
+        popen.returncode = -signal.SIGKILL
+        raise
+    wall = time.time() - start
+
+    try:
+        # Background children of the command might keep our pipes open.
+        await asyncio.wait_for(
+            drains, KILL_GRACE_PERIOD if timeout is not None else None
+        )
+    except asyncio.TimeoutError:
+        LOG.debug("Stopped reading the output of %d", proc.pid)
+
+    popen.returncode = code
+    srcproc = getattr(proc, 'srcproc', None)
+    if srcproc is not None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, srcproc.wait)
+
+    out = ''.join(out_captured) if out_captured is not None else ''
+    err = ''.join(err_captured) if err_captured is not None else ''
+    proc.verify(retcode, timeout, out, err)
+
+    return Completed(
+        argv=getattr(proc, 'argv', None) or command.formulate(),
+        retcode=code,
+        stdout=out,
+        stderr=err,
+        rusage=rusage,
+        wall=wall
+    )
+
+
+async def run_all(
+    commands: tp.Iterable[BaseCommand],
+    limit: tp.Optional[int] = None,
+    **kwargs: tp.Any
+) -> tp.List[Completed]:
+    """
+    Execute many commands concurrently.
+
+    Args:
+        commands: The commands we execute.
+        limit: The maximal number of commands running at the same time,
+            None for no limit.
+        **kwargs: Passed on to `run` for every command.
+
+    Returns:
+        The completed commands, in the same order as the given commands.
+    """
+    semaphore = asyncio.Semaphore(limit) if limit else None
+
+    async def run_one(command: BaseCommand) -> Completed:
+        if semaphore is None:
+            return await run(command, **kwargs)
+        async with semaphore:
+            return await run(command, **kwargs)
+
+    return list(await asyncio.gather(*[run_one(cmd) for cmd in commands]))
+
+
+T = tp.TypeVar('T')
+
+
+def wait(coro: tp.Coroutine[tp.Any, tp.Any, T]) -> T:
+    """
+    Run a coroutine to completion, from synchronous code.
+
+    If we are called from inside a running event loop, the coroutine runs
+    in an event loop of its own, in a separate thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+def run_sync(
+    command: BaseCommand, *args: tp.Any, **kwargs: tp.Any
+) -> Completed:
+    """Execute a plumbum command synchronously. See `run`."""
+    return wait(run(command, *args, **kwargs))
+
+
+def run_many(
+    commands: tp.Iterable[BaseCommand],
+    limit: tp.Optional[int] = None,
+    **kwargs: tp.Any
+) -> tp.List[Completed]:
+    """Execute many commands concurrently & synchronously. See `run_all`."""
+    return wait(run_all(commands, limit=limit, **kwargs))
@@ -0,0 +1,195 @@
+"""
+Step-level timeline profiler.
+
+The profiler listens to the begin and end of every step (see
+`Step.ON_STEP_BEGIN` & `Step.ON_STEP_END`) and records:
+    - the wall time of the step,
+    - the CPU time of the step, both for the process itself and for all
+      child processes that terminated while the step was running,
+    - the peak RSS of the process and of its largest child process.
+
+Each process appends its events to a spool file of its own, so all worker
+processes of a plan are profiled as well. When the plan is finished, all
+events are merged into a single file in Chrome's trace event format, which
+opens in chrome://tracing or https://ui.perfetto.dev.
+"""
+import contextlib
+import datetime
+import glob
+import json
+import logging
+import os
+import resource
+import shutil
+import threading
+import time
+import typing as tp
+
+from benchbuild.settings import CFG
+
+if tp.TYPE_CHECKING:
+    from benchbuild.utils import actions  # pylint: disable=unused-import
+
+LOG = logging.getLogger(__name__)
+
+__SPOOL_DIR__: tp.Optional[str] = None
+__STACK__: tp.List[tp.Tuple[float, tp.Any, tp.Any]] = []
+__NAMED__: tp.Set[int] = set()
+
+
+def trace_path() -> str:
+    """Return the path of the trace file for the current run."""
+    path = CFG["profile"]["path"].value
+    if not path:
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(str(CFG["build_dir"]), f'trace-{stamp}.json')
+    return str(path)
+
+
+def now_us() -> float:
+    return time.time() * 1e6
+
+
+def emit(event: tp.Dict[str, tp.Any]) -> None:
+    """
+    Append a trace event to the spool file of this process.
+
+    The file is reopened for every event, because worker processes might
+    be terminated without flushing their buffers.
+    """
+    if __SPOOL_DIR__ is None:
+        return
+
+    pid = os.getpid()
+    events = []
+    if pid not in __NAMED__:
+        __NAMED__.add(pid)
+        events.append({
+            'name': 'process_name',
+            'ph': 'M',
+            'pid': pid,
+            'args': {
+                'name': f'benchbuild [{pid}]'
+            }
+        })
+    events.append(dict(event, pid=pid, tid=threading.get_ident()))
+
+    spool_file = os.path.join(__SPOOL_DIR__, f'{pid}.jsonl')
+    with open(spool_file, 'a') as spool:
+        for ev in events:
+            spool.write(json.dumps(ev, default=str) + '\n')
+
+
+def rusage_args(
+    begin_self: tp.Any, begin_children: tp.Any
+) -> tp.Dict[str, tp.Any]:
+    """Difference in resource usage, since the given snapshots."""
+    end_self = resource.getrusage(resource.RUSAGE_SELF)
+    end_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    def cpu(end: tp.Any, begin: tp.Any) -> float:
+        return round((end.ru_utime - begin.ru_utime) +
+                     (end.ru_stime - begin.ru_stime), 6)
+
+    return {
+        'cpu_s': cpu(end_self, begin_self),
+        'children_cpu_s': cpu(end_children, begin_children),
+        'children_user_s':
+            round(end_children.ru_utime - begin_children.ru_utime, 6),
+        'children_system_s':
+            round(end_children.ru_stime - begin_children.ru_stime, 6),
+        'max_rss_kb': end_self.ru_maxrss,
+        'children_max_rss_kb': end_children.ru_maxrss
+    }
+
+
+def begin() -> None:
+    __STACK__.append((
+        now_us(), resource.getrusage(resource.RUSAGE_SELF),
+        resource.getrusage(resource.RUSAGE_CHILDREN)
+    ))
+
+
+def end(name: str, category: str, **kwargs: tp.Any) -> None:
+    if not __STACK__:
+        return
+    start, begin_self, begin_children = __STACK__.pop()
+    args = rusage_args(begin_self, begin_children)
+    args.update(kwargs)
+    emit({
+        'name': name,
+        'cat': category,
+        'ph': 'X',
+        'ts': start,
+        'dur': now_us() - start,
+        'args': args
+    })
+
+
+@contextlib.contextmanager
+def span(name: str, category: str, **kwargs: tp.Any) -> tp.Iterator[None]:
+    """Profile an arbitrary section of code."""
+    begin()
+    try:
+        yield
+    finally:
+        end(name, category, **kwargs)
+
+
+def on_step_begin(step: 'actions.Step') -> None:
+    del step
+    begin()
+
+
+def on_step_end(step: 'actions.Step', func: tp.Callable[..., tp.Any]) -> None:
+    del func
+    obj_name = getattr(step.obj, 'name', None)
+    name = f'{step.NAME}: {obj_name}' if obj_name else step.NAME
+    end(name, step.NAME, status=step.status.name)
+
+
+@contextlib.contextmanager
+def trace(path: str) -> tp.Iterator[str]:
+    """
+    Profile all steps executed inside this context.
+
+    Args:
+        path: The trace file we write, when the context is left.
+
+    Yields:
+        The path of the trace file.
+    """
+    from benchbuild.utils.actions import Step
+
+    global __SPOOL_DIR__  # pylint: disable=global-statement
+
+    spool_dir = path + '.d'
+    os.makedirs(spool_dir, exist_ok=True)
+    __SPOOL_DIR__ = spool_dir
+    __NAMED__.clear()
+    Step.ON_STEP_BEGIN.append(on_step_begin)
+    Step.ON_STEP_END.append(on_step_end)
+    try:
+        yield path
+    finally:
+        Step.ON_STEP_BEGIN.remove(on_step_begin)
+        Step.ON_STEP_END.remove(on_step_end)
+        __SPOOL_DIR__ = None
+        merge(spool_dir, path)
+        LOG.info("Wrote the trace of all steps to: %s", path)
+
+
+def merge(spool_dir: str, path: str) -> None:
+    """Merge all spool files into a single trace file."""
+    events = []
+    for spool_file in sorted(glob.glob(os.path.join(spool_dir, '*.jsonl'))):
+        with open(spool_file, 'r') as spool:
+            for line in spool:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    LOG.debug("Ignoring truncated trace event: %s", line)
+
+    with open(path, 'w') as trace_file:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace_file)
+    shutil.rmtree(spool_dir, ignore_errors=True)
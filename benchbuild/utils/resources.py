@@ -0,0 +1,217 @@
+"""
+Resource budgets of schedulable nodes.
+
+Every node of an execution plan consumes a budget of CPUs and memory
+(peak RSS of its whole process tree) while it runs. A budget is either
+declared by the project, e.g., with a `SlurmMem` requirement, or learned
+from previous executions of the same node. The scheduler only dispatches a
+node, if its budget fits into the remaining capacity of the machine.
+
+Learned budgets are stored in a ledger inside the build directory.
+"""
+import json
+import logging
+import os
+import resource
+import threading
+import time
+import typing as tp
+
+import attr
+import psutil
+
+from benchbuild.settings import CFG
+from benchbuild.utils.path import flocked
+from benchbuild.utils.requirements import SlurmMem, _to_bytes
+from benchbuild.utils.settings import get_number_of_jobs
+
+LOG = logging.getLogger(__name__)
+
+
+@attr.s(frozen=True)
+class Budget:
+    """
+    The resources a node consumes.
+
+    Attributes:
+        cpus: The number of CPUs the node keeps busy on average.
+        memory: The peak resident set size of the node, in bytes.
+    """
+    cpus: float = attr.ib(default=1.0)
+    memory: int = attr.ib(default=0)
+
+    def __add__(self, rhs: 'Budget') -> 'Budget':
+        return Budget(self.cpus + rhs.cpus, self.memory + rhs.memory)
+
+    def __sub__(self, rhs: 'Budget') -> 'Budget':
+        return Budget(self.cpus - rhs.cpus, self.memory - rhs.memory)
+
+    def fits(self, capacity: 'Budget') -> bool:
+        return self.cpus <= capacity.cpus and self.memory <= capacity.memory
+
+
+NOTHING = Budget(cpus=0, memory=0)
+
+
+def physical_memory() -> int:
+    return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+
+
+def capacity() -> Budget:
+    """The resources all nodes may consume together, by configuration."""
+    cpus = float(CFG["resources"]["cpus"].value)
+    if cpus <= 0:
+        cpus = float(get_number_of_jobs(CFG))
+
+    memory_cfg = str(CFG["resources"]["memory"])
+    memory = int(memory_cfg) if memory_cfg.isdigit() else _to_bytes(memory_cfg)
+    if memory <= 0:
+        memory = physical_memory()
+    return Budget(cpus=cpus, memory=memory)
+
+
+def declared(obj: tp.Any) -> tp.Optional[Budget]:
+    """
+    Return the budget an object (usually a project) declares.
+
+    Args:
+        obj: The object of a step.
+    """
+    requirements = getattr(obj, 'REQUIREMENTS', None) or []
+    memory = [req.mem_req for req in requirements if isinstance(req, SlurmMem)]
+    if not memory:
+        return None
+    return Budget(memory=max(memory))
+
+
+def ledger_path() -> str:
+    path = CFG["resources"]["ledger"].value
+    if not path:
+        path = os.path.join(str(CFG["build_dir"]), ".budgets.json")
+    return str(path)
+
+
+@attr.s
+class Ledger:
+    """
+    The learned budgets of all nodes, we executed before.
+
+    Attributes:
+        path: The file the ledger is stored in.
+    """
+    path: str = attr.ib(default=attr.Factory(ledger_path))
+
+    budgets: tp.Dict[str, Budget] = attr.ib(
+        init=False, default=attr.Factory(dict), repr=False
+    )
+
+    def __attrs_post_init__(self) -> None:
+        self.budgets = self.__load()
+
+    def __load(self) -> tp.Dict[str, Budget]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as ledger_f:
+                raw = json.load(ledger_f)
+        except ValueError:
+            LOG.warning("Ignoring corrupt resource ledger: %s", self.path)
+            return {}
+        return {key: Budget(**value) for key, value in raw.items()}
+
+    def get(self, key: str) -> tp.Optional[Budget]:
+        return self.budgets.get(key)
+
+    def learn(self, key: str, observed: Budget) -> None:
+        """
+        Learn the budget of a node from an observed execution.
+
+        We keep the highest peak memory we observed, because underestimating
+        the memory is more harmful than wasting a bit of it.
+        """
+        known = self.budgets.get(key, NOTHING)
+        self.budgets[key] = Budget(
+            cpus=observed.cpus, memory=max(known.memory, observed.memory)
+        )
+
+    def save(self) -> None:
+        """Merge our budgets into the ledger on disk."""
+        lock = self.path + '.lock'
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with flocked(lock):
+            on_disk = self.__load()
+            on_disk.update(self.budgets)
+            raw = {key: attr.asdict(value) for key, value in on_disk.items()}
+            with open(self.path, 'w') as ledger_f:
+                json.dump(raw, ledger_f, indent=2)
+
+
+def tree_rss(pid: tp.Optional[int] = None) -> int:
+    """The summed resident set size of a process and all its descendants."""
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return 0
+
+    rss = 0
+    for proc in processes:
+        try:
+            rss += proc.memory_info().rss
+        except psutil.Error:
+            # The process exited in the meantime.
+            continue
+    return rss
+
+
+@attr.s
+class Usage:
+    """
+    Measure the resources this process and its children consumed.
+
+    `getrusage` only knows the peak RSS of the single largest process. A
+    parallel build, e.g., `make -j8`, runs many compilers at once, so we
+    sample the summed RSS of the whole process tree every `interval`
+    seconds in a background thread, until the budget is taken.
+    """
+
+    start: float = attr.ib(default=attr.Factory(time.time))
+    interval: float = attr.ib(default=0.25)
+
+    _peak: int = attr.ib(init=False, default=0)
+    _done: threading.Event = attr.ib(
+        init=False, default=attr.Factory(threading.Event)
+    )
+    _sampler: tp.Optional[threading.Thread] = attr.ib(init=False, default=None)
+
+    def __attrs_post_init__(self) -> None:
+        self._sampler = threading.Thread(target=self.__sample, daemon=True)
+        self._sampler.start()
+
+    def __sample(self) -> None:
+        while True:
+            self._peak = max(self._peak, tree_rss())
+            if self._done.wait(self.interval):
+                return
+
+    def budget(self) -> Budget:
+        """
+        The resources consumed since we started measuring.
+
+        This is only accurate in a fresh (worker) process, because
+        `getrusage` reports the peak RSS over the whole lifetime.
+        Processes that live shorter than the sampling interval are missed
+        by the tree's peak, so the peak RSS of the largest single process
+        is a lower bound.
+        """
+        self._done.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+        wall = max(time.time() - self.start, 1e-3)
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu_time = own.ru_utime + own.ru_stime + \
+            children.ru_utime + children.ru_stime
+        peak = max(self._peak, own.ru_maxrss * 1024, children.ru_maxrss * 1024)
+        return Budget(cpus=round(cpu_time / wall, 2), memory=peak)
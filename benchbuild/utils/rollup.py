@@ -0,0 +1,194 @@
+"""
+Incremental rollup of all metrics.
+
+Reports aggregate the metrics of an experiment per project & variant. The
+table `metrics_rollup` holds these aggregates (count, sum, sum of squares,
+min & max) for every experiment, project, variant & metric name, so
+reports do not have to join & scan all runs of the database.
+
+The rollup is updated in the same transaction that inserts the metrics,
+no matter whether they are written by a session, by the batch writer or by
+the ingestion of spool files. Every metric is counted exactly once, so the
+latency of a report does not grow with the history of the database.
+"""
+import collections
+import logging
+import typing as tp
+
+from benchbuild.settings import CFG
+
+if tp.TYPE_CHECKING:
+    import sqlalchemy as sa  # pylint: disable=unused-import
+
+LOG = logging.getLogger(__name__)
+
+Row = tp.Dict[str, tp.Any]
+Key = tp.Tuple[tp.Any, str, str, str, str]
+
+
+def enabled() -> bool:
+    return bool(CFG["db"]["rollup"])
+
+
+def aggregate(runs: tp.Dict[int, tp.Tuple[tp.Any, str, str, str]],
+              rows: tp.Iterable[Row]) -> tp.Dict[Key, tp.List[float]]:
+    """
+    Aggregate metric rows by experiment, project, variant & metric name.
+
+    Args:
+        runs: The (experiment, project name, project group, variant) of
+            every run, by run id.
+        rows: The metric rows.
+
+    Returns:
+        [count, sum, sum of squares, min, max] by rollup key.
+    """
+    aggregates: tp.Dict[Key, tp.List[float]] = collections.OrderedDict()
+    for row in rows:
+        value = row.get('value')
+        if value is None or row['run_id'] not in runs:
+            continue
+        value = float(value)
+        key = runs[row['run_id']] + (row['name'],)
+        if key not in aggregates:
+            aggregates[key] = [1, value, value * value, value, value]
+            continue
+        agg = aggregates[key]
+        agg[0] += 1
+        agg[1] += value
+        agg[2] += value * value
+        agg[3] = min(agg[3], value)
+        agg[4] = max(agg[4], value)
+    return aggregates
+
+
+def merge(session: tp.Any, aggregates: tp.Dict[Key,
+                                                tp.List[float]]) -> None:
+    """Add aggregates to the rollup."""
+    import sqlalchemy as sa
+
+    from benchbuild.utils.schema import MetricRollup
+
+    table = MetricRollup.__table__
+    c = table.c
+    for key, (count, total, total_sq, low, high) in aggregates.items():
+        exp_id, prj_name, prj_group, variant, name = key
+        where = sa.and_(
+            c.experiment_group == exp_id, c.project_name == prj_name,
+            c.project_group == prj_group, c.variant == variant,
+            c.name == name
+        )
+        update = table.update().where(where).values(
+            count=c.count + count,
+            sum=c.sum + total,
+            sum_sq=c.sum_sq + total_sq,
+            min=sa.case([(c.min <= low, c.min)], else_=low),
+            max=sa.case([(c.max >= high, c.max)], else_=high)
+        )
+        if session.execute(update).rowcount:
+            continue
+
+        try:
+            # Another process might insert the same key concurrently.
+            with session.begin_nested():
+                session.execute(
+                    table.insert(), {
+                        'experiment_group': exp_id,
+                        'project_name': prj_name,
+                        'project_group': prj_group,
+                        'variant': variant,
+                        'name': name,
+                        'count': count,
+                        'sum': total,
+                        'sum_sq': total_sq,
+                        'min': low,
+                        'max': high
+                    }
+                )
+        except sa.exc.IntegrityError:
+            session.execute(update)
+
+
+def update(session: tp.Any, table: 'sa.Table', rows: tp.List[Row]) -> None:
+    """
+    Add metrics to the rollup, right after they were inserted.
+
+    Rows of tables other than 'metrics' are ignored.
+
+    Args:
+        session: The transaction that inserted the rows.
+        table: The table of the inserted rows.
+        rows: The inserted rows, as mapping from column names to values.
+    """
+    if table.name != 'metrics' or not rows or not enabled():
+        return
+
+    import sqlalchemy as sa
+
+    from benchbuild.utils.schema import Run
+
+    run = Run.__table__
+    run_ids = list({row['run_id'] for row in rows})
+    query = sa.select([
+        run.c.id, run.c.experiment_group, run.c.project_name,
+        run.c.project_group, run.c.variant
+    ]).where(run.c.id.in_(run_ids)).where(run.c.experiment_group.isnot(None))
+    runs = {
+        run_id: (exp_id, prj_name, prj_group, variant or '')
+        for run_id, exp_id, prj_name, prj_group, variant in
+        session.execute(query)
+    }
+    merge(session, aggregate(runs, rows))
+
+
+def rebuild(session: tp.Any) -> None:
+    """Recompute the whole rollup from all metrics in the database."""
+    import sqlalchemy as sa
+
+    from benchbuild.utils.schema import Metric, MetricRollup, Run
+
+    run = Run.__table__
+    metric = Metric.__table__
+    rollup = MetricRollup.__table__
+    key = [
+        run.c.experiment_group, run.c.project_name, run.c.project_group,
+        sa.func.coalesce(run.c.variant, ''), metric.c.name
+    ]
+    query = sa.select(key + [
+        sa.func.count(metric.c.value),
+        sa.func.sum(metric.c.value),
+        sa.func.sum(metric.c.value * metric.c.value),
+        sa.func.min(metric.c.value),
+        sa.func.max(metric.c.value)
+    ]).select_from(metric.join(run, run.c.id == metric.c.run_id)).where(
+        metric.c.value.isnot(None)
+    ).where(run.c.experiment_group.isnot(None)).group_by(*key)
+
+    session.execute(rollup.delete())
+    session.execute(
+        rollup.insert().from_select([
+            'experiment_group', 'project_name', 'project_group', 'variant',
+            'name', 'count', 'sum', 'sum_sq', 'min', 'max'
+        ], query)
+    )
+
+
+def summary(session: tp.Any) -> tp.Any:
+    """
+    Query the rollup, with the mean & the sample variance of every metric.
+
+    Filter the query, e.g., by `MetricRollup.experiment_group`.
+    """
+    import sqlalchemy as sa
+
+    from benchbuild.utils.schema import MetricRollup as R
+
+    count = sa.cast(R.count, sa.Float)
+    variance = sa.case([(R.count > 1, (R.sum_sq - R.sum * R.sum / count) /
+                         (count - 1))],
+                       else_=None)
+    return session.query(
+        R.experiment_group, R.project_name, R.project_group, R.variant,
+        R.name, R.count, (R.sum / count).label('mean'),
+        variance.label('variance'), R.min, R.max
+    )
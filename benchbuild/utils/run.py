@@ -7,11 +7,15 @@ import typing as t
 from contextlib import contextmanager
 
 import attr
-from plumbum import TEE, local
+from plumbum import local
 from plumbum.commands import ProcessExecutionError
 from plumbum.commands.base import BaseCommand
 
 from benchbuild import settings, signals
+from benchbuild.runtime import (  # pylint: disable=unused-import
+    exit_code_from_run_infos,
+)
+from benchbuild.utils import blobs, jobserver, process, spool, writer
 
 if sys.version_info <= (3, 8):
     from typing_extensions import Protocol
@@ -31,6 +35,28 @@ CFG = settings.CFG
 LOG = logging.getLogger(__name__)
 
 
+def is_deferred() -> bool:
+    """Check, if runs are written to the spool or by the batch writer."""
+    return spool.enabled() or writer.writer() is not None
+
+
+def run_config() -> str:
+    """
+    The configuration we store in the log of every run.
+
+    We leave out the id of the previous run, so the configurations of all
+    runs of an experiment are identical and stored only once.
+    """
+    if "run_id" not in CFG["db"]:
+        return repr(CFG)
+
+    run_id = CFG["db"]["run_id"].__to_env_var__()
+    return "\n".join(
+        line for line in repr(CFG).split("\n")
+        if not line.startswith(run_id + "=")
+    )
+
+
 @attr.s(eq=False)
 class RunInfo:
     """
@@ -50,6 +76,8 @@ class RunInfo:
         stderr ():
         db_run ():
         session ():
+        rusage (): The resources the command consumed, as reported by wait4.
+        wall (): The wall time of the command, in seconds.
     """
 
     def __begin(self, command: BaseCommand, project, experiment, group):
@@ -72,15 +100,70 @@ class RunInfo:
         db_run, session = create_run(command, project, experiment, group)
         db_run.begin = datetime.datetime.now()
         db_run.status = 'running'
+        self.db_run = db_run
+        self.session = session
+        if is_deferred():
+            return
+
         log = s.RunLog()
         log.run_id = db_run.id
         log.begin = datetime.datetime.now()
-        log.config = repr(CFG)
+        self.__store_texts(log, config=run_config())
         session.add(log)
         session.add(db_run)
 
-        self.db_run = db_run
-        self.session = session
+    def __store_texts(self, log, **texts):
+        """Store the texts of a log, in the log itself or as blobs."""
+        values, rows = blobs.references(**texts)
+        blobs.store(self.session, rows)
+        for name, value in values.items():
+            setattr(log, name, value)
+
+    def __end_deferred(self, status, retcode, stdout, stderr):
+        """
+        End a run in the spool or in the batch writer.
+
+        The log of the run is inserted once, when the run ends, instead of
+        being inserted at the beginning and updated at the end.
+        """
+        from benchbuild.utils.schema import Blob, Run, RunLog
+
+        end = datetime.datetime.now()
+        self.db_run.end = end
+        self.db_run.status = status
+        texts, blob_rows = blobs.references(
+            config=run_config(), stdout=stdout, stderr=stderr
+        )
+        log = {
+            'run_id': self.db_run.id,
+            'begin': self.db_run.begin,
+            'end': end,
+            'status': retcode,
+            **texts
+        }
+
+        if spool.enabled():
+            spool.write(
+                Run.__tablename__, [{
+                    col.key: getattr(self.db_run, col.key)
+                    for col in Run.__table__.columns
+                }]
+            )
+            spool.write(Blob.__tablename__, blob_rows)
+            spool.write(RunLog.__tablename__, [log])
+            return
+
+        batch = writer.writer()
+        assert batch is not None
+        batch.insert(Blob.__table__, blob_rows)
+        batch.insert(RunLog.__table__, [log])
+        batch.update(
+            Run.__table__, self.db_run.id, {
+                'begin': self.db_run.begin,
+                'end': end,
+                'status': status
+            }
+        )
 
     def __end(self, stdout, stderr):
         """
@@ -97,11 +180,14 @@ class RunInfo:
         """
         from benchbuild.utils.schema import RunLog
 
+        if is_deferred():
+            self.__end_deferred('completed', 0, stdout, stderr)
+            return
+
         run_id = self.db_run.id
 
         log = self.session.query(RunLog).filter(RunLog.run_id == run_id).one()
-        log.stderr = stderr
-        log.stdout = stdout
+        self.__store_texts(log, stdout=stdout, stderr=stderr)
         log.status = 0
         log.end = datetime.datetime.now()
 
@@ -125,11 +211,16 @@ class RunInfo:
             stderr: The stderr we capture of the run.
         """
         from benchbuild.utils.schema import RunLog
+
+        if is_deferred():
+            self.failed = True
+            self.__end_deferred('failed', retcode, stdout, stderr)
+            return
+
         run_id = self.db_run.id
 
         log = self.session.query(RunLog).filter(RunLog.run_id == run_id).one()
-        log.stderr = stderr
-        log.stdout = stdout
+        self.__store_texts(log, stdout=stdout, stderr=stderr)
         log.status = retcode
         log.end = datetime.datetime.now()
 
@@ -150,16 +241,22 @@ class RunInfo:
     db_run = attr.ib(init=False, default=None)
     session = attr.ib(init=False, default=None, repr=False)
     payload = attr.ib(init=False, default=None, repr=False)
+    rusage = attr.ib(init=False, default=None, repr=False)
+    wall = attr.ib(init=False, default=None, repr=False)
 
     def __attrs_post_init__(self):
         self.__begin(
             self.cmd, self.project, self.experiment, self.project.run_uuid
         )
-        signals.handlers.register(self.__fail, 15, "SIGTERM", "SIGTERM")
+        signals.handlers.register(self.__terminate)
 
         run_id = self.db_run.id
         settings.CFG["db"]["run_id"] = run_id
 
+    def __terminate(self):
+        self.__fail(15, "SIGTERM", "SIGTERM")
+        writer.flush()
+
     def add_payload(self, name, payload):
         if self == payload:
             return
@@ -179,20 +276,23 @@ class RunInfo:
         with local.env(**cmd_env):
             try:
                 bin_name = sys.argv[0]
-                retcode, stdout, stderr = \
-                    self.cmd & TEE(retcode=expected_retcode)
                 f_stdout = bin_name + ".stdout"
                 f_stderr = bin_name + ".stderr"
-                with open(f_stdout, 'w') as fd_stdout:
-                    fd_stdout.write(stdout)
-
-                with open(f_stderr, 'w') as fd_stderr:
-                    fd_stderr.write(stderr)
-
-                self.retcode = retcode
-                self.stdout = stdout
-                self.stderr = stderr
-                self.__end(str(stdout), str(stderr))
+                with open(f_stdout, 'w') as fd_stdout, \
+                        open(f_stderr, 'w') as fd_stderr:
+                    result = process.run_sync(
+                        self.cmd,
+                        retcode=expected_retcode,
+                        stdout=[fd_stdout.write],
+                        stderr=[fd_stderr.write]
+                    )
+
+                self.retcode = result.retcode
+                self.stdout = result.stdout
+                self.stderr = result.stderr
+                self.rusage = result.rusage
+                self.wall = result.wall
+                self.__end(str(result.stdout), str(result.stderr))
             except ProcessExecutionError as ex:
                 self.__fail(ex.retcode, ex.stderr, ex.stdout)
                 self.retcode = ex.retcode
@@ -202,19 +302,38 @@ class RunInfo:
                 LOG.debug("Tracked process failed")
                 LOG.error(str(ex))
             except KeyboardInterrupt:
-                self.retcode = retcode
-                self.stdout = stdout
-                self.stderr = stderr
                 self.__fail(-1, "", "KeyboardInterrupt")
                 LOG.warning("Interrupted by user input")
                 raise
             finally:
-                signals.handlers.deregister(self.__fail)
+                signals.handlers.deregister(self.__terminate)
+
+        return self
 
+    def replay(self, retcode: int, stdout: str, stderr: str) -> 'RunInfo':
+        """
+        End the run with a known result, instead of executing the command.
+
+        Args:
+            retcode: The return code of a previous execution.
+            stdout: The stdout of a previous execution.
+            stderr: The stderr of a previous execution.
+        """
+        self.retcode = retcode
+        self.stdout = stdout
+        self.stderr = stderr
+        try:
+            if retcode == 0:
+                self.__end(stdout, stderr)
+            else:
+                self.__fail(retcode, stdout, stderr)
+        finally:
+            signals.handlers.deregister(self.__terminate)
         return self
 
     def commit(self):
-        self.session.commit()
+        if self.session is not None:
+            self.session.commit()
 
 
 def begin_run_group(project, experiment):
@@ -267,31 +386,6 @@ def fail_run_group(group, session):
     session.commit()
 
 
-def exit_code_from_run_infos(run_infos: t.List[RunInfo]) -> int:
-    """Generate a single exit code from a list of RunInfo objects.
-
-    Takes a list of RunInfos and returns the exit code that is furthest away
-    from 0.
-
-    Args:
-        run_infos (t.List[RunInfo]): [description]
-
-    Returns:
-        int: [description]
-    """
-    assert run_infos is not None
-
-    if not hasattr(run_infos, "__iter__"):
-        return run_infos.retcode
-
-    rcs = [ri.retcode for ri in run_infos]
-    max_rc = max(rcs)
-    min_rc = min(rcs)
-    if max_rc == 0:
-        return min_rc
-    return max_rc
-
-
 @contextmanager
 def track_execution(cmd, project, experiment, **kwargs):
     """Guard the execution of the given command.
@@ -324,10 +418,9 @@ def watch(command: BaseCommand) -> WatchableCommand:
     """
 
     def f(*args: t.Any, retcode: int = 0, **kwargs: t.Any) -> CommandResult:
-        final_command = command[args]
-        return t.cast(
-            CommandResult, final_command.run_tee(retcode=retcode, **kwargs)
-        )
+        final_command = jobserver.attach(command[args])
+        result = process.run_sync(final_command, retcode=retcode, **kwargs)
+        return result.retcode, result.stdout, result.stderr
 
     return f
 
@@ -21,13 +21,15 @@ As soon as we have alembic running, we can provide automatic up/downgrade
 paths for you.
 """
 
+import datetime
 import functools
+import hashlib
 import logging
+import os
 import sys
 import typing as tp
 import uuid
 
-import migrate.versioning.api as migrate
 import sqlalchemy as sa
 from sqlalchemy import (
     Column,
@@ -35,7 +37,9 @@ from sqlalchemy import (
     Enum,
     ForeignKey,
     ForeignKeyConstraint,
+    Index,
     Integer,
+    LargeBinary,
     String,
     create_engine,
 )
@@ -45,7 +49,7 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.types import CHAR, Float, TypeDecorator
 
 from benchbuild import settings
-from benchbuild.utils import path
+from benchbuild.utils import path, sqlite
 from benchbuild.utils import user_interface as ui
 
 BASE = declarative_base()
@@ -121,10 +125,12 @@ class GUID(TypeDecorator):
         return dialect.type_descriptor(CHAR(32))
 
     def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
         return str(value)
 
     def process_result_value(self, value, dialect):
-        if isinstance(value, uuid.UUID):
+        if value is None or isinstance(value, uuid.UUID):
             return value
 
         return uuid.UUID(str(value))
@@ -146,6 +152,7 @@ class Run(BASE):
     project_name = Column(String, index=True)
     project_group = Column(String, index=True)
     experiment_name = Column(String, index=True)
+    variant = Column(String, index=True)
     run_group = Column(GUID(as_uuid=True), index=True)
     experiment_group = Column(
         GUID(as_uuid=True),
@@ -188,9 +195,21 @@ class Run(BASE):
 
 
 class RunGroup(BASE):
-    """ Store information about a run group. """
+    """
+    Store information about a run group.
+
+    A run group records what it measured: the experiment's name, the
+    project, its variant & a hash of the configuration. See
+    `benchbuild.utils.incremental`.
+    """
 
     __tablename__ = 'rungroup'
+    __table_args__ = (
+        Index(
+            'ix_rungroup_identity', 'experiment_name', 'config_hash',
+            'status'
+        ),
+    )
 
     id = Column(GUID(as_uuid=True), primary_key=True, index=True)
     experiment = Column(
@@ -198,6 +217,11 @@ class RunGroup(BASE):
         ForeignKey("experiment.id", ondelete="CASCADE", onupdate="CASCADE"),
         index=True
     )
+    experiment_name = Column(String)
+    project_name = Column(String)
+    project_group = Column(String)
+    variant = Column(String)
+    config_hash = Column(String(64))
 
     begin = Column(DateTime(timezone=False))
     end = Column(DateTime(timezone=False))
@@ -278,6 +302,45 @@ class Metric(BASE):
         return "{0} - {1}".format(self.name, self.value)
 
 
+class MetricRollup(BASE):
+    """
+    Store aggregates of all metrics of an experiment, project & variant.
+
+    The rollup is maintained incrementally, whenever metrics are written.
+    See `benchbuild.utils.rollup`.
+    """
+
+    __tablename__ = 'metrics_rollup'
+    __table_args__ = (
+        Index(
+            'ix_metrics_rollup_project', 'project_name', 'project_group',
+            'name'
+        ),
+    )
+
+    experiment_group = Column(
+        GUID(as_uuid=True),
+        ForeignKey("experiment.id", ondelete="CASCADE", onupdate="CASCADE"),
+        primary_key=True,
+        index=True
+    )
+    project_name = Column(String, primary_key=True)
+    project_group = Column(String, primary_key=True)
+    variant = Column(String, primary_key=True, default='')
+    name = Column(String, primary_key=True, index=True)
+    count = Column(Integer, nullable=False)
+    sum = Column(Float, nullable=False)
+    sum_sq = Column(Float, nullable=False)
+    min = Column(Float)
+    max = Column(Float)
+
+    def __repr__(self):
+        return "<MetricRollup: {0}/{1}@{2} {3} count={4}>".format(
+            self.project_name, self.project_group, self.variant, self.name,
+            self.count
+        )
+
+
 class RunLog(BASE):
     """
     Store log information for every run.
@@ -300,6 +363,29 @@ class RunLog(BASE):
     config = Column(String)
     stderr = Column(String)
     stdout = Column(String)
+    config_hash = Column(String(64))
+    stderr_hash = Column(String(64))
+    stdout_hash = Column(String(64))
+
+
+class Blob(BASE):
+    """
+    Store compressed texts of the run log, once per content.
+
+    See `benchbuild.utils.blobs`.
+    """
+
+    __tablename__ = 'blob'
+
+    hash = Column(String(64), primary_key=True)
+    encoding = Column(String, nullable=False)
+    size = Column(Integer)
+    data = Column(LargeBinary)
+
+    def __repr__(self):
+        return "<Blob: {0} {1} size={2}>".format(
+            self.hash, self.encoding, self.size
+        )
 
 
 class Metadata(BASE):
@@ -342,6 +428,20 @@ class Config(BASE):
     value = Column(String)
 
 
+class SchemaMarker(BASE):
+    """
+    Mark a database as validated for a schema.
+
+    A process that finds the hash of its schema in this table skips the
+    creation of tables and all migration checks, see `SessionManager`.
+    """
+
+    __tablename__ = 'schema_marker'
+
+    schema_hash = Column(String(64), primary_key=True)
+    validated = Column(DateTime(timezone=False))
+
+
 def needed_schema(connection, meta):
     try:
         meta.create_all(connection, checkfirst=False)
@@ -363,6 +463,76 @@ def needed_schema(connection, meta):
     return True
 
 
+@functools.lru_cache(maxsize=1)
+def schema_hash() -> str:
+    """
+    Hash the schema of all tables and the migration scripts we ship.
+
+    The hash changes with every change of a table and with every new
+    migration, so a marker of an older benchbuild never matches.
+    """
+    digest = hashlib.sha256()
+    for table in BASE.metadata.sorted_tables:
+        digest.update(table.name.encode())
+        for column in table.columns:
+            digest.update(
+                "{0}:{1!r}:{2}:{3}".format(
+                    column.name, column.type, column.primary_key,
+                    column.nullable
+                ).encode()
+            )
+    versions = path.template_path("../db/versions")
+    for script in sorted(os.listdir(versions)):
+        if script.endswith(".py"):
+            digest.update(script.encode())
+    return digest.hexdigest()
+
+
+def is_validated(connection) -> bool:
+    """Check, if the database was validated for our schema already."""
+    if not settings.CFG["db"]["schema_marker"]:
+        return False
+
+    marker = SchemaMarker.__table__
+    query = sa.select([marker.c.schema_hash]
+                     ).where(marker.c.schema_hash == schema_hash())
+    try:
+        return connection.execute(query).first() is not None
+    except sa.exc.DBAPIError:
+        # The marker table does not exist yet.
+        return False
+
+
+def mark_validated(connection) -> None:
+    """Remember that the database was validated for our schema."""
+    if not settings.CFG["db"]["schema_marker"]:
+        return
+
+    try:
+        connection.execute(
+            SchemaMarker.__table__.insert(),
+            schema_hash=schema_hash(),
+            validated=datetime.datetime.now()
+        )
+    except sa.exc.IntegrityError:
+        LOG.debug("Another process validated the schema concurrently.")
+
+
+def validate_schema(connection) -> bool:
+    """
+    Create or upgrade the schema of the database, if required.
+
+    Returns:
+        True, if the database uses the schema of this version of benchbuild.
+    """
+    if needed_schema(connection, BASE.metadata):
+        LOG.debug("Initialized new db schema.")
+        return enforce_versioning(force=True) is not None
+
+    repo_version, db_version = setup_versioning()
+    return bool(maybe_update_db(repo_version, db_version))
+
+
 def get_version_data():
     """Retreive migration information."""
     connect_str = str(settings.CFG["db"]["connect_string"])
@@ -380,6 +550,8 @@ def get_version_data():
 )
 def enforce_versioning(force=False):
     """Install versioning on the db."""
+    import migrate.versioning.api as migrate
+
     connect_str, repo_url = get_version_data()
     LOG.debug("Your database uses an unversioned benchbuild schema.")
     if not force and not ui.ask(
@@ -393,6 +565,8 @@ def enforce_versioning(force=False):
 
 
 def setup_versioning():
+    import migrate.versioning.api as migrate
+
     connect_str, repo_url = get_version_data()
     repo_version = migrate.version(repo_url, url=connect_str)
     db_version = None
@@ -416,10 +590,16 @@ def setup_versioning():
     }
 )
 def maybe_update_db(repo_version, db_version):
+    """
+    Upgrade the database to the schema version of the repository.
+
+    Returns:
+        True, if the database uses the schema version of the repository.
+    """
     if db_version is None:
-        return
+        return False
     if db_version == repo_version:
-        return
+        return True
 
     LOG.warning(
         "Your database contains version '%s' of benchbuild's schema.",
@@ -434,13 +614,15 @@ def maybe_update_db(repo_version, db_version):
         format(repo_version)
     ):
         LOG.error("User declined schema upgrade.")
-        return
+        return False
 
     connect_str = str(settings.CFG["db"]["connect_string"])
     repo_url = path.template_path("../db/")
     LOG.info("Upgrading to newest version...")
+    import migrate.versioning.api as migrate
     migrate.upgrade(connect_str, repo_url)
     LOG.info("Complete.")
+    return True
 
 
 class SessionManager:
@@ -487,7 +669,10 @@ class SessionManager:
     )
     def __init__(self):
         self.__test_mode = bool(settings.CFG['db']['rollback'])
-        self.engine = create_engine(str(settings.CFG["db"]["connect_string"]))
+        self.engine = create_engine(
+            str(settings.CFG["db"]["connect_string"]), **sqlite.engine_args()
+        )
+        sqlite.configure(self.engine)
 
         if not (self.connect_engine() and self.configure_engine()):
             sys.exit(-3)
@@ -497,12 +682,15 @@ class SessionManager:
             LOG.warning("DB test mode active, all actions will be rolled back.")
             self.__transaction = self.connection.begin()
 
-        if needed_schema(self.connection, BASE.metadata):
-            LOG.debug("Initialized new db schema.")
-            repo_version = enforce_versioning(force=True)
-        else:
-            repo_version, db_version = setup_versioning()
-            maybe_update_db(repo_version, db_version)
+        # Creating tables and asking sqlalchemy-migrate for versions is
+        # slow. We do it once per database and schema, every later process
+        # (e.g., a wrapped binary) only looks for the marker.
+        if self.__test_mode:
+            validate_schema(self.connection)
+        elif is_validated(self.connection):
+            LOG.debug("Schema was validated already.")
+        elif validate_schema(self.connection):
+            mark_validated(self.connection)
 
     def get(self):
         return sessionmaker(bind=self.connection)
@@ -512,6 +700,11 @@ class SessionManager:
             self.__transaction.rollback()
 
 
+# Connections we inherited from our parent process. We must not use them,
+# nor close them, because that would close them for our parent as well.
+__INHERITED__ = []
+
+
 def __lazy_session__():
     """Initialize the connection manager lazily."""
     connection_manager = None
@@ -526,6 +719,19 @@ def __lazy_session__():
             session = connection_manager.get()()
         return session
 
+    def __forget_after_fork():
+        """Connect again in a forked child, unless the db is in memory."""
+        nonlocal connection_manager
+        nonlocal session
+        if connection_manager is None or sqlite.is_memory():
+            return
+        __INHERITED__.append((connection_manager, session))
+        connection_manager = None
+        session = None
+
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=__forget_after_fork)
+
     return __lazy_session_wrapped
 
 
@@ -21,11 +21,19 @@ import warnings
 import attr
 import six
 import yaml
-from pkg_resources import DistributionNotFound, get_distribution
 from plumbum import LocalPath, local
 
 import benchbuild.utils.user_interface as ui
 
+try:
+    from importlib.metadata import PackageNotFoundError, version
+except ImportError:  # Python < 3.8, pkg_resources is slow to import.
+    from pkg_resources import DistributionNotFound as PackageNotFoundError
+    from pkg_resources import get_distribution
+
+    def version(distribution_name: str) -> str:
+        return get_distribution(distribution_name).version
+
 LOG = logging.getLogger(__name__)
 
 
@@ -36,8 +44,8 @@ class Indexable:
 
 
 try:
-    __version__ = get_distribution("benchbuild").version
-except DistributionNotFound:
+    __version__ = version("benchbuild")
+except PackageNotFoundError:
     __version__ = "unknown"
     LOG.error("could not find version information.")
 
@@ -102,10 +110,19 @@ def current_available_threads() -> int:
 
 
 def get_number_of_jobs(config: 'Configuration') -> int:
-    """Returns the number of jobs set in the config."""
+    """
+    Returns the number of jobs set in the config.
+
+    While a jobserver is active, this is the share of a single worker.
+    """
+    from benchbuild.utils import jobserver
+
     jobs_configured = int(config["jobs"])
     if jobs_configured == 0:
-        return current_available_threads()
+        jobs_configured = current_available_threads()
+    share = jobserver.share()
+    if share is not None:
+        return min(jobs_configured, share)
     return jobs_configured
 
 
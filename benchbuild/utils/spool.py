@@ -0,0 +1,406 @@
+"""
+Spool files for the results of tracked commands.
+
+Every wrapped binary opens a database session of its own, which costs
+schema & version checks and several transactions during the lifetime of
+the measured process. With many concurrent wrappers on SQLite, they
+contend for the database lock as well.
+
+If `CFG["db"]["spool"]` is enabled, benchbuild does not write runs, logs,
+metrics, configs & projects to the database. The same applies to
+file-backed SQLite databases with a single writer (see
+`benchbuild.utils.sqlite`). Instead, every process
+appends them as JSON records to a spool file of its own. Runs get a
+temporary key instead of their database id.
+
+The spool files are ingested into the database with a single transaction:
+    - at the end of every compile & run step,
+    - at the end of `benchbuild run`,
+    - with `benchbuild ingest`, e.g., to sync an offline run into a
+      PostgreSQL database later (see `CFG["db"]["spool_ingest"]`).
+
+Extensions may spool metrics & configs of a run after its run record was
+ingested. Therefore, every ingestion appends the database ids of the runs
+it inserted to the file `RUN_IDS` in the spool directory and all later
+ingestions look up the temporary keys of runs in there.
+
+Records of runs that are not spooled yet are kept for the next ingestion.
+If their run never shows up, e.g., because its wrapper was killed, they are
+dropped after `MAX_ATTEMPTS` ingestions.
+"""
+import base64
+import collections
+import contextlib
+import datetime
+import fcntl
+import glob
+import json
+import logging
+import os
+import typing as tp
+import uuid
+
+from plumbum import local
+
+from benchbuild.settings import CFG
+from benchbuild.utils import blobs, rollup, sqlite
+
+if tp.TYPE_CHECKING:
+    import sqlalchemy as sa  # pylint: disable=unused-import
+
+LOG = logging.getLogger(__name__)
+
+Row = tp.Dict[str, tp.Any]
+# The table, the row & the number of ingestions that kept the record.
+Record = tp.Tuple[str, Row, int]
+
+INGEST_LOCK = '.ingest.lock'
+RUN_IDS = '.run_ids'
+MAX_ATTEMPTS = 5
+
+
+def enabled() -> bool:
+    return bool(CFG["db"]["spool"]) or sqlite.single_writer()
+
+
+def spool_dir() -> str:
+    """Return the directory that contains all spool files."""
+    path = CFG["db"]["spool_dir"].value
+    if not path:
+        path = os.path.join(str(CFG["build_dir"]), ".spool")
+    return os.path.abspath(str(path))
+
+
+def new_key() -> str:
+    """Create a temporary key for a run."""
+    return uuid.uuid4().hex
+
+
+def encode(value: tp.Any) -> tp.Any:
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    return str(value)
+
+
+def write(
+    table: str,
+    rows: tp.Iterable[Row],
+    attempts: int = 0,
+    directory: tp.Optional[str] = None
+) -> None:
+    """
+    Append rows to the spool file of this process.
+
+    Args:
+        table: The name of the table the rows belong to.
+        rows: The rows, as mapping from column names to values.
+        attempts: The number of ingestions that kept the rows already.
+        directory: The spool directory, defaults to `spool_dir()`.
+    """
+    lines = [
+        json.dumps({
+            'table': table,
+            'row': row,
+            'attempts': attempts
+        }, default=encode) + '\n' for row in rows
+    ]
+    if not lines:
+        return
+
+    path = directory or spool_dir()
+    os.makedirs(path, exist_ok=True)
+    spool_file = os.path.join(path, f'{os.getpid()}.jsonl')
+    with open(spool_file, 'a') as spool:
+        fcntl.flock(spool, fcntl.LOCK_EX)
+        spool.write(''.join(lines))
+
+
+def claim(directory: str) -> tp.List[str]:
+    """
+    Claim all spool files of a directory for ingestion.
+
+    A claimed file is renamed, so writers start a new file on their next
+    write. We wait for writes that are still in progress.
+    """
+    claimed = []
+    for spool_file in sorted(glob.glob(os.path.join(directory, '*.jsonl'))):
+        claimed_file = f'{spool_file}.{new_key()}.ingest'
+        try:
+            os.rename(spool_file, claimed_file)
+        except FileNotFoundError:
+            continue
+        with open(claimed_file, 'r') as spool:
+            fcntl.flock(spool, fcntl.LOCK_EX)
+        claimed.append(claimed_file)
+    return claimed
+
+
+def read(spool_files: tp.Iterable[str]) -> tp.Iterator[Record]:
+    for spool_file in spool_files:
+        with open(spool_file, 'r') as spool:
+            for line in spool:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    LOG.warning("Ignoring truncated spool record: %s", line)
+                    continue
+                yield record['table'], record['row'], record.get('attempts', 0)
+
+
+def read_run_ids(directory: str) -> tp.Dict[str, int]:
+    """Read the database ids of the runs earlier ingestions inserted."""
+    run_ids: tp.Dict[str, int] = {}
+    try:
+        with open(os.path.join(directory, RUN_IDS), 'r') as ids_file:
+            for line in ids_file:
+                try:
+                    run_ids.update(json.loads(line))
+                except ValueError:
+                    LOG.warning("Ignoring truncated run ids: %s", line)
+    except FileNotFoundError:
+        pass
+    return run_ids
+
+
+def write_run_ids(directory: str, run_ids: tp.Dict[str, int]) -> None:
+    """Remember the database ids of the runs an ingestion inserted."""
+    if not run_ids:
+        return
+    with open(os.path.join(directory, RUN_IDS), 'a') as ids_file:
+        ids_file.write(json.dumps(run_ids) + '\n')
+
+
+def decode(table: 'sa.Table', row: Row) -> Row:
+    """Convert the JSON values of a row back to the column types."""
+    import sqlalchemy as sa
+
+    decoded = {}
+    for key, value in row.items():
+        column = table.c.get(key)
+        if column is None:
+            continue
+        if value is not None and isinstance(column.type, sa.DateTime):
+            value = datetime.datetime.fromisoformat(value)
+        if value is not None and isinstance(column.type, sa.LargeBinary):
+            value = base64.b64decode(value)
+        decoded[key] = value
+    return decoded
+
+
+class Ingestion:
+    """
+    Insert the records of spool files in a single transaction.
+
+    Args:
+        session: The database session we insert the records with.
+        ingested: The database ids of runs earlier ingestions inserted.
+    """
+
+    def __init__(
+        self,
+        session: tp.Any,
+        ingested: tp.Optional[tp.Dict[str, int]] = None
+    ) -> None:
+        from benchbuild.utils import schema
+
+        self.schema = schema
+        self.session = session
+        self.tables = {
+            table.name: table for table in schema.metadata().sorted_tables
+        }
+        self.known: tp.Set[tp.Tuple[str, tp.Any]] = set()
+        self.run_ids: tp.Dict[str, int] = {}
+        self.ingested = ingested or {}
+
+    def run_id(self, key: tp.Any) -> tp.Optional[int]:
+        """Return the database id of a spooled run, if we know it."""
+        if key in self.run_ids:
+            return self.run_ids[key]
+        return self.ingested.get(key)
+
+    def exists(self, model: tp.Any, **keys: tp.Any) -> bool:
+        """Check, if a row exists. Rows we already know are not queried."""
+        ident = (model.__tablename__, tuple(sorted(keys.items())))
+        if ident in self.known:
+            return True
+        if self.session.query(model).filter_by(**keys).first() is None:
+            return False
+        self.known.add(ident)
+        return True
+
+    def add(self, obj: tp.Any, **keys: tp.Any) -> None:
+        self.session.add(obj)
+        self.session.flush()
+        self.known.add((obj.__tablename__, tuple(sorted(keys.items()))))
+
+    def project(self, row: Row) -> None:
+        s = self.schema
+        keys = dict(name=row['name'], group_name=row['group_name'])
+        row = decode(s.Project.__table__, row)
+        if self.exists(s.Project, **keys):
+            self.session.query(s.Project).filter_by(**keys).update(row)
+            return
+
+        self.add(s.Project(**row), **keys)
+
+    def parents(self, run: Row) -> None:
+        """Create the rows a run references, if they do not exist."""
+        s = self.schema
+        project = dict(
+            name=run['project_name'], group_name=run['project_group']
+        )
+        if not self.exists(s.Project, **project):
+            self.project(project)
+
+        exp_id = run.get('experiment_group')
+        if exp_id and not self.exists(s.Experiment, id=exp_id):
+            self.add(
+                s.Experiment(id=exp_id, name=run.get('experiment_name')),
+                id=exp_id
+            )
+
+        group_id = run.get('run_group')
+        if group_id and not self.exists(s.RunGroup, id=group_id):
+            self.add(s.RunGroup(id=group_id, experiment=exp_id), id=group_id)
+
+    def run(self, row: Row) -> None:
+        table = self.tables['run']
+        key = row.pop('id')
+        self.parents(row)
+        result = self.session.execute(table.insert(), decode(table, row))
+        self.run_ids[key] = result.inserted_primary_key[0]
+
+    def ingest(self, records: tp.List[Record]) -> tp.List[Record]:
+        """
+        Insert all records.
+
+        Returns:
+            The records that reference runs we do not know (yet).
+        """
+        for table_name, row, _ in records:
+            if table_name == 'project':
+                self.project(row)
+        for table_name, row, _ in records:
+            if table_name == 'run':
+                self.run(dict(row))
+
+        rows: tp.Dict['sa.Table', tp.List[Row]] = collections.OrderedDict()
+        unknown = []
+        for record in records:
+            table_name, row, _ = record
+            if table_name == blobs.TABLE:
+                table = self.tables[table_name]
+                blobs.store(self.session, [decode(table, row)])
+                continue
+            if table_name in ('project', 'run'):
+                continue
+            if table_name not in self.tables:
+                LOG.warning("Ignoring spool record of table: %s", table_name)
+                continue
+            run_id = self.run_id(row.get('run_id'))
+            if run_id is None:
+                unknown.append(record)
+                continue
+            table = self.tables[table_name]
+            row = decode(table, dict(row, run_id=run_id))
+            rows.setdefault(table, []).append(row)
+
+        for table, table_rows in rows.items():
+            self.session.execute(table.insert(), table_rows)
+            rollup.update(self.session, table, table_rows)
+        return unknown
+
+
+def ingest(directory: tp.Optional[str] = None) -> int:
+    """
+    Ingest all spool files of a directory into the database.
+
+    Args:
+        directory: The spool directory, defaults to `spool_dir()`.
+
+    Returns:
+        The number of runs we ingested.
+    """
+    directory = directory or spool_dir()
+    if not os.path.isdir(directory):
+        return 0
+
+    # A single process at a time writes to the database.
+    with open(os.path.join(directory, INGEST_LOCK), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return ingest_claimed(directory, claim(directory))
+
+
+def ingest_claimed(directory: str, claimed: tp.List[str]) -> int:
+    """Ingest claimed spool files, see `ingest`."""
+    import sqlalchemy as sa
+
+    from benchbuild.utils import schema
+
+    if not claimed:
+        return 0
+
+    records = list(read(claimed))
+    session = schema.Session()
+    ingestion = Ingestion(session, read_run_ids(directory))
+    try:
+        unknown = ingestion.ingest(records)
+        session.commit()
+    except sa.exc.SQLAlchemyError:
+        session.rollback()
+        for claimed_file in claimed:
+            os.rename(claimed_file, claimed_file + '.jsonl')
+        raise
+    write_run_ids(directory, ingestion.run_ids)
+
+    for claimed_file in claimed:
+        os.remove(claimed_file)
+
+    # Keep records of runs that are not finished yet for the next time.
+    by_table: tp.Dict[tp.Tuple[str, int], tp.List[Row]] = \
+        collections.defaultdict(list)
+    dropped = 0
+    for table_name, row, attempts in unknown:
+        if attempts + 1 >= MAX_ATTEMPTS:
+            dropped += 1
+            continue
+        by_table[(table_name, attempts + 1)].append(row)
+    for (table_name, attempts), rows in by_table.items():
+        write(table_name, rows, attempts=attempts, directory=directory)
+    if dropped:
+        LOG.warning(
+            "Dropped %d spool records, their runs were not spooled within "
+            "%d ingestions.", dropped, MAX_ATTEMPTS
+        )
+
+    LOG.debug("Ingested %d runs from %s", len(ingestion.run_ids), directory)
+    return len(ingestion.run_ids)
+
+
+def collect() -> None:
+    """Ingest all spool files, if spooling & ingestion are enabled."""
+    if enabled() and CFG["db"]["spool_ingest"]:
+        ingest()
+
+
+@contextlib.contextmanager
+def scope() -> tp.Iterator[str]:
+    """
+    Spool the results of all commands executed inside this context.
+
+    The spool directory is exported to all child processes, so wrapped
+    binaries use the same directory, independent of their working
+    directory.
+
+    Yields:
+        The spool directory.
+    """
+    path = spool_dir()
+    CFG["db"]["spool_dir"] = path
+    with local.env(BB_DB_SPOOL=True, BB_DB_SPOOL_DIR=path):
+        try:
+            yield path
+        finally:
+            collect()
@@ -0,0 +1,99 @@
+"""
+Configure SQLite databases for many concurrent processes.
+
+A file-backed SQLite database is shared by all processes of an experiment:
+the worker processes of `parallel_processes` and every wrapped binary
+executed by a build, e.g., under `make -j`. With SQLite's defaults, these
+processes stall on 'database is locked' errors and serialize on fsync.
+
+For file-backed databases we:
+    - use the WAL journal, so readers do not block the writer,
+    - relax `synchronous`, which is safe in WAL mode,
+    - wait for locks with a busy timeout, instead of failing,
+    - optionally let a single process write: with
+      `CFG["db"]["sqlite_single_writer"]` all results are spooled (see
+      `benchbuild.utils.spool`) and ingested by one process at a time.
+
+In-memory databases are private to their process and left untouched.
+"""
+import logging
+import typing as tp
+
+from benchbuild.settings import CFG
+
+if tp.TYPE_CHECKING:
+    import sqlalchemy as sa  # pylint: disable=unused-import
+
+LOG = logging.getLogger(__name__)
+
+
+def url(connect_string: tp.Optional[str] = None) -> 'sa.engine.url.URL':
+    import sqlalchemy as sa
+
+    if connect_string is None:
+        connect_string = str(CFG["db"]["connect_string"])
+    return sa.engine.url.make_url(connect_string)
+
+
+def is_file(connect_string: tp.Optional[str] = None) -> bool:
+    """Check, if we connect to a file-backed SQLite database."""
+    db_url = url(connect_string)
+    if db_url.get_backend_name() != 'sqlite':
+        return False
+    database = db_url.database or ''
+    return database not in ('', ':memory:') and \
+        not database.startswith('file::memory:')
+
+
+def is_memory(connect_string: tp.Optional[str] = None) -> bool:
+    """Check, if we connect to an in-memory SQLite database."""
+    db_url = url(connect_string)
+    return db_url.get_backend_name() == 'sqlite' and not is_file(
+        connect_string
+    )
+
+
+def single_writer() -> bool:
+    """Check, if a single process writes to a file-backed database."""
+    return bool(CFG["db"]["sqlite_single_writer"]) and is_file()
+
+
+def engine_args() -> tp.Dict[str, tp.Any]:
+    """Additional arguments for `create_engine`."""
+    if not is_file():
+        return {}
+    return {
+        'connect_args': {
+            'timeout': float(CFG["db"]["sqlite_busy_timeout"].value)
+        }
+    }
+
+
+def configure(engine: 'sa.engine.Engine') -> None:
+    """Configure every connection of an engine for concurrent access."""
+    import sqlalchemy as sa
+
+    if engine.url.get_backend_name() != 'sqlite' or \
+            not is_file(str(engine.url)):
+        return
+
+    journal_mode = str(CFG["db"]["sqlite_journal_mode"])
+    synchronous = str(CFG["db"]["sqlite_synchronous"])
+    busy_timeout = int(float(CFG["db"]["sqlite_busy_timeout"].value) * 1000)
+
+    # We keep the transaction handling of pysqlite: a transaction begins
+    # with its first write, so a session that only reads never holds a
+    # lock and never fails to upgrade a stale read lock to a write lock.
+    @sa.event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        del connection_record
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {busy_timeout}")
+        cursor.execute(f"PRAGMA journal_mode = {journal_mode}")
+        cursor.execute(f"PRAGMA synchronous = {synchronous}")
+        cursor.close()
+
+    LOG.debug(
+        "SQLite: journal_mode=%s, synchronous=%s, busy_timeout=%dms",
+        journal_mode, synchronous, busy_timeout
+    )
@@ -1,10 +1,47 @@
 """
 The task module distributes benchbuild's excution plans over processes.
+
+A plan is a tree of steps. Before execution, the tree is flattened into a
+dependency graph (DAG) of schedulable nodes:
+
+    - Every `RequireAll` (and therefore every `Containerize`) becomes a
+      single node. Its children depend on each other and fail together, so
+      they are executed in order inside the node, exactly as before.
+    - The children of an `Any` (or `Experiment`) do not depend on each other.
+      Composite children are scheduled concurrently.
+    - Leaf steps inside an `Any` (e.g., `Echo` or `CleanExtra`) act as
+      barriers: they wait for every node scheduled before them and every node
+      scheduled after them waits for the barrier.
+
+Independent nodes of all experiments in a plan are executed concurrently
+by a pool of `parallel_processes` workers. Ready nodes are kept in a single
+queue and dispatched one by one, whenever a worker becomes idle. A node is
+only dispatched, if its resource budget (CPUs & peak memory, see
+`benchbuild.utils.resources`) fits into the remaining capacity.
+
+With the `lpt` policy, ready nodes are dispatched longest-processing-time
+first. A node's priority is the estimated duration of the longest path from
+the node to the end of the plan (see `benchbuild.utils.durations`).
 """
+import collections
+import heapq
+import logging
+import os
+import queue
+import sys
+import traceback
 import typing as tp
 
+import attr
+import pathos.multiprocessing as mp
+
 import benchbuild.utils.actions as actns
-from benchbuild import Experiment, Project
+from benchbuild import Experiment, Project, signals
+from benchbuild.settings import CFG
+from benchbuild.utils import journal, profiler, resources
+from benchbuild.utils.durations import Durations
+
+LOG = logging.getLogger(__name__)
 
 ExperimentT = tp.Type[Experiment]
 ProjectT = tp.Type[Project]
@@ -15,6 +52,519 @@ Actions = tp.Sequence[actns.Step]
 StepResults = tp.List[actns.StepResult]
 
 
+@attr.s(eq=False, repr=False)
+class Node:
+    """
+    A schedulable unit of an execution plan.
+
+    Attributes:
+        key: Position of this node in the flattened plan.
+        step: The step that is executed, when this node is scheduled.
+        experiment: The experiment step this node belongs to, if any.
+        after: All nodes that need to complete, before this node may run.
+    """
+    key: int = attr.ib()
+    step: actns.Step = attr.ib()
+    experiment: tp.Optional[actns.Experiment] = attr.ib(default=None)
+    after: tp.Set['Node'] = attr.ib(default=attr.Factory(set))
+
+    def __repr__(self) -> str:
+        return "<Node #{0}: {1}>".format(self.key, self.step.NAME)
+
+
+Nodes = tp.List[Node]
+
+
+@attr.s
+class Graph:
+    """The dependency graph of a flattened execution plan."""
+
+    nodes: Nodes = attr.ib(default=attr.Factory(list))
+
+    def add(
+        self,
+        step: actns.Step,
+        after: tp.Iterable[Node],
+        experiment: tp.Optional[actns.Experiment] = None
+    ) -> Node:
+        node = Node(
+            key=len(self.nodes),
+            step=step,
+            experiment=experiment,
+            after=set(after)
+        )
+        self.nodes.append(node)
+        return node
+
+    @property
+    def experiments(self) -> tp.List[actns.Experiment]:
+        """All experiment steps referenced by this graph, in plan order."""
+        seen: tp.Dict[int, actns.Experiment] = {}
+        for node in self.nodes:
+            if node.experiment is not None:
+                seen.setdefault(id(node.experiment), node.experiment)
+        return list(seen.values())
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __iter__(self) -> tp.Iterator[Node]:
+        return iter(self.nodes)
+
+
+def is_sequential(step: actns.Step) -> bool:
+    """Steps, whose children have to be executed in order."""
+    return isinstance(step, actns.RequireAll)
+
+
+def is_concurrent(step: actns.Step) -> bool:
+    """Steps, whose children can be executed independently."""
+    return isinstance(step, actns.Any)
+
+
+def flatten(plan: Actions) -> Graph:
+    """
+    Flatten a plan into a dependency graph.
+
+    Args:
+        plan: The plan we want to flatten.
+
+    Returns:
+        The graph of all schedulable nodes in the plan.
+    """
+    graph = Graph()
+
+    def visit_children(
+        children: tp.Iterable[actns.Step], before: tp.Set[Node],
+        experiment: tp.Optional[actns.Experiment]
+    ) -> tp.Set[Node]:
+        pending: tp.Set[Node] = set()
+        for child in children:
+            if isinstance(child, actns.Experiment):
+                pending |= visit_children(child, before, child)
+            elif is_concurrent(child):
+                pending |= visit_children(child, before, experiment)
+            elif is_sequential(child):
+                pending.add(graph.add(child, before, experiment))
+            else:
+                barrier = graph.add(child, pending or before, experiment)
+                before = {barrier}
+                pending = set()
+        return pending or before
+
+    visit_children(plan, set(), None)
+    return graph
+
+
+def flat_results(results: tp.Iterable[tp.Any]) -> StepResults:
+    """Flatten nested lists of step results, e.g., the results of an `Any`."""
+    flat: StepResults = []
+    for result in results:
+        if isinstance(result, list):
+            flat.extend(flat_results(result))
+        else:
+            flat.append(result)
+    return flat
+
+
+def ident(node: Node) -> tp.Optional[str]:
+    """
+    Identify a node across executions of the same plan.
+
+    Only chains of steps (usually a project) are identified, all other
+    nodes are considered to be cheap.
+    """
+    if not is_sequential(node.step):
+        return None
+    exp_name = node.experiment.obj.name if node.experiment else '-'
+    return f'{exp_name}/{journal.chain_id(node.step, node.key)}'
+
+
+def project_of(step: actns.Step) -> tp.Optional[ProjectT]:
+    """
+    Return the project type a chain of steps works on, if any.
+
+    This does not create the steps of a `RequireAllOnDemand`.
+    """
+    if isinstance(step, actns.RequireAllOnDemand) and not step.created:
+        return step.project_cls
+
+    for child in getattr(step, 'actions', [step]):
+        if isinstance(child.obj, Project):
+            return type(child.obj)
+    return None
+
+
+def estimate(node: Node, durations: Durations) -> tp.Optional[float]:
+    """
+    Estimate the duration of a node in seconds.
+
+    Returns:
+        The estimate, or None, if the node's project has no history.
+        Nodes without a project are considered to take no time.
+    """
+    if not is_sequential(node.step):
+        return 0.0
+    project = project_of(node.step)
+    if project is None:
+        return 0.0
+    exp_name = node.experiment.obj.name if node.experiment else None
+    return durations.estimate(exp_name, project.NAME, project.GROUP)
+
+
+def estimates_of(graph: Graph, durations: Durations) -> tp.Dict[int, float]:
+    """Estimate all nodes of a graph, nodes without history take no time."""
+    return {
+        node.key: estimate(node, durations) or 0.0 for node in graph
+    }
+
+
+def priorities(graph: Graph, estimates: tp.Dict[int, float]
+              ) -> tp.Dict[int, float]:
+    """
+    Calculate the priority of all nodes for longest-processing-time first.
+
+    The priority of a node is the estimated length of the longest path from
+    the node to the end of the plan, including the node itself.
+    Nodes are added to a graph after their predecessors, therefore, a reverse
+    iteration visits successors first.
+    """
+    prio: tp.Dict[int, float] = {}
+    successors: tp.Dict[int, Nodes] = collections.defaultdict(list)
+    for node in graph:
+        for pred in node.after:
+            successors[pred.key].append(node)
+
+    for node in reversed(graph.nodes):
+        longest_tail = max([prio[succ.key] for succ in successors[node.key]],
+                           default=0.0)
+        prio[node.key] = estimates[node.key] + longest_tail
+    return prio
+
+
+def predict_makespan(
+    graph: Graph, estimates: tp.Dict[int, float], num_processes: int
+) -> float:
+    """
+    Simulate a longest-processing-time first execution of a graph.
+
+    Args:
+        graph: The graph we want to execute.
+        estimates: The estimated duration of each node.
+        num_processes: The number of worker processes.
+
+    Returns:
+        The predicted duration of the whole plan, in seconds.
+    """
+    prio = priorities(graph, estimates)
+    waiting_on = {node.key: len(node.after) for node in graph}
+    successors: tp.Dict[int, Nodes] = collections.defaultdict(list)
+    for node in graph:
+        for pred in node.after:
+            successors[pred.key].append(node)
+
+    ready = [(-prio[node.key], node.key) for node in graph if not node.after]
+    heapq.heapify(ready)
+    running: tp.List[tp.Tuple[float, int]] = []
+    now = 0.0
+    while ready or running:
+        while ready and len(running) < max(num_processes, 1):
+            _, key = heapq.heappop(ready)
+            heapq.heappush(running, (now + estimates[key], key))
+
+        now, key = heapq.heappop(running)
+        for succ in successors[key]:
+            waiting_on[succ.key] -= 1
+            if waiting_on[succ.key] == 0:
+                heapq.heappush(ready, (-prio[succ.key], succ.key))
+    return now
+
+
+def run_node(step: actns.Step) -> StepResults:
+    """
+    Execute a single node of the graph.
+
+    Args:
+        step: The step of the node.
+
+    Returns:
+        The results of the step.
+    """
+    try:
+        return flat_results(step())
+    except KeyboardInterrupt:
+        raise
+    except Exception:  # pylint: disable=broad-except
+        LOG.error("Step '%s' terminates because we got an exception:", step)
+        e_type, e_value, e_traceb = sys.exc_info()
+        lines = traceback.format_exception(e_type, e_value, e_traceb)
+        LOG.error("".join(lines))
+        return [actns.StepResult.ERROR]
+
+
+Measured = tp.Tuple[StepResults, tp.Optional[resources.Budget]]
+
+
+def run_measured(step: actns.Step, label: str = "") -> Measured:
+    """Execute a single node of the graph and measure its resource usage."""
+    usage = resources.Usage()
+    with profiler.span(label or step.NAME, "worker"):
+        results = run_node(step)
+    return results, usage.budget()
+
+
+@attr.s
+class Scheduler:
+    """
+    Execute a graph with a given number of worker processes.
+
+    Nodes are dispatched as soon as all their predecessors are completed
+    and their budget fits into the remaining capacity.
+    With a single process, all nodes are executed in-process.
+
+    Every worker process executes a single node, so we can measure the
+    budget of that node and learn it, if a ledger is given.
+
+    If durations are given, ready nodes are dispatched by priority
+    (longest-processing-time first), otherwise in plan order.
+    """
+
+    graph: Graph = attr.ib()
+    num_processes: int = attr.ib(default=1)
+    capacity: resources.Budget = attr.ib(
+        default=attr.Factory(resources.capacity)
+    )
+    ledger: tp.Optional[resources.Ledger] = attr.ib(default=None)
+    durations: tp.Optional[Durations] = attr.ib(default=None)
+
+    results: tp.Dict[int, StepResults] = attr.ib(
+        init=False, default=attr.Factory(dict)
+    )
+    _ready: Nodes = attr.ib(init=False, default=attr.Factory(list))
+    _priority: tp.Dict[int, float] = attr.ib(
+        init=False, default=attr.Factory(dict)
+    )
+    _waiting_on: tp.Dict[int, int] = attr.ib(
+        init=False, default=attr.Factory(dict)
+    )
+    _successors: tp.Dict[int, Nodes] = attr.ib(
+        init=False, default=attr.Factory(lambda: collections.defaultdict(list))
+    )
+    _open_nodes: tp.Dict[int, int] = attr.ib(
+        init=False, default=attr.Factory(lambda: collections.defaultdict(int))
+    )
+    _transactions: tp.Dict[int, tp.Tuple[tp.Any, tp.Any]] = attr.ib(
+        init=False, default=attr.Factory(dict)
+    )
+    _pid: int = attr.ib(init=False, default=attr.Factory(os.getpid))
+    _in_use: resources.Budget = attr.ib(init=False, default=resources.NOTHING)
+    _granted: tp.Dict[int, resources.Budget] = attr.ib(
+        init=False, default=attr.Factory(dict)
+    )
+
+    def __attrs_post_init__(self) -> None:
+        if self.durations is not None:
+            self._priority = priorities(
+                self.graph, estimates_of(self.graph, self.durations)
+            )
+
+        for node in self.graph:
+            self._waiting_on[node.key] = len(node.after)
+            for pred in node.after:
+                self._successors[pred.key].append(node)
+            if node.experiment is not None:
+                self._open_nodes[id(node.experiment)] += 1
+            if not node.after:
+                self.push(node)
+
+    def push(self, node: Node) -> None:
+        """Queue a ready node, highest priority first, then plan order."""
+        self._ready.append(node)
+        self._ready.sort(
+            key=lambda n: (-self._priority.get(n.key, 0.0), n.key)
+        )
+
+    def budget_of(self, node: Node) -> resources.Budget:
+        """The budget of a node: declared, learned or a single CPU."""
+        key = ident(node)
+        if key is None:
+            return resources.NOTHING
+
+        budget = resources.declared(project_of(node.step))
+        if budget is None and self.ledger is not None:
+            budget = self.ledger.get(key)
+        return budget if budget is not None else resources.Budget()
+
+    def admit(self, in_flight: int) -> tp.Optional[Node]:
+        """
+        Take the first ready node whose budget fits the remaining capacity.
+
+        Nodes that do not fit are skipped in favour of nodes queued behind
+        them. A node that exceeds the whole capacity is admitted as soon as
+        nothing else runs.
+        """
+        if in_flight >= self.num_processes:
+            return None
+
+        available = self.capacity - self._in_use
+        for node in self._ready:
+            budget = self.budget_of(node)
+            if in_flight == 0 or budget.fits(available):
+                self._ready.remove(node)
+                self._granted[node.key] = budget
+                self._in_use += budget
+                return node
+        return None
+
+    def release(
+        self, node: Node, used: tp.Optional[resources.Budget]
+    ) -> None:
+        """Give back the budget of a node and learn what it really used."""
+        # The ledger might have learned another budget for the same ident in
+        # the meantime, so we give back exactly what we granted.
+        self._in_use -= self._granted.pop(node.key, resources.NOTHING)
+        key = ident(node)
+        if key is not None and used is not None and self.ledger is not None:
+            self.ledger.learn(key, used)
+
+    def begin(self, node: Node) -> None:
+        """Open the experiment transaction, before its first node runs."""
+        exp = node.experiment
+        if exp is None or id(exp) in self._transactions:
+            return
+        self._transactions[id(exp)] = exp.begin_transaction()
+        # All open transactions are closed by our own signal handler.
+        signals.handlers.deregister(actns.Experiment.end_transaction)
+
+    def complete(self, node: Node, results: StepResults) -> None:
+        """Record the results of a node and release its successors."""
+        self.results[node.key] = results
+        if results:
+            node.step.status = max(results)
+
+        for succ in self._successors[node.key]:
+            self._waiting_on[succ.key] -= 1
+            if self._waiting_on[succ.key] == 0:
+                self.push(succ)
+
+        exp = node.experiment
+        if exp is None:
+            return
+        self._open_nodes[id(exp)] -= 1
+        if self._open_nodes[id(exp)] == 0:
+            self.end(exp)
+
+    def end(self, exp: actns.Experiment) -> None:
+        """Close the experiment transaction, after its last node ran."""
+        if id(exp) not in self._transactions:
+            return
+        experiment, session = self._transactions.pop(id(exp))
+        exp.end_transaction(experiment, session)
+
+        exp_results = [
+            res for node in self.graph if node.experiment is exp
+            for res in self.results.get(node.key, [])
+        ]
+        exp.status = max(exp_results) if exp_results else actns.StepResult.OK
+
+    def abort(self) -> None:
+        """Mark all unfinished nodes as failed and close all transactions."""
+        if os.getpid() != self._pid:
+            # Forked workers inherit our signal handlers.
+            return
+
+        for node in self.graph:
+            if node.key not in self.results:
+                self.results[node.key] = [actns.StepResult.ERROR]
+        for exp in self.graph.experiments:
+            self.end(exp)
+
+    def run_inline(self) -> None:
+        while self._ready:
+            node = self._ready.pop(0)
+            self.begin(node)
+            self.complete(node, run_node(node.step))
+
+    def run_parallel(self) -> None:
+        done: 'queue.Queue[tp.Tuple[Node, Measured]]' = queue.Queue()
+        in_flight = 0
+
+        def on_error(node: Node) -> tp.Callable[[BaseException], None]:
+
+            def error_callback(exc: BaseException) -> None:
+                LOG.error("Step '%s' failed in its worker: %s", node.step, exc)
+                done.put((node, ([actns.StepResult.ERROR], None)))
+
+            return error_callback
+
+        with mp.Pool(self.num_processes, maxtasksperchild=1) as pool:
+            while self._ready or in_flight:
+                node = self.admit(in_flight)
+                while node is not None:
+                    self.begin(node)
+                    label = ident(node) or repr(node)
+                    pool.apply_async(
+                        run_measured, (node.step, label),
+                        callback=lambda res, node=node: done.put((node, res)),
+                        error_callback=on_error(node)
+                    )
+                    in_flight += 1
+                    node = self.admit(in_flight)
+
+                node, (results, used) = done.get()
+                in_flight -= 1
+                self.release(node, used)
+                self.complete(node, results)
+
+            # Terminating the pool races with the replacement of workers
+            # that exited after their task, which might leave a new worker
+            # blocked on the task queue forever.
+            pool.close()
+            pool.join()
+
+        if self.ledger is not None:
+            self.ledger.save()
+
+    def __call__(self) -> tp.List[StepResults]:
+        signals.handlers.register(self.abort)
+        try:
+            if self.num_processes > 1:
+                self.run_parallel()
+            else:
+                self.run_inline()
+        except KeyboardInterrupt:
+            LOG.info("Plan execution aborted by user request")
+            self.abort()
+        finally:
+            signals.handlers.deregister(self.abort)
+
+        return [self.results[node.key] for node in self.graph]
+
+
+def lpt_enabled() -> bool:
+    return str(CFG["scheduler"]["policy"]) == "lpt"
+
+
+def predict(plan: Actions) -> tp.Tuple[float, int]:
+    """
+    Predict the makespan of a plan from the history in the database.
+
+    Args:
+        plan: The plan we want to execute.
+
+    Returns:
+        A tuple of the predicted makespan in seconds and the number of
+        projects that have no history, i.e., are not part of the prediction.
+    """
+    graph = flatten(plan)
+    durations = Durations.load()
+    unknown = len([node for node in graph if estimate(node, durations) is None])
+    makespan = predict_makespan(
+        graph, estimates_of(graph, durations), int(CFG["parallel_processes"])
+    )
+    return makespan, unknown
+
+
 def execute_plan(plan: Actions) -> StepResults:
     """"Execute the plan.
 
@@ -24,7 +574,16 @@ def execute_plan(plan: Actions) -> StepResults:
     Returns:
         A list failed of StepResults.
     """
-    results = [action() for action in plan]
+    graph = flatten(plan)
+    ledger = resources.Ledger() if CFG["resources"]["learn"] else None
+    durations = Durations.load() if lpt_enabled() else None
+    scheduler = Scheduler(
+        graph,
+        int(CFG["parallel_processes"]),
+        ledger=ledger,
+        durations=durations
+    )
+    results = scheduler()
     return [result for result in results if actns.step_has_failed(result)]
 
 
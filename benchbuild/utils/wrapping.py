@@ -21,6 +21,9 @@ Runtime Wrappers:
     These directly forward the binary call to the pickle without any execution
     of the binary. We cannot guarantee that repeated execution is valid,
     therefore, we let the user decide what the program should do.
+    With the fork server enabled, the wrapper is a small client of the
+    fork server and the script is placed next to it, see
+    `benchbuild.utils.forkserver`.
 """
 import logging
 import os
@@ -29,22 +32,26 @@ import typing as tp
 from typing import TYPE_CHECKING
 
 import dill
-import jinja2
 import plumbum as pb
 from plumbum import local
 from plumbum.commands.base import BoundCommand
 
+from benchbuild import runtime
+from benchbuild.runtime import load  # pylint: disable=unused-import
 from benchbuild.settings import CFG
-from benchbuild.utils import run
+from benchbuild.utils import forkserver, run
 from benchbuild.utils.cmd import chmod, mv
 from benchbuild.utils.path import list_to_path
 from benchbuild.utils.uchroot import no_llvm as uchroot
 
 PROJECT_BIN_F_EXT = ".bin"
 PROJECT_BLOB_F_EXT = ".postproc"
+PROJECT_WRAPPER_F_EXT = ".wrapper"
+PROJECT_MANIFEST_F_EXT = ".project"
 LOG = logging.getLogger(__name__)
 
 if TYPE_CHECKING:
+    import jinja2  # pylint: disable=unused-import
     from benchbuild.project import Project
     from benchbuild.experiment import Experiment
 
@@ -84,7 +91,9 @@ def unpickle(pickle_file: str) -> tp.Any:
     return pickle
 
 
-def __create_jinja_env() -> jinja2.Environment:
+def __create_jinja_env() -> 'jinja2.Environment':
+    import jinja2
+
     return jinja2.Environment(
         trim_blocks=True,
         lstrip_blocks=True,
@@ -92,6 +101,35 @@ def __create_jinja_env() -> jinja2.Environment:
     )
 
 
+def __write_wrapper(
+    name_absolute: str, script: str, python: str, sprefix: str
+) -> None:
+    """
+    Write a runtime wrapper.
+
+    With the fork server enabled, the script is written next to the wrapper
+    and the wrapper becomes a client of the fork server.
+    """
+    if forkserver.enabled():
+        script_f = name_absolute + PROJECT_WRAPPER_F_EXT
+        with open(script_f, 'w') as wrapper:
+            wrapper.write(script)
+        chmod("+x", script_f)
+
+        # The client needs nothing but the standard library.
+        if os.path.isabs(python):
+            python = f'{python} -S'
+        template = __create_jinja_env().get_template(
+            'wrapping/forkserver_client.py.inc'
+        )
+        script = template.render(
+            wrapper=strip_path_prefix(script_f, sprefix), python=python
+        )
+
+    with open(name_absolute, 'w') as wrapper:
+        wrapper.write(script)
+
+
 def wrap(
     name: str,
     project: 'Project',
@@ -129,7 +167,7 @@ def wrap(
         _mv = run.watch(mv)
         _mv(name_absolute, real_f)
 
-    project_file = persist(project, suffix=".project")
+    project_file = write_manifest(project)
 
     env = CFG['env'].value
 
@@ -140,17 +178,17 @@ def wrap(
     bin_lib_path = list_to_path([bin_lib_path, os.environ["LD_LIBRARY_PATH"]])
     home = env.get("HOME", os.getenv("HOME", ""))
 
-    with open(name_absolute, 'w') as wrapper:
-        wrapper.write(
-            template.render(
-                runf=strip_path_prefix(real_f, sprefix),
-                project_file=strip_path_prefix(project_file, sprefix),
-                path=str(bin_path),
-                ld_library_path=str(bin_lib_path),
-                home=str(home),
-                python=python,
-            )
-        )
+    __write_wrapper(
+        name_absolute,
+        template.render(
+            runf=strip_path_prefix(real_f, sprefix),
+            project_file=strip_path_prefix(project_file, sprefix),
+            path=str(bin_path),
+            ld_library_path=str(bin_lib_path),
+            home=str(home),
+            python=python,
+        ), python, sprefix
+    )
 
     _chmod = run.watch(chmod)
     _chmod("+x", name_absolute)
@@ -194,7 +232,7 @@ def wrap_dynamic(
     name_absolute = os.path.abspath(name)
     real_f = name_absolute + PROJECT_BIN_F_EXT
 
-    project_file = persist(project, suffix=".project")
+    project_file = write_manifest(project)
 
     cfg_env = CFG['env'].value
 
@@ -207,18 +245,18 @@ def wrap_dynamic(
         list_to_path([bin_lib_path, os.environ["LD_LIBRARY_PATH"]])
     home = cfg_env.get("HOME", os.getenv("HOME", ""))
 
-    with open(name_absolute, 'w') as wrapper:
-        wrapper.write(
-            template.render(
-                runf=strip_path_prefix(real_f, sprefix),
-                project_file=strip_path_prefix(project_file, sprefix),
-                path=str(bin_path),
-                ld_library_path=str(bin_lib_path),
-                home=str(home),
-                python=python,
-                name_filters=name_filters
-            )
-        )
+    __write_wrapper(
+        name_absolute,
+        template.render(
+            runf=strip_path_prefix(real_f, sprefix),
+            project_file=strip_path_prefix(project_file, sprefix),
+            path=str(bin_path),
+            ld_library_path=str(bin_lib_path),
+            home=str(home),
+            python=python,
+            name_filters=name_filters
+        ), python, sprefix
+    )
 
     chmod("+x", name_absolute)
     return local[name_absolute]
@@ -255,7 +293,7 @@ def wrap_cc(
     cc_fname = local.path(filepath).with_suffix(".benchbuild.cc", depth=0)
     cc_f = persist(compiler, filename=cc_fname)
 
-    project_file = persist(project, suffix=".project")
+    project_file = write_manifest(project)
 
     with open(filepath, 'w') as wrapper:
         wrapper.write(
@@ -307,23 +345,33 @@ def persist(id_obj, filename=None, suffix=None):
     return os.path.abspath(filename)
 
 
-def load(filename: str) -> tp.Optional[tp.Any]:
-    """Load a pickled obj from the filesystem.
+def write_manifest(project: 'Project') -> str:
+    """
+    Write the manifest of a project for all of its wrappers.
 
-    You better know what you expect from the given pickle, because we don't
-    check it.
+    All wrappers of a project share a single manifest, the pickled project
+    behind a versioned header, see `benchbuild.runtime.load`. Projects wrap
+    binaries in loops, so we only write the manifest, if the project
+    changed since the last time. Wrappers that already run never see a
+    partially written manifest.
 
     Args:
-        filename (str): The filename we load the object from.
+        project: The project we write the manifest for.
 
     Returns:
-        The object we were able to unpickle, else None.
+        The absolute path of the manifest.
     """
-    if not os.path.exists(filename):
-        LOG.error("load object - File '%s' does not exist.", filename)
-        return None
-
-    obj = None
-    with open(filename, 'rb') as obj_file:
-        obj = dill.load(obj_file)
-    return obj
+    filename = os.path.abspath(f"{project.run_uuid}{PROJECT_MANIFEST_F_EXT}")
+    data = runtime.manifest_header() + dill.dumps(project)
+
+    if os.path.exists(filename):
+        with open(filename, 'rb') as manifest:
+            if manifest.read() == data:
+                return filename
+
+    tmp_filename = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp_filename, 'wb') as manifest:
+        manifest.write(data)
+    os.replace(tmp_filename, filename)
+    LOG.debug("Wrote manifest: %s", filename)
+    return filename
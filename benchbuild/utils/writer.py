@@ -0,0 +1,190 @@
+"""
+Write-behind buffer for the measurements we store in the database.
+
+Every tracked command inserts a run, its log, its metrics & its config into
+the database. Written one row & one transaction at a time, the round trips
+to the database cost more than short benchmarks themselves.
+
+If `CFG["db"]["batch_writes"]` is enabled, these rows are buffered by a
+`BatchWriter` and written in bulk, with a single `executemany` per table.
+The buffer is flushed:
+    - when it holds `CFG["db"]["batch_size"]` rows,
+    - on the first write after `CFG["db"]["batch_interval"]` seconds,
+    - at the end of every step,
+    - on SIGTERM & when the process exits.
+
+The writer uses the connection of `schema.Session`. Database connections
+(SQLite in particular) are bound to the thread that created them, so we do
+not flush from a background thread.
+"""
+import atexit
+import collections
+import logging
+import os
+import time
+import typing as tp
+
+import attr
+
+from benchbuild import signals
+from benchbuild.settings import CFG
+from benchbuild.utils import blobs, rollup
+
+if tp.TYPE_CHECKING:
+    import sqlalchemy as sa  # pylint: disable=unused-import
+
+LOG = logging.getLogger(__name__)
+
+Row = tp.Dict[str, tp.Any]
+
+
+@attr.s
+class BatchWriter:
+    """
+    Buffer inserts & updates of rows and write them in bulk.
+
+    Attributes:
+        max_rows: Flush, as soon as this many rows are buffered.
+        max_delay: Flush on the next write, if the oldest buffered row is
+            older than this (in seconds).
+    """
+    max_rows: int = attr.ib(default=1000)
+    max_delay: float = attr.ib(default=1.0)
+
+    inserts: tp.Dict['sa.Table', tp.List[Row]] = attr.ib(
+        init=False, default=attr.Factory(collections.OrderedDict), repr=False
+    )
+    updates: tp.Dict[tp.Tuple['sa.Table', tp.Tuple[str, ...]],
+                     tp.List[Row]] = attr.ib(
+                         init=False,
+                         default=attr.Factory(collections.OrderedDict),
+                         repr=False
+                     )
+    pending: int = attr.ib(init=False, default=0)
+    oldest: tp.Optional[float] = attr.ib(init=False, default=None)
+
+    def insert(self, table: 'sa.Table', rows: tp.Iterable[Row]) -> None:
+        """
+        Buffer rows we want to insert into a table.
+
+        Args:
+            table: The table we insert into.
+            rows: The rows, as mapping from column names to values.
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        self.inserts.setdefault(table, []).extend(rows)
+        self.__buffered(len(rows))
+
+    def update(self, table: 'sa.Table', key: tp.Any, values: Row) -> None:
+        """
+        Buffer an update of a single row, identified by its primary key.
+
+        Args:
+            table: The table we update.
+            key: The value of the primary key ('id') of the row.
+            values: The new values, as mapping from column names to values.
+        """
+        columns = tuple(sorted(values))
+        self.updates.setdefault((table, columns), []).append(
+            dict(values, _key=key)
+        )
+        self.__buffered(1)
+
+    def __buffered(self, num_rows: int) -> None:
+        if self.oldest is None:
+            self.oldest = time.time()
+        self.pending += num_rows
+
+        if self.pending >= self.max_rows or \
+                time.time() - self.oldest >= self.max_delay:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all buffered rows in a single transaction."""
+        if not self.pending:
+            return
+
+        import sqlalchemy as sa
+
+        from benchbuild.utils import schema
+
+        inserts, self.inserts = self.inserts, collections.OrderedDict()
+        updates, self.updates = self.updates, collections.OrderedDict()
+        num_rows, self.pending = self.pending, 0
+        self.oldest = None
+
+        session = schema.Session()
+        try:
+            for table, rows in inserts.items():
+                if table.name == blobs.TABLE:
+                    blobs.store(session, rows)
+                    continue
+                session.execute(table.insert(), rows)
+                rollup.update(session, table, rows)
+            for (table, columns), rows in updates.items():
+                stmt = table.update().where(
+                    table.c.id == sa.bindparam('_key')
+                ).values({col: sa.bindparam(col) for col in columns})
+                session.execute(stmt, rows)
+            session.commit()
+        except sa.exc.SQLAlchemyError:
+            session.rollback()
+            LOG.exception("Could not write %d buffered rows", num_rows)
+            raise
+        LOG.debug("Wrote %d buffered rows", num_rows)
+
+
+__WRITER__: tp.Optional[BatchWriter] = None
+
+
+def writer() -> tp.Optional[BatchWriter]:
+    """
+    Return the batch writer of this process.
+
+    Returns:
+        The writer, None, if batch writes are disabled.
+    """
+    global __WRITER__  # pylint: disable=global-statement
+
+    if not CFG["db"]["batch_writes"]:
+        return None
+
+    if __WRITER__ is None:
+        from benchbuild.utils.actions import Step
+
+        __WRITER__ = BatchWriter(
+            max_rows=int(CFG["db"]["batch_size"]),
+            max_delay=float(CFG["db"]["batch_interval"].value)
+        )
+        signals.handlers.register(flush)
+        if flush_on_step_end not in Step.ON_STEP_END:
+            Step.ON_STEP_END.append(flush_on_step_end)
+    return __WRITER__
+
+
+def flush() -> None:
+    """Flush the batch writer of this process, if there is one."""
+    if __WRITER__ is not None:
+        __WRITER__.flush()
+
+
+def flush_on_step_end(step: tp.Any, func: tp.Callable[..., tp.Any]) -> None:
+    del step, func
+    flush()
+
+
+def forget() -> None:
+    """
+    Drop the batch writer after a fork.
+
+    The rows buffered at the time of the fork are written by the parent.
+    """
+    global __WRITER__  # pylint: disable=global-statement
+    __WRITER__ = None
+
+
+atexit.register(flush)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=forget)
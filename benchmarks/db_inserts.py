@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Measure sustained database inserts with many concurrent wrappers.
+
+Every worker process behaves like a wrapped binary: it tracks the execution
+of a command (`true`) in a run, stores its timings and exits. We report the
+number of rows (run, log, metrics & blobs) written per second, including
+the ingestion of spooled results.
+
+All settings of benchbuild apply, e.g., compare the defaults to the old
+behaviour and to a single writer:
+
+    python benchmarks/db_inserts.py -n 16 -r 50
+    BB_DB_SQLITE_JOURNAL_MODE=delete BB_DB_SQLITE_SYNCHRONOUS=full \\
+        python benchmarks/db_inserts.py -n 16 -r 50
+    BB_DB_SQLITE_SINGLE_WRITER=true python benchmarks/db_inserts.py -n 16 -r 50
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+from plumbum import local
+
+from benchbuild.settings import CFG
+from benchbuild.utils import db, run, schema, spool
+
+
+class Project:
+    name = "inserts"
+    group = "benchmark"
+    run_uuid = uuid.uuid4()
+
+
+class Experiment:
+    name = "inserts"
+    id = uuid.uuid4()
+
+
+def wrapper(num_runs: int) -> None:
+    """Track `num_runs` executions, like a wrapped binary."""
+    for _ in range(num_runs):
+        with run.track_execution(local['true'], Project(), Experiment()) as ri:
+            run_info = ri()
+        db.persist_rusage(
+            run_info.session,
+            [(run_info.db_run, run_info.rusage, run_info.wall)]
+        )
+        run_info.commit()
+
+
+def count_rows() -> int:
+    session = schema.Session()
+    return sum(
+        session.query(model).count()
+        for model in (schema.Run, schema.RunLog, schema.Metric, schema.Blob)
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "-n", "--wrappers", type=int, default=8, help="concurrent wrappers"
+    )
+    parser.add_argument(
+        "-r", "--runs", type=int, default=20, help="runs per wrapper"
+    )
+    parser.add_argument(
+        "-d",
+        "--database",
+        default=None,
+        help="connect string, defaults to a new SQLite file"
+    )
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bb-inserts-")
+    connect_string = args.database or f"sqlite:///{tmp_dir}/bench.db"
+    CFG["db"]["connect_string"] = connect_string
+    CFG["build_dir"] = tmp_dir
+    # Wrapped binaries write their outputs next to sys.argv[0].
+    sys.argv[0] = os.path.join(tmp_dir, "wrapper")
+
+    db.persist_experiment(Experiment())
+    rows_before = count_rows()
+
+    with spool.scope() if spool.enabled() else local.env():
+        start = time.time()
+        workers = [
+            multiprocessing.Process(target=wrapper, args=(args.runs,))
+            for _ in range(args.wrappers)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    duration = time.time() - start
+
+    failed = [worker.exitcode for worker in workers if worker.exitcode]
+    rows = count_rows() - rows_before
+    print(f"database: {connect_string}")
+    print(f"spooled: {spool.enabled()}")
+    print(f"wrappers: {args.wrappers}, runs: {args.wrappers * args.runs}")
+    print(f"rows: {rows} in {duration:.2f}s, {rows / duration:.0f} rows/s")
+    if failed:
+        print(f"{len(failed)} wrappers failed")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Measure the time-to-first-insert of a new process.
+
+Every process that touches the database, e.g., every wrapped binary, pays
+for the start of the interpreter, the import of benchbuild, the connection
+& the validation of the schema before it can insert its first run. We start
+a fresh process repeatedly and report the median time from its spawn to
+the commit of its first run.
+
+The first process creates the schema, all later processes find a validated
+schema. Compare with processes that validate the schema every time:
+
+    python benchmarks/startup.py -p 20
+    BB_DB_SCHEMA_MARKER=false python benchmarks/startup.py -p 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+START = "BENCH_STARTUP_SPAWNED"
+
+
+def first_insert() -> None:
+    """Insert a single run and report the times since our spawn."""
+    from benchbuild.utils import schema
+    imported = time.time()
+
+    # Without the spool, even if a single process writes to the database.
+    session = schema.Session()
+    session.add(
+        schema.Run(
+            command="true",
+            project_name="startup",
+            project_group="benchmark",
+            experiment_name="startup",
+            run_group=str(uuid.uuid4())
+        )
+    )
+    session.commit()
+
+    spawned = float(os.environ[START])
+    print(f"{imported - spawned} {time.time() - spawned}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "-p", "--processes", type=int, default=10, help="processes to start"
+    )
+    parser.add_argument(
+        "-d",
+        "--database",
+        default=None,
+        help="connect string, defaults to a new SQLite file"
+    )
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        first_insert()
+        return 0
+
+    tmp_dir = tempfile.mkdtemp(prefix="bb-startup-")
+    connect_string = args.database or f"sqlite:///{tmp_dir}/bench.db"
+    env = dict(os.environ)
+    env["BB_DB_CONNECT_STRING"] = connect_string
+
+    times = []
+    for _ in range(args.processes):
+        env[START] = repr(time.time())
+        output = subprocess.run([sys.executable, __file__, "--child"],
+                                env=env,
+                                check=True,
+                                stdout=subprocess.PIPE,
+                                universal_newlines=True).stdout
+        imported, inserted = output.split()[-2:]
+        times.append((float(imported), float(inserted)))
+
+    first, later = times[0], times[1:] or times
+    print(f"database: {connect_string}")
+    print(f"first process: {first[1] * 1000:.0f}ms to first insert")
+    print(
+        "later processes (median): "
+        f"{statistics.median(t[0] for t in later) * 1000:.0f}ms to start, "
+        f"{statistics.median(t[1] for t in later) * 1000:.0f}ms "
+        "to first insert"
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Check the cold-start of a wrapped binary against a fixed budget.
+
+Every call of a wrapped binary starts a new interpreter that imports
+`benchbuild.runtime` and unpickles its project. We wrap `true` for the test
+project, call the wrapper repeatedly with `python -X importtime` and report
+the median time spent in imports.
+
+We fail, if the median exceeds the budget, or if a call imports a module
+that a wrapper without a runtime extension never needs, e.g., sqlalchemy:
+
+    python benchmarks/wrapper_startup.py -r 20 -b 400
+"""
+import argparse
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import typing as tp
+
+from plumbum import local
+
+from benchbuild.projects.test.test import TestProject
+from benchbuild.utils import wrapping
+
+FORBIDDEN = ("sqlalchemy", "migrate", "jinja2", "pygit2", "pkg_resources")
+IMPORT_TIME = re.compile(r'^import time:\s*(\d+) \|\s*(\d+) \|( *)(\S+)$')
+
+Imports = tp.Dict[str, int]
+
+
+def parse_imports(importtime: str) -> Imports:
+    """
+    Parse the output of `python -X importtime`.
+
+    Returns:
+        The cumulative import time (in us) of every top-level import.
+    """
+    imports = {}
+    for line in importtime.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match and len(match.group(3)) == 1:
+            imports[match.group(4)] = int(match.group(2))
+    return imports
+
+
+def all_modules(importtime: str) -> tp.Set[str]:
+    return {
+        match.group(4)
+        for match in map(IMPORT_TIME.match, importtime.splitlines())
+        if match
+    }
+
+
+def forbidden_modules(modules: tp.Set[str]) -> tp.List[str]:
+    return sorted({name.split('.')[0] for name in modules} & set(FORBIDDEN))
+
+
+def call(wrapper: str) -> tp.Tuple[float, Imports, tp.Set[str]]:
+    """Call the wrapper once and return its wall-time & imports."""
+    start = time.perf_counter()
+    importtime = subprocess.run([sys.executable, "-X", "importtime", wrapper],
+                                check=True,
+                                stderr=subprocess.PIPE,
+                                universal_newlines=True).stderr
+    wall = time.perf_counter() - start
+    return wall, parse_imports(importtime), all_modules(importtime)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "-r", "--runs", type=int, default=10, help="calls of the wrapper"
+    )
+    parser.add_argument(
+        "-b",
+        "--budget",
+        type=float,
+        default=400,
+        help="budget for the median import time, in ms"
+    )
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bb-wrapper-startup-")
+    try:
+        shutil.copy(local.which("true"), os.path.join(tmp_dir, "true"))
+        with local.cwd(tmp_dir):
+            wrapper = str(wrapping.wrap("true", TestProject()))
+
+        calls = [call(wrapper) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    import_ms = [sum(imports.values()) / 1000 for _, imports, _ in calls]
+    median_ms = statistics.median(import_ms)
+    slowest = sorted(
+        calls[-1][1].items(), key=lambda item: item[1], reverse=True
+    )[:5]
+    forbidden = forbidden_modules(set.union(*(mods for _, _, mods in calls)))
+
+    print(
+        f"wrapper cold-start (median of {args.runs}): "
+        f"{statistics.median(wall for wall, _, _ in calls) * 1000:.0f}ms, "
+        f"{median_ms:.0f}ms in imports (budget: {args.budget:.0f}ms)"
+    )
+    for name, micros in slowest:
+        print(f"  {micros / 1000:6.1f}ms {name}")
+
+    failed = False
+    if forbidden:
+        print(f"imported, but not needed: {', '.join(forbidden)}")
+        failed = True
+    if median_ms > args.budget:
+        print("over budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,8 @@
+"""
+Configure the collection of doctests in the benchbuild package.
+"""
+try:
+    import numpy  # pylint: disable=unused-import
+except ImportError:
+    # The analysis requires the optional numpy dependency.
+    collect_ignore_glob = ['benchbuild/analysis/*']
@@ -13,7 +13,8 @@ RESOURCES = [
     "res/sql/func.pj-test-eval.sql", "res/sql/func.compilestats_eval.sql",
     "res/sql/func.polly_mse.sql", "res/sql/func.profileScopDetection-eval.sql",
     "res/wrapping/run_compiler.py.inc", "res/wrapping/run_static.py.inc",
-    "res/wrapping/run_dynamic.py.inc", "res/patches/linpack.patch"
+    "res/wrapping/run_dynamic.py.inc",
+    "res/wrapping/forkserver_client.py.inc", "res/patches/linpack.patch"
 ]
 
 setup(
@@ -36,6 +37,11 @@ setup(
         "pyparsing~=2.4", "rich>=6.1,<10.0", "sqlalchemy-migrate~=0.13",
         "typing-extensions~=3.7.4.3", "virtualenv>=16.7,<21.0"
     ],
+    extras_require={
+        "numpy": ["numpy>=1.17"],
+        "parquet": ["pyarrow>=1.0"],
+        "zstd": ["zstandard>=0.13"]
+    },
     author="Andreas Simbuerger",
     author_email="simbuerg@fim.uni-passau.de",
     description="This is the experiment driver for the benchbuild study",
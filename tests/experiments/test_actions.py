@@ -0,0 +1,99 @@
+"""
+Test the plan generation of experiments.
+"""
+import pytest
+
+from benchbuild.environments.domain.declarative import ContainerImage
+from benchbuild.experiment import Experiment
+from benchbuild.project import Project
+from benchbuild.settings import CFG
+from benchbuild.source import HTTP
+from benchbuild.utils import actions
+
+CREATED = []
+
+
+class ManyVariants(Project):
+    NAME = "many-variants"
+    DOMAIN = "debug"
+    GROUP = "debug"
+    SOURCE = [
+        HTTP(
+            remote={
+                str(v): "http://example.org/{0}.tar.gz".format(v)
+                for v in range(5)
+            },
+            local="src.tar.gz"
+        )
+    ]
+    CONTAINER = ContainerImage().from_('benchbuild:alpine')
+
+    def __attrs_post_init__(self) -> None:
+        CREATED.append(self.version_of_primary)
+        super().__attrs_post_init__()
+
+    def compile(self):
+        pass
+
+    def run_tests(self):
+        pass
+
+
+class CountingExperiment(Experiment):
+    NAME = "counting"
+
+    def actions_for_project(self, project):
+        return self.default_compiletime_actions(project)
+
+
+@pytest.fixture
+def full_versions():
+    old_full = CFG["versions"]["full"].value
+    CFG["versions"]["full"] = True
+    CREATED.clear()
+    yield
+    CFG["versions"]["full"] = old_full
+
+
+def test_projects_are_created_on_demand(full_versions):
+    exp = CountingExperiment(projects=[ManyVariants])
+    plan = exp.actions()
+    chains = [step for step in plan if isinstance(step, actions.RequireAll)]
+
+    assert len(chains) == 5
+    assert CREATED == ["0"]
+
+    chains[3].create()
+    assert CREATED == ["0", "3"]
+
+
+def test_on_demand_actions_are_counted_by_prototype(full_versions):
+    exp = CountingExperiment(projects=[ManyVariants])
+    plan = exp.actions()
+    chains = [step for step in plan if isinstance(step, actions.RequireAll)]
+
+    assert len({len(chain) for chain in chains}) == 1
+    assert len(chains[4]) == len(chains[4].create()) + 1
+
+
+class EveryOtherExperiment(CountingExperiment):
+    NAME = "every-other"
+
+    @classmethod
+    def sample(cls, prj_cls):
+        return super().sample(prj_cls)[::2]
+
+
+def test_sample_is_a_list(full_versions):
+    variants = CountingExperiment.sample(ManyVariants)
+
+    assert isinstance(variants, list)
+    assert len(variants) == 5
+
+
+def test_overridden_sample_is_used_on_demand(full_versions):
+    exp = EveryOtherExperiment(projects=[ManyVariants])
+    plan = exp.actions()
+    chains = [step for step in plan if isinstance(step, actions.RequireAll)]
+
+    assert len(chains) == 3
@@ -0,0 +1,109 @@
+"""
+Test the vectorized analysis of measurements.
+"""
+import uuid
+
+import pytest
+
+from benchbuild.utils import schema
+
+np = pytest.importorskip("numpy")
+
+# pylint: disable=wrong-import-position
+from benchbuild import analysis  # isort:skip
+
+
+def add_experiment(session, exp_name):
+    exp_id = uuid.uuid4()
+    session.add(schema.Experiment(id=exp_id, name=exp_name))
+    return exp_id
+
+
+def add_runs(session, exp_id, exp_name, project, variant, values):
+    for value in values:
+        run = schema.Run(
+            command="test",
+            project_name=project,
+            project_group="analysis",
+            experiment_name=exp_name,
+            experiment_group=exp_id,
+            variant=variant,
+            status='completed'
+        )
+        session.add(run)
+        session.flush()
+        session.add(schema.Metric(name="time.real_s", value=value,
+                                  run_id=run.id))
+        session.add(schema.Metric(name="other", value=1.0, run_id=run.id))
+
+
+@pytest.fixture
+def experiments():
+    session = schema.Session()
+    base = add_experiment(session, "analysis-base")
+    cand = add_experiment(session, "analysis-cand")
+    add_runs(session, base, "analysis-base", "a", "1", [4.0, 4.0, 4.0])
+    add_runs(session, cand, "analysis-cand", "a", "1", [2.0, 2.0, 2.0])
+    add_runs(session, base, "analysis-base", "b", None, [9.0, 9.0])
+    add_runs(session, cand, "analysis-cand", "b", None, [1.0, 1.0])
+    # Only measured in the baseline, cannot be compared.
+    add_runs(session, base, "analysis-base", "c", None, [1.0])
+    session.commit()
+    return str(base), str(cand)
+
+
+def test_load_encodes_categories(experiments):
+    base, _ = experiments
+    data = analysis.load(
+        metrics=['time.real_s'], experiment_ids=[base], batch_size=2
+    )
+
+    assert len(data) == 6
+    assert data.experiments == (base,)
+    assert data.metrics == ('time.real_s',)
+    assert data.projects == ('a/analysis', 'b/analysis', 'c/analysis')
+    assert data.variants == ('1', '')
+    assert data.value.tolist() == [4.0, 4.0, 4.0, 9.0, 9.0, 1.0]
+
+
+def test_group_by():
+    keys, groups = analysis.group_by(np.array([0, 1, 0, 1]),
+                                     np.array([2, 0, 2, 1]))
+
+    assert keys.tolist() == [[0, 2], [1, 0], [1, 1]]
+    assert groups.tolist() == [0, 1, 0, 2]
+
+
+def test_bootstrap_of_constant_groups():
+    values = np.array([1.0, 1.0, 3.0, 3.0, 3.0])
+    groups = np.array([0, 0, 2, 2, 2])
+
+    samples = analysis.bootstrap(values, groups, 3, resamples=50, seed=0)
+    low, high = analysis.interval(samples)
+
+    assert samples.shape == (50, 3)
+    assert np.isnan(low[1]) and np.isnan(high[1])
+    assert low[[0, 2]].tolist() == [1.0, 3.0]
+    assert high[[0, 2]].tolist() == [1.0, 3.0]
+
+
+def test_compare(experiments):
+    data = analysis.load(experiment_ids=experiments)
+    base, _ = experiments
+
+    result = analysis.compare(data, base, 'analysis-cand', seed=0)
+
+    assert result.projects == ('a/analysis', 'b/analysis')
+    assert result.variants == ('1', '')
+    assert result.speedup.tolist() == [2.0, 9.0]
+    assert result.low.tolist() == [2.0, 9.0]
+    assert result.geomean == pytest.approx(np.sqrt(18.0))
+    assert result.geomean_interval == pytest.approx((np.sqrt(18.0),) * 2)
+    assert next(result.rows())['speedup'] == 2.0
+
+
+def test_unknown_experiment(experiments):
+    data = analysis.load(experiment_ids=experiments)
+
+    with pytest.raises(KeyError):
+        analysis.compare(data, 'analysis-base', 'unknown')
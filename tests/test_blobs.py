@@ -0,0 +1,108 @@
+"""
+Test the blob storage of run logs.
+"""
+import io
+import sys
+import uuid
+
+import pytest
+from plumbum import local
+
+from benchbuild.settings import CFG
+from benchbuild.utils import blobs, run, schema, writer
+
+
+class FakeProject:
+    name = "blobbed"
+    group = "blobs"
+    run_uuid = uuid.uuid4()
+
+
+class FakeExperiment:
+    name = "blobbed"
+    id = uuid.uuid4()
+
+
+@pytest.fixture(autouse=True)
+def log_blobs():
+    old_log_blobs = CFG["db"]["log_blobs"].value
+    CFG["db"]["log_blobs"] = True
+    yield
+    CFG["db"]["log_blobs"] = old_log_blobs
+
+
+@pytest.fixture
+def tracked(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, 'argv', [str(tmp_path / 'tracked')])
+
+    def track(*args):
+        cmd = local['echo'][args]
+        with run.track_execution(cmd, FakeProject(), FakeExperiment()) as ri:
+            run_info = ri()
+        writer.flush()
+        session = schema.Session()
+        return session.query(schema.RunLog).filter(
+            schema.RunLog.run_id == run_info.db_run.id
+        ).one()
+
+    return track
+
+
+def blobs_of(*logs):
+    hashes = {getattr(log, f'{name}_hash') for log in logs
+              for name in blobs.FIELDS}
+    session = schema.Session()
+    return session.query(schema.Blob).filter(schema.Blob.hash.in_(hashes))
+
+
+def test_logs_reference_deduplicated_blobs(tracked):
+    first = tracked('same')
+    second = tracked('same')
+
+    assert first.stdout is None and first.config is None
+    assert first.stdout_hash == second.stdout_hash
+    assert first.config_hash == second.config_hash
+    assert blobs_of(first, second).count() == 3
+
+    session = schema.Session()
+    assert blobs.text(session, first, 'stdout') == 'same\n'
+    assert blobs.text(session, first, 'config') == run.run_config()
+
+
+def test_batched_logs_reference_blobs(tracked):
+    old_batch_writes = CFG["db"]["batch_writes"].value
+    CFG["db"]["batch_writes"] = True
+    writer.forget()
+    try:
+        log = tracked('batched')
+    finally:
+        writer.forget()
+        CFG["db"]["batch_writes"] = old_batch_writes
+
+    out = io.StringIO()
+    blobs.stream(schema.Session(), log, 'stdout', out)
+    assert out.getvalue() == 'batched\n'
+
+
+def test_inline_logs_are_read_transparently(tracked):
+    old_log_blobs = CFG["db"]["log_blobs"].value
+    CFG["db"]["log_blobs"] = False
+    try:
+        log = tracked('inline')
+    finally:
+        CFG["db"]["log_blobs"] = old_log_blobs
+
+    assert log.stdout_hash is None
+    assert blobs.text(schema.Session(), log, 'stdout') == 'inline\n'
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'none'])
+def test_large_blobs_are_decompressed_in_chunks(encoding):
+    text = 'äöü benchbuild\n' * 100000
+    data = text.encode('utf-8')
+
+    chunks = list(
+        blobs.decompressed(blobs.compress(data, encoding), encoding)
+    )
+
+    assert b''.join(chunks) == data
@@ -0,0 +1,135 @@
+"""
+Test the build cache.
+"""
+import os
+
+import pytest
+from plumbum import local
+
+from benchbuild.environments.domain.declarative import ContainerImage
+from benchbuild.extensions import compiler, run
+from benchbuild.project import Project
+from benchbuild.settings import CFG
+from benchbuild.source import nosource
+from benchbuild.utils import actions as a
+from benchbuild.utils import buildcache
+
+COMPILED = []
+EXTRA_FILES = {}
+
+
+class CachedProject(Project):
+    NAME = "test_cached"
+    DOMAIN = "debug"
+    GROUP = "debug"
+    SOURCE = [nosource()]
+    CONTAINER = ContainerImage().from_('benchbuild:alpine')
+
+    def compile(self):
+        COMPILED.append(self.builddir)
+        with open(local.path(self.builddir) / "a.out", 'w') as binary:
+            binary.write("binary")
+        os.chmod(local.path(self.builddir) / "a.out", 0o755)
+        for name, content in EXTRA_FILES.items():
+            with open(local.path(self.builddir) / name, 'w') as extra:
+                extra.write(content.format(builddir=self.builddir))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    old_enable = CFG["buildcache"]["enable"].value
+    old_path = CFG["buildcache"]["path"].value
+    CFG["buildcache"]["enable"] = True
+    CFG["buildcache"]["path"] = str(tmp_path / "cache")
+    COMPILED.clear()
+    EXTRA_FILES.clear()
+    yield tmp_path
+    EXTRA_FILES.clear()
+    CFG["buildcache"]["enable"] = old_enable
+    CFG["buildcache"]["path"] = old_path
+
+
+def make_project(tmp_path, name, **kwargs):
+    builddir = local.path(str(tmp_path)) / name
+    builddir.mkdir()
+    return CachedProject(builddir=builddir, **kwargs)
+
+
+def test_key_is_none_if_disabled(tmp_path):
+    assert buildcache.key_of(make_project(tmp_path, "a")) is None
+
+
+def test_key_depends_on_flags(cache):
+    prj_a = make_project(cache, "a", cflags=["-O3"])
+    prj_b = make_project(cache, "b", cflags=["-O3"])
+    prj_c = make_project(cache, "c", cflags=["-O0"])
+
+    assert buildcache.key_of(prj_a) == buildcache.key_of(prj_b)
+    assert buildcache.key_of(prj_a) != buildcache.key_of(prj_c)
+
+
+def test_key_depends_on_compiler_extension(cache):
+    prj_a = make_project(cache, "a")
+    prj_b = make_project(cache, "b")
+    prj_b.compiler_extension = run.WithTimeout(
+        compiler.RunCompiler(prj_b, None)
+    )
+
+    assert buildcache.key_of(prj_a) != buildcache.key_of(prj_b)
+
+
+def test_compile_restores_from_cache(cache):
+    prj_a = make_project(cache, "a")
+    prj_b = make_project(cache, "b")
+
+    assert a.Compile(prj_a)() == [a.StepResult.OK]
+    assert a.Compile(prj_b)() == [a.StepResult.OK]
+
+    assert COMPILED == [prj_a.builddir]
+    assert (prj_b.builddir / "a.out").read() == "binary"
+
+
+def test_own_files_are_not_cached(cache):
+    EXTRA_FILES.update({
+        "clang": "#!/bin/sh",
+        "clang.benchbuild.cc": "pickled compiler",
+        "a.project": "benchbuild-manifest 1\n",
+        "data.project": "data"
+    })
+    prj_a = make_project(cache, "a")
+    prj_b = make_project(cache, "b")
+
+    a.Compile(prj_a)()
+    a.Compile(prj_b)()
+
+    assert COMPILED == [prj_a.builddir]
+    assert sorted(os.listdir(prj_b.builddir)) == ["a.out", "data.project"]
+
+
+def test_references_to_the_builddir_are_not_cached(cache):
+    EXTRA_FILES["Makefile"] = "CC = {builddir}/clang"
+    prj_a = make_project(cache, "a")
+    prj_b = make_project(cache, "b")
+
+    a.Compile(prj_a)()
+    a.Compile(prj_b)()
+
+    assert COMPILED == [prj_a.builddir, prj_b.builddir]
+
+
+def test_hardlinks_share_only_artifacts(cache):
+    CFG["buildcache"]["link"] = "hardlink"
+    EXTRA_FILES["data.txt"] = "data"
+    prj_a = make_project(cache, "a")
+    prj_b = make_project(cache, "b")
+    try:
+        a.Compile(prj_a)()
+        a.Compile(prj_b)()
+    finally:
+        CFG["buildcache"]["link"] = "reflink"
+
+    binary = os.stat(prj_b.builddir / "a.out")
+    assert binary.st_nlink == 2
+    assert not binary.st_mode & 0o222
+    assert os.stat(prj_b.builddir / "data.txt").st_nlink == 1
+    assert os.stat(prj_a.builddir / "a.out").st_nlink == 1
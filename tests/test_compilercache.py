@@ -0,0 +1,135 @@
+"""
+Test the compiler cache of `RunCompiler`.
+"""
+import os
+import uuid
+
+import attr
+import pytest
+from plumbum import local
+
+from benchbuild.extensions import compiler
+from benchbuild.settings import CFG
+from benchbuild.utils import compilercache
+
+# Compiles like clang, logs every compilation to an object file.
+FAKE_CC = """#!/bin/sh
+case " $* " in *" -c "*) echo "$*" >> calls.log ;; esac
+for arg; do
+    shift
+    case "$arg" in
+        -Qunused-arguments) [ -n "$REJECT_Q" ] && exit 1 ;;
+        *) set -- "$@" "$arg" ;;
+    esac
+done
+exec gcc "$@"
+"""
+
+
+@attr.s(eq=False)
+class FakeProject:
+    name = attr.ib(default="cached")
+    group = attr.ib(default="test")
+    run_uuid = attr.ib(default=attr.Factory(uuid.uuid4))
+    cflags = attr.ib(default=attr.Factory(list))
+    ldflags = attr.ib(default=attr.Factory(list))
+
+
+@attr.s(eq=False)
+class FakeExperiment:
+    name = attr.ib(default="compilercache")
+    id = attr.ib(default=attr.Factory(uuid.uuid4))
+
+
+@pytest.fixture
+def cc(tmp_path):
+    if not local.path("/usr/bin/gcc").exists():
+        pytest.skip("needs gcc")
+    CFG["compilercache"]["enable"] = True
+    CFG["compilercache"]["path"] = str(tmp_path / "cache")
+    fake_cc = tmp_path / "cc"
+    fake_cc.write_text(FAKE_CC)
+    fake_cc.chmod(0o755)
+    (tmp_path / "a.c").write_text("int main(void) { return 0; }\n")
+    with local.cwd(str(tmp_path)):
+        yield local[str(fake_cc)]
+    CFG["compilercache"]["enable"] = False
+    CFG["compilercache"]["path"] = None
+
+
+def compile_a(cc, project, *args):
+    ext = compiler.RunCompiler(project, FakeExperiment())
+    local.path("a.o").delete()
+    run_info = ext(cc, "-c", "a.c", *args)[-1]
+    assert local.path("a.o").exists()
+    return run_info, local.path("calls.log").read().splitlines()
+
+
+def test_calls_are_not_cacheable():
+    assert compilercache.split_args(["a.c", "-o", "a"]) is None
+    assert compilercache.split_args(["-c", "a.c", "b.c"]) is None
+    assert compilercache.split_args(["-c", "a.c", "-MD"]) is None
+    assert compilercache.split_args(["-c", "a.c", "-oa.o"]) == \
+        (["-c", "a.c"], "a.c", "a.o")
+
+
+def test_same_call_is_cached(cc):
+    _, calls = compile_a(cc, FakeProject(cflags=["-O2"]))
+    assert len(calls) == 1
+
+    run_info, calls = compile_a(cc, FakeProject(cflags=["-O2"]))
+    assert len(calls) == 1
+    assert run_info.retcode == 0 and not run_info.has_failed
+
+    _, calls = compile_a(cc, FakeProject(cflags=["-O0"]))
+    assert len(calls) == 2
+
+
+def test_compiler_is_identified_by_mtime(tmp_path):
+    binary = tmp_path / "cc"
+    binary.write_text("#!/bin/sh\n")
+    before = compilercache.compiler_id(str(binary))
+    os.utime(str(binary), ns=(0, 0))
+
+    assert compilercache.compiler_id(str(binary)) != before
+
+
+def test_line_markers_are_relative():
+    preprocessed = '# 1 "/build/a/a.c"\n# 1 "/usr/include/stdio.h" 1 3 4\n'
+    assert compilercache.relative_markers(preprocessed, '/build/a') == \
+        '# 1 "a.c"\n# 1 "/usr/include/stdio.h" 1 3 4\n'
+
+
+def test_other_build_dirs_are_cached(cc, tmp_path):
+    compile_a(cc, FakeProject())
+
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "a.c").write_text((tmp_path / "a.c").read_text())
+    with local.cwd(str(other)):
+        ext = compiler.RunCompiler(FakeProject(), FakeExperiment())
+        ext(cc, "-c", "a.c")
+        assert local.path("a.o").exists()
+        assert not local.path("calls.log").exists()
+
+
+def test_failing_flags_fall_back_directly(cc):
+    with local.env(REJECT_Q="1"):
+        run_info, calls = compile_a(cc, FakeProject())
+        assert len(calls) == 2
+        assert not run_info.has_failed
+
+        run_info, calls = compile_a(cc, FakeProject())
+        # Only the fallback without our flags compiles again.
+        assert len(calls) == 3
+        assert "-Qunused-arguments" not in calls[-1]
+
+
+def test_broken_flags_fall_back_directly(cc):
+    run_info, calls = compile_a(cc, FakeProject(cflags=["-fbogus-flag"]))
+    assert len(calls) == 2
+    assert not run_info.has_failed
+
+    run_info, calls = compile_a(cc, FakeProject(cflags=["-fbogus-flag"]))
+    assert len(calls) == 3
+    assert "-fbogus-flag" not in calls[-1]
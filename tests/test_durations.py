@@ -0,0 +1,40 @@
+"""
+Test the estimation of project durations.
+"""
+import datetime
+import uuid
+
+from benchbuild.utils import schema
+from benchbuild.utils.durations import Durations
+
+
+def add_run_group(exp_name, prj_name, seconds):
+    session = schema.Session()
+    group = uuid.uuid4()
+    begin = datetime.datetime(2020, 1, 1)
+    for offset in [0, seconds]:
+        session.add(
+            schema.Run(
+                command="true",
+                project_name=prj_name,
+                project_group="durations",
+                experiment_name=exp_name,
+                run_group=group,
+                begin=begin + datetime.timedelta(seconds=offset),
+                end=begin + datetime.timedelta(seconds=offset)
+            )
+        )
+    session.commit()
+
+
+def test_durations_are_estimated_from_run_groups():
+    add_run_group("exp_a", "prj", 10)
+    add_run_group("exp_a", "prj", 20)
+    add_run_group("exp_b", "prj", 60)
+
+    durations = Durations.load()
+
+    assert durations.estimate("exp_a", "prj", "durations") == 15
+    assert durations.estimate("exp_b", "prj", "durations") == 60
+    assert durations.estimate("exp_c", "prj", "durations") == 30
+    assert durations.estimate("exp_a", "unknown", "durations") is None
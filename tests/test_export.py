@@ -0,0 +1,67 @@
+"""
+Test the columnar export of results.
+"""
+import datetime
+import os
+import uuid
+
+import pytest
+
+from benchbuild.utils import export, schema
+
+
+@pytest.fixture
+def experiment_id():
+    session = schema.Session()
+    exp_id = uuid.uuid4()
+    session.add(schema.Experiment(id=exp_id, name="exported"))
+    for i in range(5):
+        run = schema.Run(
+            command=f"run-{i}",
+            project_name="export",
+            project_group="export",
+            experiment_name="exported",
+            experiment_group=exp_id,
+            begin=datetime.datetime(2020, 1, 1),
+            end=datetime.datetime(2020, 1, 2)
+        )
+        session.add(run)
+        session.flush()
+        session.add(schema.Metric(name="time", value=float(i), run_id=run.id))
+    session.commit()
+    return exp_id
+
+
+def test_batches_are_columns(experiment_id):
+    session = schema.Session()
+    query = export.query_of(session, 'metrics', experiment_id)
+
+    batches = list(export.batches(query, ['name', 'value', 'run_id'], 2))
+
+    assert [len(b['value']) for b in batches] == [2, 2, 1]
+    assert sorted(v for b in batches for v in b['value']) == [0, 1, 2, 3, 4]
+
+
+def test_uuids_are_exported_as_strings(experiment_id):
+    session = schema.Session()
+    query = export.query_of(session, 'run', experiment_id)
+    columns = [col.name for col in schema.Run.__table__.columns]
+
+    batch, = export.batches(query, columns, 10)
+
+    assert set(batch['experiment_group']) == {str(experiment_id)}
+
+
+def test_npz_export(experiment_id, tmp_path):
+    np = pytest.importorskip("numpy")
+
+    partition, = export.export(
+        str(tmp_path), fmt='npz', experiment_ids=[str(experiment_id)]
+    )
+
+    assert partition.endswith(f'experiment_id={experiment_id}')
+    runs = np.load(os.path.join(partition, 'run.npz'))
+    assert runs['id'].dtype == np.int64
+    assert sorted(runs['command']) == [f"run-{i}" for i in range(5)]
+    metrics = np.load(os.path.join(partition, 'metrics.npz'))
+    assert sorted(metrics['value']) == [0.0, 1.0, 2.0, 3.0, 4.0]
@@ -0,0 +1,59 @@
+"""
+Test that the fork server serves the calls of wrapped binaries.
+"""
+import os
+import shutil
+
+import pytest
+from plumbum import local
+
+from benchbuild.settings import CFG
+from benchbuild.utils import forkserver, wrapping
+from tests.test_wrappers import EmptyProject
+
+
+@pytest.fixture
+def echo(tmp_path):
+    CFG["forkserver"]["enable"] = True
+    shutil.copy("/bin/echo", str(tmp_path / "echo"))
+    with local.cwd(str(tmp_path)):
+        yield wrapping.wrap("echo", EmptyProject())
+    CFG["forkserver"]["enable"] = False
+
+
+def test_wrapper_is_a_client(echo):
+    assert local.path(str(echo) + ".wrapper").exists()
+    assert "BB_FORKSERVER_SOCKET" in local.path(str(echo)).read()
+
+
+def test_calls_are_served(echo, tmp_path):
+    with forkserver.scope() as socket_path:
+        assert echo("served") == "served\n"
+
+        (tmp_path / "sub").mkdir()
+        with local.cwd(str(tmp_path / "sub")):
+            script = '../echo "$PWD" "$FOO"; ../echo x > /dev/null; exit 3'
+            retcode, stdout, _ = local["sh"]["-c", script].with_env(
+                FOO="bar"
+            ).run(retcode=None)
+
+    assert (retcode, stdout) == (3, f"{tmp_path / 'sub'} bar\n")
+    assert not local.path(socket_path).exists()
+
+
+def test_exit_codes_are_served(echo, tmp_path):
+    fail = tmp_path / "fail"
+    fail.write_text("#!/bin/sh\nexit 5\n")
+    fail.chmod(0o755)
+    wrapped_fail = wrapping.wrap("fail", EmptyProject())
+
+    with forkserver.scope():
+        retcode, _, _ = wrapped_fail.run(retcode=None)
+
+    assert retcode == 5
+
+
+def test_clients_fall_back_without_server(echo):
+    # The wrapper script runs in a new interpreter.
+    with local.env(PYTHONPATH=os.path.dirname(os.path.dirname(__file__))):
+        assert echo("direct") == "direct\n"
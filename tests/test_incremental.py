@@ -0,0 +1,94 @@
+"""
+Test that incremental experiments skip completed project variants.
+"""
+import uuid
+
+import attr
+import pytest
+
+from benchbuild.settings import CFG
+from benchbuild.utils import actions as a
+from benchbuild.utils import incremental, run
+
+
+@attr.s(eq=False)
+class FakeExperiment:
+    name = attr.ib(default="incremental")
+    id = attr.ib(default=attr.Factory(uuid.uuid4))
+
+
+@attr.s(eq=False)
+class FakeProject:
+    name = attr.ib()
+    group = attr.ib(default="test")
+    variant = attr.ib(default=None)
+    run_uuid = attr.ib(default=attr.Factory(uuid.uuid4))
+
+
+@pytest.fixture
+def experiment():
+    exp = FakeExperiment(name=f"incremental-{uuid.uuid4()}")
+    old_jobs = CFG["jobs"].value
+    old_enable = CFG["incremental"]["enable"].value
+    CFG["incremental"]["enable"] = True
+    yield exp
+    CFG["jobs"] = old_jobs
+    CFG["incremental"]["enable"] = old_enable
+
+
+def run_group(project, experiment, succeed=True):
+    group, session = run.begin_run_group(project, experiment)
+    if succeed:
+        run.end_run_group(group, session)
+    else:
+        run.fail_run_group(group, session)
+
+
+def make_plan(experiment, *names):
+    chains = [
+        a.RequireAllOnDemand(
+            list, project_id=incremental.project_id(name, "test", None)
+        ) for name in names
+    ]
+    return [a.Experiment(obj=experiment, actions=chains)]
+
+
+def project_ids(plan):
+    return [
+        step.project_id
+        for step in plan[0].actions
+        if isinstance(step, a.RequireAllOnDemand)
+    ]
+
+
+def test_completed_variants_are_pruned(experiment):
+    run_group(FakeProject("done"), experiment)
+    run_group(FakeProject("failed"), experiment, succeed=False)
+    plan = make_plan(experiment, "done", "failed", "new")
+
+    assert incremental.prune(plan) == 1
+    assert project_ids(plan) == ['failed-test@', 'new-test@']
+
+
+def test_experiments_match_by_name(experiment):
+    run_group(FakeProject("done"), experiment)
+    plan = make_plan(FakeExperiment(name=experiment.name), "done")
+
+    assert incremental.prune(plan) == 1
+
+
+def test_changed_config_runs_again(experiment):
+    run_group(FakeProject("done"), experiment)
+    CFG["jobs"] = "1234"
+    plan = make_plan(experiment, "done")
+
+    assert incremental.prune(plan) == 0
+
+
+def test_opt_out(experiment):
+    run_group(FakeProject("done"), experiment)
+    CFG["incremental"]["enable"] = False
+    plan = make_plan(experiment, "done")
+
+    assert incremental.prune(plan) == 0
+    assert project_ids(plan) == ['done-test@']
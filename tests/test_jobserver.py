@@ -0,0 +1,90 @@
+"""
+Test the make jobserver.
+"""
+import shutil
+import time
+
+import pytest
+from plumbum import local
+
+from benchbuild.settings import CFG
+from benchbuild.utils import jobserver
+from benchbuild.utils.run import watch
+from benchbuild.utils.settings import get_number_of_jobs
+
+MAKEFILE = """
+all: a b c d
+a b c d:
+\t@sleep 0.3
+"""
+
+
+def test_strip_jobs():
+    assert jobserver.strip_jobs(["-j", 8, "all"]) == ["all"]
+    assert jobserver.strip_jobs(["-j8", "--jobs=4", "all"]) == ["all"]
+    assert jobserver.strip_jobs(["-j", "all"]) == ["all"]
+    assert jobserver.strip_jobs(["-C", "dir", "install"]) == \
+        ["-C", "dir", "install"]
+
+
+def test_jobs_of():
+    assert jobserver.jobs_of(["-j", 8, "all"]) == 8
+    assert jobserver.jobs_of(["-j1", "all"]) == 1
+    assert jobserver.jobs_of(["--jobs=1", "-j", "all"]) == 0
+    assert jobserver.jobs_of(["-C", "dir", "install"]) is None
+
+
+@pytest.mark.skipif(shutil.which("make") is None, reason="requires make")
+def test_attach_keeps_serial_make():
+    serial = local["make"]["-C", "dir"]["-j1"]
+    parallel = local["make"]["-C", "dir"]["-j2"]
+    unlimited = local["make"]["-j"]["all"]
+    with jobserver.serve(2, 1):
+        assert jobserver.attach(serial) is serial
+        assert jobserver.attach(parallel) is not parallel
+        assert jobserver.attach(unlimited) is not unlimited
+
+
+@pytest.mark.skipif(shutil.which("make") is None, reason="requires make")
+def test_attach_keeps_plain_make():
+    make = local["make"]
+    plain = make["check"]
+    with jobserver.serve(2, 1):
+        assert jobserver.attach(make) is make
+        assert jobserver.attach(plain) is plain
+
+
+def test_number_of_jobs_is_shared():
+    old_jobs = CFG["jobs"].value
+    CFG["jobs"] = 8
+    try:
+        with jobserver.serve(8, 4):
+            assert get_number_of_jobs(CFG) == 2
+        assert get_number_of_jobs(CFG) == 8
+    finally:
+        CFG["jobs"] = old_jobs
+
+
+def test_attach_ignores_other_commands():
+    echo = local["echo"]["-j8"]
+    with jobserver.serve(2, 1):
+        assert jobserver.attach(echo) is echo
+
+
+def test_attach_without_jobserver():
+    make = local["sh"]["-j8"]
+    assert jobserver.attach(make) is make
+
+
+@pytest.mark.skipif(shutil.which("make") is None, reason="requires make")
+def test_make_respects_jobserver(tmp_path):
+    (tmp_path / "Makefile").write_text(MAKEFILE)
+    make = watch(local["make"])
+
+    with jobserver.serve(2, 1):
+        start = time.time()
+        make("-C", str(tmp_path), "-j", 8, "all")
+        elapsed = time.time() - start
+
+    # 4 jobs of 0.3s on 2 slots need at least two rounds.
+    assert elapsed >= 0.55
@@ -0,0 +1,110 @@
+"""
+Test the execution journal.
+"""
+import attr
+import pytest
+
+from benchbuild.settings import CFG
+from benchbuild.utils import actions as a
+from benchbuild.utils import journal
+
+EXECUTED = []
+
+
+@attr.s
+class Record(a.Step):
+    NAME = "RECORD"
+    DESCRIPTION = "A Step that records its execution."
+
+    label = attr.ib(default="")
+
+    def __call__(self):
+        EXECUTED.append(self.label)
+        return a.StepResult.OK
+
+    def __str__(self, indent: int = 0) -> str:
+        return "* record: {0}".format(self.label)
+
+
+@attr.s
+class FailAlways(a.Step):
+    NAME = "FAIL ALWAYS"
+    DESCRIPTION = "A Step that guarantees to fail."
+
+    def __call__(self):
+        raise OSError("FailAlways")
+
+    def __str__(self, indent: int = 0) -> str:
+        return "* fail"
+
+    def onerror(self):
+        if self.journal is not None:
+            self.journal.discard_chain()
+
+
+@attr.s(eq=False)
+class FakeExperiment:
+    name = attr.ib(default="fake")
+    id = attr.ib(default="0c0ffee0-0000-0000-0000-000000000000")
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    old_path = CFG["journal"]["path"].value
+    old_resume = CFG["journal"]["resume"].value
+    CFG["journal"]["path"] = str(tmp_path)
+    EXECUTED.clear()
+    yield tmp_path
+    CFG["journal"]["path"] = old_path
+    CFG["journal"]["resume"] = old_resume
+
+
+def make_plan(*steps):
+    chain = a.RequireAll(actions=list(steps))
+    return [a.Experiment(obj=FakeExperiment(), actions=[chain])]
+
+
+def execute(plan):
+    journal.attach(plan)
+    for step in plan:
+        for chain in step.actions:
+            if isinstance(chain, a.RequireAll):
+                chain()
+
+
+def test_journal_records_and_discards(journal_path):
+    jrnl = journal.Journal(str(journal_path / "test.journal"))
+    jrnl.record("a/0:X")
+    jrnl.record("b/0:X")
+    jrnl.discard("a/")
+
+    reloaded = journal.Journal(jrnl.path)
+    assert not reloaded.is_completed("a/0:X")
+    assert reloaded.is_completed("b/0:X")
+
+
+def test_resume_skips_completed_steps(journal_path):
+    execute(make_plan(Record(label="a"), Record(label="b")))
+    assert EXECUTED == ["a", "b"]
+
+    CFG["journal"]["resume"] = True
+    EXECUTED.clear()
+    execute(make_plan(Record(label="a"), Record(label="b")))
+    assert EXECUTED == []
+
+
+def test_no_resume_executes_everything(journal_path):
+    execute(make_plan(Record(label="a")))
+    EXECUTED.clear()
+    execute(make_plan(Record(label="a")))
+    assert EXECUTED == ["a"]
+
+
+def test_failed_chain_is_not_resumed(journal_path):
+    execute(make_plan(Record(label="a"), FailAlways()))
+    assert EXECUTED == ["a"]
+
+    CFG["journal"]["resume"] = True
+    EXECUTED.clear()
+    execute(make_plan(Record(label="a"), Record(label="b")))
+    assert EXECUTED == ["a", "b"]
@@ -0,0 +1,80 @@
+"""
+Test the filters & the output of `benchbuild log`.
+"""
+import datetime
+import json
+import uuid
+
+import pytest
+
+from benchbuild.cli import log as cli_log
+from benchbuild.utils import schema
+
+NOW = datetime.datetime(2021, 3, 1, 12, 0)
+
+
+@pytest.fixture
+def runs():
+    session = schema.Session()
+    exp_name = f"log-{uuid.uuid4()}"
+    group = uuid.uuid4()
+    for hours, status in enumerate(['completed', 'failed', 'completed']):
+        run = schema.Run(
+            command=f"cmd-{hours}",
+            project_name="logged",
+            project_group="log",
+            experiment_name=exp_name,
+            run_group=group if hours else uuid.uuid4(),
+            begin=NOW + datetime.timedelta(hours=hours),
+            status=status
+        )
+        session.add(run)
+        session.flush()
+        session.add(
+            schema.RunLog(run_id=run.id, status=hours, stdout=f"out-{hours}")
+        )
+    session.commit()
+    return session, exp_name, group
+
+
+def commands(query):
+    return [row.command for row in query]
+
+
+def test_filters(runs):
+    session, exp_name, group = runs
+
+    def query(**kwargs):
+        return cli_log.query_runs(session, experiments=[exp_name], **kwargs)
+
+    assert commands(query()) == ['cmd-0', 'cmd-1', 'cmd-2']
+    assert commands(query(statuses=['failed'])) == ['cmd-1']
+    assert commands(query(run_groups=[str(group)])) == ['cmd-1', 'cmd-2']
+    assert commands(query(limit=2)) == ['cmd-0', 'cmd-1']
+    assert commands(
+        query(
+            since=NOW + datetime.timedelta(minutes=30),
+            until=NOW + datetime.timedelta(hours=2)
+        )
+    ) == ['cmd-1']
+
+
+def test_json_lines(runs, capsys):
+    session, exp_name, _ = runs
+    query = cli_log.query_runs(
+        session, with_logs=True, experiments=[exp_name], statuses=['failed']
+    )
+
+    cli_log.print_json(query, ['stdout'])
+
+    record = json.loads(capsys.readouterr().out)
+    assert record['command'] == 'cmd-1'
+    assert record['begin'] == '2021-03-01T13:00:00'
+    assert (record['exit_code'], record['stdout']) == (1, 'out-1')
+
+
+def test_parse_time():
+    assert cli_log.parse_time("2021-03-01T12:00") == NOW
+    since = cli_log.parse_time("2h")
+    age = datetime.datetime.now() - since
+    assert datetime.timedelta(hours=2) <= age < datetime.timedelta(hours=3)
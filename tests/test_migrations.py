@@ -0,0 +1,64 @@
+"""
+Test that databases of older versions of benchbuild are upgraded.
+"""
+import uuid
+
+import migrate.versioning.api as migrate
+import pytest
+import sqlalchemy as sa
+
+from benchbuild.settings import CFG
+from benchbuild.utils import schema
+
+
+@pytest.fixture
+def sqlite_file(tmp_path):
+    old_connect_string = CFG["db"]["connect_string"].value
+    CFG["db"]["connect_string"] = f"sqlite:///{tmp_path / 'bb.db'}"
+    yield
+    CFG["db"]["connect_string"] = old_connect_string
+
+
+def database_of_version(version):
+    """Create a database with metrics, at an older version of the schema."""
+    connection = schema.SessionManager().connection
+    connect_str, repo_url = schema.get_version_data()
+    migrate.downgrade(connect_str, repo_url, version)
+    connection.execute(schema.SchemaMarker.__table__.delete())
+
+    exp_id = uuid.uuid4()
+    meta = sa.MetaData(bind=connection)
+    experiment = sa.Table('experiment', meta, autoload=True)
+    run = sa.Table('run', meta, autoload=True)
+    metric = sa.Table('metrics', meta, autoload=True)
+    connection.execute(experiment.insert(), id=str(exp_id), name="old")
+    for run_id, value in ((1, 1.0), (2, 3.0)):
+        connection.execute(
+            run.insert(),
+            id=run_id,
+            experiment_group=str(exp_id),
+            project_name="prj",
+            project_group="grp",
+            status="completed"
+        )
+        connection.execute(
+            metric.insert(), name="time.real_s", value=value, run_id=run_id
+        )
+    return exp_id
+
+
+def test_version_3_is_upgraded(sqlite_file, monkeypatch):
+    exp_id = database_of_version(3)
+
+    monkeypatch.setattr(schema.ui, 'ask', lambda *args, **kwargs: True)
+    manager = schema.SessionManager()
+
+    connect_str, repo_url = schema.get_version_data()
+    assert migrate.db_version(connect_str, repo_url) == \
+        migrate.version(repo_url)
+    session = manager.get()()
+    rollup = session.query(schema.MetricRollup).filter(
+        schema.MetricRollup.experiment_group == exp_id
+    ).one()
+    assert (rollup.count, rollup.sum, rollup.max) == (2, 4.0, 3.0)
+    assert session.query(schema.Blob).count() == 0
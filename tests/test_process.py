@@ -0,0 +1,71 @@
+"""
+Test the asynchronous execution of commands.
+"""
+import time
+
+import pytest
+from plumbum import local
+from plumbum.commands import ProcessExecutionError, ProcessTimedOut
+
+from benchbuild.utils import process, run
+
+
+def test_run_sync_captures_output():
+    result = process.run_sync(local['echo']['hello'], tee=False)
+
+    assert result.retcode == 0
+    assert result.stdout == 'hello\n'
+    assert result.stderr == ''
+    assert result.rusage is not None
+
+
+def test_run_sync_streams_to_sinks():
+    chunks = []
+    result = process.run_sync(
+        local['echo']['hello'], tee=False, capture=False, stdout=[chunks.append]
+    )
+
+    assert ''.join(chunks) == 'hello\n'
+    assert result.stdout == ''
+
+
+def test_run_sync_pipeline():
+    cmd = local['echo']['hello'] | local['tr']['a-z', 'A-Z']
+    result = process.run_sync(cmd, tee=False)
+
+    assert result.stdout == 'HELLO\n'
+
+
+def test_run_sync_checks_retcode():
+    with pytest.raises(ProcessExecutionError):
+        process.run_sync(local['false'], tee=False)
+
+    result = process.run_sync(local['false'], retcode=None, tee=False)
+    assert result.retcode == 1
+
+
+def test_run_sync_kills_on_timeout():
+    start = time.time()
+    with pytest.raises(ProcessTimedOut):
+        process.run_sync(local['sleep']['10'], timeout=0.2, tee=False)
+    assert time.time() - start < 5
+
+
+def test_run_many_runs_concurrently():
+    start = time.time()
+    results = process.run_many([local['sleep']['0.5']] * 8, tee=False)
+
+    assert [r.retcode for r in results] == [0] * 8
+    assert time.time() - start < 4
+
+
+def test_run_many_keeps_order():
+    commands = [local['echo'][str(i)] for i in range(4)]
+    results = process.run_many(commands, limit=2, tee=False)
+
+    assert [r.stdout for r in results] == ['0\n', '1\n', '2\n', '3\n']
+
+
+def test_watch_returns_plumbum_result():
+    echo = run.watch(local['echo'])
+    assert echo('hello') == (0, 'hello\n', '')
@@ -0,0 +1,61 @@
+"""
+Test the step profiler.
+"""
+import json
+
+from benchbuild.utils import actions as a
+from benchbuild.utils import profiler, tasks
+
+
+class PassAlways(a.Step):
+    NAME = "PASS ALWAYS"
+    DESCRIPTION = "A Step that guarantees to succeed."
+
+    @a.notify_step_begin_end
+    def __call__(self):
+        return a.StepResult.OK
+
+    def __str__(self, indent: int = 0) -> str:
+        return "* pass"
+
+
+class FailAlways(a.Step):
+    NAME = "FAIL ALWAYS"
+    DESCRIPTION = "A Step that guarantees to fail."
+
+    @a.notify_step_begin_end
+    def __call__(self):
+        raise OSError("FailAlways")
+
+    def __str__(self, indent: int = 0) -> str:
+        return "* fail"
+
+
+def load_events(path):
+    with open(path) as trace_file:
+        trace = json.load(trace_file)
+    return [ev for ev in trace["traceEvents"] if ev["ph"] == "X"]
+
+
+def test_trace_contains_all_steps(tmp_path):
+    path = str(tmp_path / "trace.json")
+    with profiler.trace(path):
+        a.RequireAll(actions=[PassAlways(), FailAlways()])()
+
+    events = load_events(path)
+    names = sorted(ev["name"] for ev in events)
+    assert names == ["CLEAN", "FAIL ALWAYS", "PASS ALWAYS", "REQUIRE ALL"]
+    assert all("cpu_s" in ev["args"] for ev in events)
+    assert not (tmp_path / "trace.json.d").exists()
+
+
+def test_trace_contains_worker_processes(tmp_path):
+    path = str(tmp_path / "trace.json")
+    plan = [a.Any(actions=[a.RequireAll(actions=[PassAlways()])] * 2)]
+    with profiler.trace(path):
+        tasks.Scheduler(tasks.flatten(plan), num_processes=2)()
+
+    events = load_events(path)
+    workers = [ev for ev in events if ev["cat"] == "worker"]
+    assert len(workers) == 2
+    assert len({ev["pid"] for ev in events}) == 2
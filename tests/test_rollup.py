@@ -0,0 +1,82 @@
+"""
+Test the incremental rollup of metrics.
+"""
+import resource
+import uuid
+
+import pytest
+
+from benchbuild.settings import CFG
+from benchbuild.utils import db, rollup, schema, writer
+
+
+class FakeProject:
+    name = "rolled"
+    group = "rollup"
+    run_uuid = uuid.uuid4()
+
+
+def make_experiment():
+    return type('FakeExperiment', (), {'name': 'rollup', 'id': uuid.uuid4()})
+
+
+def rollup_of(exp_id):
+    session = schema.Session()
+    rows = rollup.summary(session).filter(
+        schema.MetricRollup.experiment_group == exp_id
+    ).order_by(schema.MetricRollup.name)
+    return {row.name: row for row in rows}
+
+
+def persist(exp, *timings):
+    for timing in timings:
+        db_run, session = db.create_run(
+            "true", FakeProject(), exp, FakeProject.run_uuid
+        )
+        user, system, real = timing
+        rusage = resource.struct_rusage((user, system) + (0, ) * 14)
+        db.persist_rusage(session, [(db_run, rusage, real)])
+        session.commit()
+
+
+def test_metrics_are_rolled_up():
+    exp = make_experiment()
+    persist(exp, (1.0, 0.0, 2.0))
+    persist(exp, (3.0, 0.0, 4.0), (2.0, 0.0, 6.0))
+
+    real = rollup_of(exp.id)['time.real_s']
+    assert real.variant == ''
+    assert (real.count, real.min, real.max) == (3, 2.0, 6.0)
+    assert real.mean == pytest.approx(4.0)
+    assert real.variance == pytest.approx(4.0)
+    assert rollup_of(exp.id)['time.user_s'].mean == pytest.approx(2.0)
+
+
+def test_batched_metrics_are_rolled_up():
+    old_batch_writes = CFG["db"]["batch_writes"].value
+    CFG["db"]["batch_writes"] = True
+    writer.forget()
+    try:
+        exp = make_experiment()
+        persist(exp, (1.0, 0.0, 2.0))
+        assert not rollup_of(exp.id)
+
+        writer.flush()
+        assert rollup_of(exp.id)['time.real_s'].count == 1
+    finally:
+        writer.forget()
+        CFG["db"]["batch_writes"] = old_batch_writes
+
+
+def test_rebuild_matches_incremental_rollup():
+    exp = make_experiment()
+    persist(exp, (1.0, 0.0, 2.0), (5.0, 0.0, 1.0))
+    before = rollup_of(exp.id)
+
+    session = schema.Session()
+    rollup.rebuild(session)
+    session.commit()
+
+    after = rollup_of(exp.id)
+    assert {k: tuple(v) for k, v in after.items()} == \
+        {k: tuple(v) for k, v in before.items()}
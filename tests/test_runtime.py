@@ -0,0 +1,82 @@
+"""
+Test that wrapped binaries start fast: without importing what they do not
+need and with a single manifest for all wrappers of a project.
+"""
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+from plumbum import local
+
+from benchbuild import runtime
+from benchbuild.projects.test.test import TestProject
+from benchbuild.utils import wrapping
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+NOT_NEEDED = ("sqlalchemy", "migrate", "jinja2", "pygit2", "pkg_resources")
+
+
+def imported_modules(*args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    importtime = subprocess.run([sys.executable, "-X", "importtime", *args],
+                                check=True,
+                                env=env,
+                                stderr=subprocess.PIPE,
+                                universal_newlines=True).stderr
+    return {
+        line.split('|')[-1].strip().split('.')[0]
+        for line in importtime.splitlines()
+        if line.startswith("import time:")
+    }
+
+
+@pytest.fixture
+def wrapped_true(tmp_path):
+    shutil.copy(local.which("true"), str(tmp_path / "true"))
+    with local.cwd(str(tmp_path)):
+        yield str(wrapping.wrap("true", TestProject()))
+
+
+def test_wrapper_imports(wrapped_true):
+    modules = imported_modules(wrapped_true)
+
+    assert "benchbuild" in modules
+    assert not modules & set(NOT_NEEDED)
+
+
+def test_public_api_is_lazy():
+    script = "import benchbuild as bb, sys; print('benchbuild.project' " \
+        "in sys.modules, bb.Project.__module__)"
+    output = subprocess.run([sys.executable, "-c", script],
+                            check=True,
+                            env=dict(os.environ, PYTHONPATH=ROOT),
+                            stdout=subprocess.PIPE,
+                            universal_newlines=True).stdout
+
+    assert output.split() == ["False", "benchbuild.project"]
+
+
+def test_manifest_is_shared(tmp_path):
+    project = TestProject()
+    with local.cwd(str(tmp_path)):
+        manifest = wrapping.write_manifest(project)
+        # Make a rewrite visible, even on file systems with coarse times.
+        os.utime(manifest, ns=(0, 0))
+
+        assert wrapping.write_manifest(project) == manifest
+        assert os.stat(manifest).st_mtime_ns == 0
+        assert runtime.load(manifest) is runtime.load(manifest)
+
+        project.runtime_extension = "changed"
+        wrapping.write_manifest(project)
+        assert runtime.load(manifest).runtime_extension == "changed"
+    assert os.listdir(str(tmp_path)) == [os.path.basename(manifest)]
+
+
+def test_manifest_of_other_version(tmp_path):
+    manifest = tmp_path / "other.project"
+    manifest.write_bytes(b"benchbuild-manifest 0\n")
+
+    assert runtime.load(str(manifest)) is None
@@ -0,0 +1,51 @@
+"""
+Test that processes skip the validation of a validated schema.
+"""
+import pytest
+import sqlalchemy as sa
+
+from benchbuild.settings import CFG
+from benchbuild.utils import schema
+
+
+@pytest.fixture
+def sqlite_file(tmp_path):
+    old_connect_string = CFG["db"]["connect_string"].value
+    CFG["db"]["connect_string"] = f"sqlite:///{tmp_path / 'bb.db'}"
+    yield
+    CFG["db"]["connect_string"] = old_connect_string
+
+
+def fail(*args, **kwargs):
+    raise AssertionError("The schema was validated again.")
+
+
+def markers(manager):
+    table = schema.SchemaMarker.__table__
+    return [
+        row.schema_hash
+        for row in manager.connection.execute(sa.select([table]))
+    ]
+
+
+def test_first_process_marks_the_schema(sqlite_file):
+    manager = schema.SessionManager()
+    assert markers(manager) == [schema.schema_hash()]
+
+
+def test_later_processes_skip_validation(sqlite_file, monkeypatch):
+    schema.SessionManager()
+
+    monkeypatch.setattr(schema, 'needed_schema', fail)
+    monkeypatch.setattr(schema, 'setup_versioning', fail)
+    manager = schema.SessionManager()
+    assert manager.get()().query(schema.Run).count() == 0
+
+
+def test_schema_changes_validate_again(sqlite_file, monkeypatch):
+    schema.SessionManager()
+    old_hash = schema.schema_hash()
+
+    monkeypatch.setattr(schema, 'schema_hash', lambda: 'changed')
+    manager = schema.SessionManager()
+    assert sorted(markers(manager)) == sorted([old_hash, 'changed'])
@@ -0,0 +1,65 @@
+"""
+Test the shared preparation of sources.
+"""
+import os
+import typing as tp
+
+import plumbum as pb
+
+from benchbuild.settings import CFG
+from benchbuild.source import base, snapshot
+
+
+class CountingSource(base.FetchableSource):
+
+    def __init__(self, local: str, remote: str):
+        super().__init__(local, remote)
+        self.prepared: tp.List[str] = []
+
+    @property
+    def default(self) -> base.Variant:
+        return base.Variant(owner=self, version='1')
+
+    def version(self, target_dir: str, version: str = 'HEAD') -> pb.LocalPath:
+        self.prepared.append(version)
+        src_dir = pb.local.path(target_dir) / self.local
+        src_dir.mkdir()
+        (src_dir / 'VERSION').write(version)
+        return src_dir
+
+    def versions(self) -> tp.List[base.Variant]:
+        return [base.Variant(owner=self, version=v) for v in ['1', '2']]
+
+    def fetch(self) -> pb.LocalPath:
+        return pb.local.path(self.local)
+
+
+def make_source() -> CountingSource:
+    return CountingSource(local='counting', remote='counting://')
+
+
+def test_version_without_scope(tmp_path):
+    src = make_source()
+    snapshot.version(src, str(tmp_path / 'a'), '1')
+    snapshot.version(src, str(tmp_path / 'b'), '1')
+
+    assert src.prepared == ['1', '1']
+
+
+def test_version_is_prepared_once_per_scope(tmp_path):
+    old_tmp_dir = CFG["tmp_dir"].value
+    CFG["tmp_dir"] = str(tmp_path / 'tmp')
+    try:
+        src = make_source()
+        with snapshot.scope() as snapshot_dir:
+            first = snapshot.version(src, str(tmp_path / 'a'), '1')
+            second = snapshot.version(src, str(tmp_path / 'b'), '1')
+            other = snapshot.version(src, str(tmp_path / 'c'), '2')
+
+        assert src.prepared == ['1', '2']
+        assert (first / 'VERSION').read() == '1'
+        assert (second / 'VERSION').read() == '1'
+        assert (other / 'VERSION').read() == '2'
+        assert not os.path.exists(snapshot_dir)
+    finally:
+        CFG["tmp_dir"] = old_tmp_dir
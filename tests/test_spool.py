@@ -0,0 +1,109 @@
+"""
+Test the spool files for the results of tracked commands.
+"""
+import glob
+import resource
+import sys
+import uuid
+
+import pytest
+from plumbum import local
+
+from benchbuild.settings import CFG
+from benchbuild.utils import blobs, db, run, schema, spool
+
+
+class FakeProject:
+    name = "spooled"
+    group = "spool"
+    run_uuid = uuid.uuid4()
+
+
+class FakeExperiment:
+    name = "spooled"
+    id = uuid.uuid4()
+
+
+@pytest.fixture
+def spooled(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, 'argv', [str(tmp_path / 'tracked')])
+    old_spool = CFG["db"]["spool"].value
+    old_spool_dir = CFG["db"]["spool_dir"].value
+    CFG["db"]["spool"] = True
+    CFG["db"]["spool_dir"] = str(tmp_path / 'spool')
+    yield str(tmp_path / 'spool')
+    CFG["db"]["spool"] = old_spool
+    CFG["db"]["spool_dir"] = old_spool_dir
+
+
+def runs_of(command):
+    session = schema.Session()
+    return session.query(schema.Run).filter(schema.Run.command == command).all()
+
+
+def test_tracked_runs_are_spooled(spooled):
+    cmd = local['echo']['spooled']
+    with run.track_execution(cmd, FakeProject(), FakeExperiment()) as ri:
+        run_info = ri()
+    rusage = resource.struct_rusage((1.0, 2.0) + (0, ) * 14)
+    db.persist_rusage(run_info.session, [(run_info.db_run, rusage, 3.0)])
+
+    assert run_info.session is None
+    assert glob.glob(spooled + '/*.jsonl')
+    assert runs_of(str(cmd)) == []
+
+    assert spool.ingest() == 1
+    assert glob.glob(spooled + '/*') == []
+
+    db_run, = runs_of(str(cmd))
+    session = schema.Session()
+    assert db_run.status == 'completed'
+    assert db_run.run_group == FakeProject.run_uuid
+    log = session.query(schema.RunLog).filter(
+        schema.RunLog.run_id == db_run.id
+    ).one()
+    assert blobs.text(session, log, 'stdout') == 'spooled\n'
+    metrics = session.query(schema.Metric).filter(
+        schema.Metric.run_id == db_run.id
+    ).all()
+    values = {m.name: m.value for m in metrics}
+    assert len(values) == len(db.RUSAGE_METRICS) + 1
+    assert (values['time.user_s'], values['time.system_s'],
+            values['time.real_s']) == (1.0, 2.0, 3.0)
+    assert session.query(schema.Experiment).filter(
+        schema.Experiment.id == FakeExperiment.id
+    ).count() == 1
+
+
+def test_records_of_unknown_runs_are_kept(spooled):
+    spool.write('config', [{'run_id': spool.new_key(), 'name': 'a'}])
+
+    assert spool.ingest() == 0
+    assert len(list(spool.read(glob.glob(spooled + '/*.jsonl')))) == 1
+
+
+def test_records_of_unknown_runs_are_dropped_eventually(spooled):
+    spool.write('config', [{'run_id': spool.new_key(), 'name': 'a'}])
+
+    for _ in range(spool.MAX_ATTEMPTS):
+        assert glob.glob(spooled + '/*.jsonl')
+        spool.ingest()
+    assert glob.glob(spooled + '/*.jsonl') == []
+
+
+def test_records_of_ingested_runs_are_ingested_later(spooled):
+    cmd = local['echo']['ingested-before']
+    with run.track_execution(cmd, FakeProject(), FakeExperiment()) as ri:
+        run_info = ri()
+    assert spool.ingest() == 1
+
+    rusage = resource.struct_rusage((1.0, 2.0) + (0, ) * 14)
+    db.persist_rusage(run_info.session, [(run_info.db_run, rusage, 3.0)])
+    assert spool.ingest() == 0
+    assert glob.glob(spooled + '/*.jsonl') == []
+
+    db_run, = runs_of(str(cmd))
+    metrics = schema.Session().query(schema.Metric).filter(
+        schema.Metric.run_id == db_run.id
+    ).count()
+    assert metrics == len(db.RUSAGE_METRICS) + 1
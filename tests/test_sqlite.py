@@ -0,0 +1,67 @@
+"""
+Test the configuration of SQLite databases for concurrent processes.
+"""
+import os
+
+import pytest
+import sqlalchemy as sa
+
+from benchbuild.settings import CFG
+from benchbuild.utils import schema, spool, sqlite
+
+
+@pytest.fixture
+def sqlite_file(tmp_path):
+    old_connect_string = CFG["db"]["connect_string"].value
+    connect_string = f"sqlite:///{tmp_path / 'bb.db'}"
+    CFG["db"]["connect_string"] = connect_string
+    yield connect_string
+    CFG["db"]["connect_string"] = old_connect_string
+
+
+@pytest.mark.parametrize(
+    'connect_string, is_file', [
+        ('sqlite://', False),
+        ('sqlite:///:memory:', False),
+        ('sqlite:////tmp/bb.db', True),
+        ('postgresql://bb@localhost/bb', False),
+    ]
+)
+def test_is_file(connect_string, is_file):
+    assert sqlite.is_file(connect_string) == is_file
+
+
+def test_file_databases_use_wal(sqlite_file):
+    engine = sa.create_engine(sqlite_file, **sqlite.engine_args())
+    sqlite.configure(engine)
+
+    with engine.connect() as connection:
+        assert connection.execute("PRAGMA journal_mode").scalar() == 'wal'
+        assert connection.execute("PRAGMA synchronous").scalar() == 1
+        assert connection.execute("PRAGMA busy_timeout").scalar() == 60000
+
+
+def test_file_databases_may_have_a_single_writer(sqlite_file):
+    assert not spool.enabled()
+
+    CFG["db"]["sqlite_single_writer"] = True
+    try:
+        assert spool.enabled()
+    finally:
+        CFG["db"]["sqlite_single_writer"] = False
+
+
+def test_forked_children_keep_memory_databases():
+    session = schema.Session()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        os.write(write_fd, b'1' if schema.Session() is session else b'0')
+        os._exit(0)
+
+    os.close(write_fd)
+    same_session = os.read(read_fd, 1)
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+    assert same_session == b'1'
@@ -0,0 +1,198 @@
+"""
+Test the task module.
+"""
+import subprocess
+import sys
+
+import attr
+
+from benchbuild.utils import actions as a
+from benchbuild.utils import resources, tasks
+
+EXECUTED = []
+
+
+@attr.s
+class Record(a.Step):
+    NAME = "RECORD"
+    DESCRIPTION = "A Step that records its execution."
+
+    label = attr.ib(default="")
+
+    def __call__(self):
+        EXECUTED.append(self.label)
+        return a.StepResult.OK
+
+    def __str__(self, indent: int = 0) -> str:
+        return "* record: {0}".format(self.label)
+
+
+class FailAlways(a.Step):
+    NAME = "FAIL ALWAYS"
+    DESCRIPTION = "A Step that guarantees to fail."
+
+    def __call__(self):
+        raise ValueError("FailAlways")
+
+    def __str__(self, indent: int = 0) -> str:
+        return "* fail"
+
+
+def chain(*labels):
+    return a.RequireAll(actions=[Record(label=label) for label in labels])
+
+
+def test_flatten_require_all_is_a_single_node():
+    graph = tasks.flatten([chain("a", "b", "c")])
+    assert len(graph) == 1
+
+
+def test_flatten_any_children_are_independent():
+    plan = [a.Any(actions=[chain("a"), chain("b"), chain("c")])]
+    graph = tasks.flatten(plan)
+
+    assert len(graph) == 3
+    assert all(not node.after for node in graph)
+
+
+def test_flatten_leaf_steps_are_barriers():
+    plan = [
+        a.Any(
+            actions=[
+                Record(label="first"),
+                chain("a"),
+                chain("b"),
+                Record(label="last")
+            ]
+        )
+    ]
+    first, chain_a, chain_b, last = tasks.flatten(plan).nodes
+
+    assert not first.after
+    assert chain_a.after == {first}
+    assert chain_b.after == {first}
+    assert last.after == {chain_a, chain_b}
+
+
+def test_flatten_independent_plans():
+    plan = [
+        a.Any(actions=[chain("a"), Record(label="x")]),
+        a.Any(actions=[chain("b"), Record(label="y")])
+    ]
+    graph = tasks.flatten(plan)
+
+    assert len(graph) == 4
+    assert len([node for node in graph if not node.after]) == 2
+
+
+def test_scheduler_respects_barriers():
+    EXECUTED.clear()
+    plan = [
+        a.Any(
+            actions=[
+                Record(label="first"),
+                chain("a1", "a2"),
+                chain("b1", "b2"),
+                Record(label="last")
+            ]
+        )
+    ]
+    results = tasks.Scheduler(tasks.flatten(plan))()
+
+    assert len(results) == 4
+    assert EXECUTED[0] == "first"
+    assert EXECUTED[-1] == "last"
+    assert EXECUTED.index("a1") < EXECUTED.index("a2")
+    assert EXECUTED.index("b1") < EXECUTED.index("b2")
+
+
+def test_scheduler_continues_after_failure():
+    EXECUTED.clear()
+    plan = [a.Any(actions=[FailAlways(), chain("a"), Record(label="last")])]
+    results = tasks.Scheduler(tasks.flatten(plan))()
+
+    assert results[0] == [a.StepResult.ERROR]
+    assert EXECUTED == ["a", "last"]
+
+
+def test_scheduler_with_worker_processes():
+    plan = [a.Any(actions=[chain("a"), chain("b"), FailAlways()])]
+    results = tasks.Scheduler(tasks.flatten(plan), num_processes=2)()
+
+    assert results == [[a.StepResult.OK], [a.StepResult.OK],
+                       [a.StepResult.ERROR]]
+
+
+def test_scheduler_admits_nodes_within_capacity():
+    plan = [a.Any(actions=[chain("a"), chain("b"), chain("c")])]
+    scheduler = tasks.Scheduler(
+        tasks.flatten(plan),
+        num_processes=4,
+        capacity=resources.Budget(cpus=2, memory=1024)
+    )
+
+    first = scheduler.admit(0)
+    second = scheduler.admit(1)
+    assert scheduler.admit(2) is None
+
+    scheduler.release(first, None)
+    third = scheduler.admit(1)
+    assert [first.key, second.key, third.key] == [0, 1, 2]
+
+
+def test_scheduler_releases_the_granted_budget(tmp_path):
+    ledger = resources.Ledger(str(tmp_path / "budgets.json"))
+    plan = [a.Any(actions=[chain("a")])]
+    scheduler = tasks.Scheduler(
+        tasks.flatten(plan), num_processes=2, ledger=ledger
+    )
+
+    node = scheduler.admit(0)
+    ledger.learn(tasks.ident(node), resources.Budget(cpus=4, memory=1024))
+    scheduler.release(node, None)
+    assert scheduler._in_use == resources.NOTHING
+
+
+def test_scheduler_learns_budgets(tmp_path):
+    ledger = resources.Ledger(str(tmp_path / "budgets.json"))
+    plan = [a.Any(actions=[chain("a"), chain("b")])]
+    tasks.Scheduler(tasks.flatten(plan), num_processes=2, ledger=ledger)()
+
+    learned = resources.Ledger(ledger.path)
+    assert set(learned.budgets) == {"-/#0", "-/#1"}
+    assert all(budget.memory > 0 for budget in learned.budgets.values())
+
+
+def test_usage_measures_the_whole_process_tree():
+    usage = resources.Usage(interval=0.05)
+    hold = "x = bytearray(64 * 2**20); import time; time.sleep(1)"
+    children = [subprocess.Popen([sys.executable, "-c", hold])
+                for _ in range(2)]
+    for child in children:
+        child.wait()
+
+    assert usage.budget().memory >= 2 * 64 * 2**20
+
+
+def test_priorities_follow_the_longest_path():
+    plan = [
+        a.Any(
+            actions=[chain("a"),
+                     chain("b"),
+                     Record(label="barrier"),
+                     chain("c")]
+        )
+    ]
+    graph = tasks.flatten(plan)
+    prio = tasks.priorities(graph, {0: 5.0, 1: 1.0, 2: 0.0, 3: 2.0})
+
+    assert prio == {0: 7.0, 1: 3.0, 2: 2.0, 3: 2.0}
+
+
+def test_predict_makespan_longest_job_first():
+    plan = [a.Any(actions=[chain("a"), chain("b"), chain("c")])]
+    graph = tasks.flatten(plan)
+    estimates = {0: 1.0, 1: 1.0, 2: 2.0}
+
+    assert tasks.predict_makespan(graph, estimates, 2) == 2.0
+    assert tasks.predict_makespan(graph, estimates, 1) == 4.0
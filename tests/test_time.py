@@ -0,0 +1,55 @@
+"""
+Test the in-process measurement of the resources a run uses.
+"""
+import uuid
+
+from plumbum import local
+
+from benchbuild.extensions import run as ext_run
+from benchbuild.extensions import time
+from benchbuild.utils import db, schema
+
+
+class FakeProject:
+    name = "timed"
+    group = "time"
+    run_uuid = uuid.uuid4()
+
+
+class FakeExperiment:
+    name = "timed"
+    id = uuid.uuid4()
+
+
+def metrics_of(db_run):
+    session = schema.Session()
+    metrics = session.query(schema.Metric).filter(
+        schema.Metric.run_id == db_run.id
+    ).all()
+    return {m.name: m.value for m in metrics}
+
+
+def test_resources_are_stored():
+    ext = time.RunWithTime(
+        ext_run.RuntimeExtension(FakeProject(), FakeExperiment())
+    )
+    run_info, = ext(local['sh'], '-c', 'exec sleep 0.1')
+
+    assert local['sh']['-c', 'exec sleep 0.1'].formulate() == \
+        run_info.cmd.formulate()
+    metrics = metrics_of(run_info.db_run)
+    assert set(metrics) == {"time.real_s"} | {
+        name for name, _ in db.RUSAGE_METRICS
+    }
+    assert metrics["time.real_s"] >= 0.1
+    assert metrics["rusage.max_rss_kb"] > 0
+
+
+def test_failed_runs_are_not_stored():
+    ext = time.RunWithTime(
+        ext_run.RuntimeExtension(FakeProject(), FakeExperiment())
+    )
+    run_info, = ext(local['false'])
+
+    assert run_info.has_failed
+    assert metrics_of(run_info.db_run) == {}
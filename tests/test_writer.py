@@ -0,0 +1,103 @@
+"""
+Test the write-behind buffer for the database.
+"""
+import resource
+import sys
+import uuid
+
+import pytest
+from plumbum import local
+
+from benchbuild.settings import CFG
+from benchbuild.utils import db, run, schema, writer
+
+
+class FakeProject:
+    name = "batched"
+    group = "writer"
+    run_uuid = uuid.uuid4()
+
+
+class FakeExperiment:
+    name = "batched"
+    id = uuid.uuid4()
+
+
+@pytest.fixture
+def batch_writes():
+    old_batch_writes = CFG["db"]["batch_writes"].value
+    CFG["db"]["batch_writes"] = True
+    writer.forget()
+    yield
+    writer.flush()
+    writer.forget()
+    CFG["db"]["batch_writes"] = old_batch_writes
+
+
+def metrics_of(run_id):
+    session = schema.Session()
+    return session.query(schema.Metric).filter(
+        schema.Metric.run_id == run_id
+    ).count()
+
+
+def test_writer_is_disabled_by_default():
+    assert writer.writer() is None
+
+
+def test_rows_are_written_on_flush(batch_writes):
+    db_run, session = db.create_run(
+        "true", FakeProject(), FakeExperiment(), FakeProject.run_uuid
+    )
+    rusage = resource.struct_rusage((1.0, 2.0) + (0, ) * 14)
+    db.persist_rusage(session, [(db_run, rusage, 3.0)])
+    assert metrics_of(db_run.id) == 0
+
+    writer.flush()
+    assert metrics_of(db_run.id) == len(db.RUSAGE_METRICS) + 1
+
+
+def test_timings_are_written_deprecated(batch_writes):
+    db_run, session = db.create_run(
+        "true", FakeProject(), FakeExperiment(), FakeProject.run_uuid
+    )
+    with pytest.deprecated_call():
+        db.persist_time(db_run, session, [(1.0, 2.0, 3.0)])
+
+    writer.flush()
+    assert metrics_of(db_run.id) == 3
+
+
+def test_rows_are_written_by_size(batch_writes):
+    batch = writer.writer()
+    batch.max_rows = 4
+    db_run, session = db.create_run(
+        "true", FakeProject(), FakeExperiment(), FakeProject.run_uuid
+    )
+
+    db.persist_config(db_run, session, {"a": "1", "b": "2", "c": "3"})
+    assert batch.pending == 3
+
+    db.persist_config(db_run, session, {"d": "4"})
+    assert batch.pending == 0
+
+
+def test_tracked_runs_are_written_in_bulk(
+    batch_writes, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(sys, 'argv', [str(tmp_path / 'tracked')])
+    with run.track_execution(
+        local['true'], FakeProject(), FakeExperiment()
+    ) as run_info:
+        run_info()
+    run_id = run_info.db_run.id
+    writer.flush()
+
+    session = schema.Session()
+    db_run = session.query(schema.Run).filter(schema.Run.id == run_id).one()
+    log = session.query(schema.RunLog).filter(
+        schema.RunLog.run_id == run_id
+    ).one()
+    assert db_run.status == 'completed'
+    assert db_run.end is not None
+    assert log.status == 0